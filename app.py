@@ -1,14 +1,75 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, abort, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pandas as pd
 import os
 import glob
-from indicator.tech_analysis_web import TechAnalysis
+import json
+import logging
+import time
+from indicator.compute_pool import ComputePool
+from indicator.downsample import downsample_lines, downsample_ohlcv
+from indicator.http_cache import CACHE_CONTROL, ResponseBodyCache, compress, make_etag, negotiate_encoding
+from indicator.indicators import DOWNSAMPLE_KEYS, INDICATOR_PARAMS, compute_window, normalize_params, window_start
+from indicator.kline_store import ColumnarStore, KlineCache, parse_time, time_slice
+from indicator import metrics
+from indicator.refresher import RefreshService
+from indicator.result_cache import IndicatorCache
+from indicator.screener import SCREEN_CONDITIONS, Screener, load_universe, resolve_code
+from indicator.serialize import (BINARY_LAYOUT, BINARY_MIMETYPE, LAYOUTS, columns_payload, dumps, dumps_binary,
+                                 dumps_columns, empty_payload)
+from indicator.stream import SimulatedTickFeed, StreamHub, StreamWatcher
+from indicator.tech_analysis_web import IndicatorContext
 
 app = Flask(__name__)
 CORS(app)  # 允许所有跨域请求
 
+# LOG_LEVEL=DEBUG 时输出指标计算的调试统计等详细日志
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+logger = logging.getLogger(__name__)
+
 DATA_DIR = 'indicator'  # 假设csv都在indicator目录
+KLINE_CACHE_MAX_BYTES = int(os.environ.get('KLINE_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # K线缓存内存上限
+
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # 指标结果缓存内存上限
+
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # 响应体（含压缩后）缓存内存上限
+
+kline_cache = KlineCache(DATA_DIR, max_bytes=KLINE_CACHE_MAX_BYTES, store=ColumnarStore())
+indicator_cache = IndicatorCache(max_bytes=INDICATOR_CACHE_MAX_BYTES)
+
+# /metrics：请求与各阶段耗时、响应大小，按接口与指标类型分组
+registry = metrics.Registry()
+REQUEST_SECONDS = registry.histogram('sesame_request_seconds', '请求处理耗时（秒），SSE 为建立连接的耗时', ('endpoint',))
+REQUESTS = registry.counter('sesame_requests_total', '请求数', ('endpoint', 'status'))
+STAGE_SECONDS = registry.histogram(
+    'sesame_stage_seconds', '各处理阶段耗时（秒）：load 加载K线、compute 指标计算（缓存未命中时，含等待计算池）、'
+    'downsample 降采样、serialize 序列化、compress 压缩（响应体缓存未命中时）', ('endpoint', 'stage', 'indicator'))
+RESPONSE_BYTES = registry.histogram('sesame_response_bytes', '响应体大小（字节，压缩后）', ('endpoint', 'indicator'),
+                                    buckets=metrics.SIZE_BUCKETS)
+
+def _stage(stage, indicator=''):
+    """统计当前请求某个阶段的耗时：with _stage('compute', 'supertrend'): ..."""
+    return STAGE_SECONDS.time(request.endpoint or '', stage, indicator)
+
+def _timed_compress(body, encoding):
+    with _stage('compress'):
+        return compress(body, encoding)
+
+response_cache = ResponseBodyCache(max_bytes=RESPONSE_CACHE_MAX_BYTES, compressor=_timed_compress)
+
+UNIVERSE_FILE = os.path.join('config', 'code.txt')  # 筛选默认的股票池
+SCREEN_WORKERS = int(os.environ.get('SCREEN_WORKERS', 0)) or None  # 筛选进程数，默认CPU核数
+screener = Screener(kline_cache, workers=SCREEN_WORKERS)
+
+STREAM_KEEPALIVE = float(os.environ.get('STREAM_KEEPALIVE', 15))  # 推送连接空闲时发送心跳的间隔（秒）
+stream_hub = StreamHub(kline_cache.load, max_queue=int(os.environ.get('STREAM_MAX_QUEUE', 256)))
+
+# 指标计算池：COMPUTE_WORKERS 为同时进行的缓存未命中计算数（0 表示在请求线程中计算），COMPUTE_POOL 为 thread/process
+compute_pool = ComputePool(int(os.environ.get('COMPUTE_WORKERS', 0)), os.environ.get('COMPUTE_POOL', 'thread'))
+
+# 启动时预热的指标（逗号分隔），参数取默认值
+WARM_INDICATORS = tuple(name.strip() for name in os.environ.get('WARM_INDICATORS', 'supertrend,squeeze_momentum').split(',')
+                        if name.strip())
 
 def get_available_stocks():
     """获取可用的股票代码列表"""
@@ -32,25 +93,13 @@ def get_available_stocks():
     return stocks
 
 def load_kline(code):
-    # 支持两种命名
-    for fname in [f'{code}.csv', f'{code.replace(".", "_")}_daily.csv']:
-        fpath = os.path.join(DATA_DIR, fname)
-        if os.path.exists(fpath):
-            df = pd.read_csv(fpath)
-            # 兼容不同列名
-            rename_dict = {'open_price': 'open', 'high_price': 'high', 'low_price': 'low', 'close_price': 'close'}
-            for k, v in rename_dict.items():
-                if k in df.columns:
-                    df.rename(columns={k: v}, inplace=True)
-            # 生成time列
-            if 'time_key' in df.columns:
-                df['time'] = pd.to_datetime(df['time_key']).dt.strftime('%Y-%m-%d')
-            elif 'time' in df.columns:
-                df['time'] = pd.to_datetime(df['time']).dt.strftime('%Y-%m-%d')
-            else:
-                df['time'] = pd.date_range(start='2020-01-01', periods=len(df)).strftime('%Y-%m-%d')
-            return df
-    return None
+    """
+    加载规范化后的K线数据（带进程内缓存，源文件变化时自动失效）
+    返回的DataFrame为缓存共享对象，请勿原地修改
+    """
+    if not code:
+        return None
+    return kline_cache.get(code)
 
 @app.route('/')
 def index():
@@ -73,81 +122,500 @@ def api_stocks():
     
     return jsonify(stocks)
 
-@app.route('/api/kline')
-def api_kline():
-    code = request.args.get('code')
-    df = load_kline(code)
-    if df is None:
-        return jsonify([])
+def _layout(args=None, binary=False):
+    """
+    响应形状: records（默认，逐行对象）或 columns（按列数组）
+    binary: 是否允许二进制格式，format=bin 或只接受 application/octet-stream 时返回 bin
+    """
+    args = request.args if args is None else args
+    layout = args.get('format')
+    if binary and (layout == BINARY_LAYOUT or (
+            layout is None and request.accept_mimetypes.best_match(['application/json', BINARY_MIMETYPE]) == BINARY_MIMETYPE)):
+        return BINARY_LAYOUT
+    return layout if layout in LAYOUTS else 'records'
+
+def _json_response(body):
+    return app.response_class(body, mimetype='application/json')
+
+def _mimetype(layout):
+    return BINARY_MIMETYPE if layout == BINARY_LAYOUT else 'application/json'
+
+def _encode_columns(columns, layout):
+    """{列名: 数组} -> 响应体bytes"""
+    if layout == BINARY_LAYOUT:
+        return dumps_binary(columns)
+    return dumps_columns(columns, layout)
+
+def _empty_response(layout):
+    body = dumps_binary({}) if layout == BINARY_LAYOUT else empty_payload(layout)
+    return app.response_class(body, mimetype=_mimetype(layout))
+
+def _cached_response(parts, build, mimetype):
+    """
+    带HTTP缓存语义的响应
+
+    参数:
+    parts: 决定响应内容的全部因素（数据版本、规范化参数、区间、响应格式等），用于生成ETag
+    build: 无参函数，生成原始响应体；If-None-Match 命中或响应体已缓存时不会调用
+    """
+    etag = make_etag(*parts)
+    headers = {'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept, Accept-Encoding'}
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304, headers=headers)
+    else:
+        body, encoding = response_cache.get(etag, negotiate_encoding(request.accept_encodings), build)
+        response = app.response_class(body, mimetype=mimetype, headers=headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    # 同一ETag对应不同压缩编码的响应体，使用弱ETag
+    response.set_etag(etag, weak=True)
+    return response
+
+def _window(df, args=None):
+    """
+    按 from/to/limit 参数确定返回区间（在升序时间索引上二分查找）
+    from/to 可以是日期字符串或epoch秒，limit 取区间内最新的若干根K线
+    args: 参数来源，默认为查询字符串
+    返回: (lo, hi)
+    """
+    args = request.args if args is None else args
+    try:
+        start = args.get('from')
+        end = args.get('to')
+        limit = args.get('limit')
+        return time_slice(
+            df['ts'].to_numpy(),
+            parse_time(start) if start else None,
+            parse_time(end, end_of_day=True) if end else None,
+            int(limit) if limit else None,
+        )
+    except ValueError as e:
+        abort(400, description=f'无效的时间区间参数: {e}')
+
+def _max_points(args=None):
+    """max_points 参数：返回数据点数上限，None表示不降采样"""
+    args = request.args if args is None else args
+    value = args.get('max_points')
+    if not value:
+        return None
+    try:
+        max_points = int(value)
+    except ValueError:
+        max_points = 0
+    if max_points < 2:
+        abort(400, description='max_points 必须为不小于2的整数')
+    return max_points
+
+def _kline_columns(df, lo, hi):
     fields = ['time', 'open', 'high', 'low', 'close']
     if 'volume' in df.columns:
         fields.append('volume')
     if 'turnover_rate' in df.columns:
         fields.append('turnover_rate')
-    ohlc = df[fields].to_dict(orient='records')
-    return jsonify(ohlc)
+    return {name: df[name].to_numpy()[lo:hi] for name in fields}
+
+def _load(code):
+    """KlineCache.load，统计 load 阶段耗时（缓存未命中时包含解析）"""
+    with _stage('load'):
+        return kline_cache.load(code)
+
+@app.route('/api/kline')
+def api_kline():
+    code = request.args.get('code')
+    layout = _layout(binary=True)
+    df, version = _load(code) if code else (None, None)
+    if df is None:
+        return _empty_response(layout)
+    lo, hi = _window(df)
+    max_points = _max_points()
+
+    def build():
+        columns = _kline_columns(df, lo, hi)
+        if max_points:
+            # 超出画布分辨率时按桶聚合K线
+            with _stage('downsample', 'kline'):
+                columns = downsample_ohlcv(columns, max_points)
+        with _stage('serialize', 'kline'):
+            return _encode_columns(columns, layout)
+
+    return _cached_response(('kline', code, version, lo, hi, max_points, layout), build, _mimetype(layout))
+
+def _indicator_columns(df, indicator, params, lo, hi, warmup=None, ctx=None):
+    result = compute_window(df, indicator, params, lo, hi, warmup, ctx)
+    return {name: result[name].to_numpy() for name in result.columns}
+
+def _compute(df, indicator, params, lo, hi, warmup=None, ctx=None):
+    """在计算池中计算指标，统计 compute 阶段耗时"""
+    with _stage('compute', indicator):
+        return compute_pool.run(_indicator_columns, df, indicator, params, lo, hi, warmup, ctx)
+
+def _downsample_indicator(columns, indicator, max_points):
+    line, flags = DOWNSAMPLE_KEYS[indicator]
+    with _stage('downsample', indicator):
+        return downsample_lines(columns, line, max_points, flags)
 
 @app.route('/api/indicator')
 def api_indicator():
     code = request.args.get('code')
     indicator = request.args.get('type')
-    df = load_kline(code)
+    layout = _layout(binary=True)
+    try:
+        params = normalize_params(indicator, request.args)
+    except ValueError as e:
+        abort(400, description=f'无效的指标参数: {e}')
+    df, version = _load(code) if code else (None, None)
+    if df is None or params is None:
+        return _empty_response(layout)
+    lo, hi = _window(df)
+    max_points = _max_points()
+    key = IndicatorCache.make_key(code, indicator, params, version, (lo, hi))
+
+    def build():
+        # SuperTrend值为0或无效的数据已在计算时置为NaN，序列化为null
+        columns = indicator_cache.get_or_compute(key, lambda: _compute(df, indicator, params, lo, hi))
+        if max_points:
+            columns = _downsample_indicator(columns, indicator, max_points)
+        with _stage('serialize', indicator):
+            return _encode_columns(columns, layout)
+
+    return _cached_response(('indicator',) + key + (max_points, layout), build, _mimetype(layout))
+
+def _batch_symbol(code, items, args, layout, max_points, results):
+    """
+    同一只股票的全部批量请求：K线只加载一次，每个指标按各自的预热长度计算（与单个接口相同，
+    因此可以共用指标缓存），数据切片起点相同的指标共用 IndicatorContext 中的 TR、滚动均值等中间结果
+    items: [(结果下标, 类型, 规范化参数)]
+    """
+    df, version = _load(code)
     if df is None:
-        return jsonify([])
-    if indicator == 'supertrend':
-        st = TechAnalysis.supertrend(df)
-        st = st.applymap(lambda x: None if pd.isna(x) else x)
-        
-        # 过滤掉SuperTrend值为0或无效的数据
-        st['supertrend'] = st['supertrend'].apply(lambda x: None if x is None or x == 0 or not isinstance(x, (int, float)) else x)
-        
-        data = st.to_dict(orient='records')
-        for row in data:
-            for k, v in row.items():
-                if isinstance(v, float) and (v != v):  # NaN检查
-                    row[k] = None
-                elif k == 'supertrend' and (v == 0 or v is None):  # 过滤0值
-                    row[k] = None
-        return jsonify(data)
-    elif indicator == 'squeeze_momentum':
-        # 获取参数，使用默认值
-        bb_length = int(request.args.get('bb_length', 20))
-        bb_mult = float(request.args.get('bb_mult', 2.0))
-        kc_length = int(request.args.get('kc_length', 20))
-        kc_mult = float(request.args.get('kc_mult', 1.5))
-        use_true_range = request.args.get('use_true_range', 'true').lower() == 'true'
-        
-        sqz = TechAnalysis.squeeze_momentum(df, bb_length, bb_mult, kc_length, kc_mult, use_true_range)
-        # 确保时间格式一致
-        sqz['time'] = df['time']  # 使用处理后的时间格式
-        sqz = sqz.applymap(lambda x: None if pd.isna(x) else x)
-        data = sqz.to_dict(orient='records')
-        for row in data:
-            for k, v in row.items():
-                if isinstance(v, float) and (v != v):
-                    row[k] = None
-        return jsonify(data)
-    elif indicator == 'ma5':
-        # 计算5日移动平均线
-        ma5 = df['close'].rolling(window=5).mean()
-        data = []
-        for i, (time, ma) in enumerate(zip(df['time'], ma5)):
-            data.append({
-                'time': time,
-                'ma': None if pd.isna(ma) else float(ma)
-            })
-        return jsonify(data)
-    elif indicator == 'ma10':
-        # 计算10日移动平均线
-        ma10 = df['close'].rolling(window=10).mean()
-        data = []
-        for i, (time, ma) in enumerate(zip(df['time'], ma10)):
-            data.append({
-                'time': time,
-                'ma': None if pd.isna(ma) else float(ma)
-            })
-        return jsonify(data)
-    return jsonify([])
+        for i, kind, params in items:
+            results[i] = {'code': code, 'type': kind, 'error': '无K线数据'}
+        return
+    lo, hi = _window(df, args)
+    contexts = {}  # 切片起点 -> IndicatorContext
+    for i, kind, params in items:
+        if kind == 'kline':
+            columns = _kline_columns(df, lo, hi)
+            if max_points:
+                with _stage('downsample', kind):
+                    columns = downsample_ohlcv(columns, max_points)
+        else:
+            key = IndicatorCache.make_key(code, kind, params, version, (lo, hi))
+            ctx = None
+            if compute_pool.shares_memory:  # 进程池中计算时中间结果无法共享，各指标单独计算
+                start = window_start(kind, params, lo)
+                ctx = contexts.get(start)
+                if ctx is None:
+                    ctx = contexts[start] = IndicatorContext(df.iloc[start:hi])
+            columns = indicator_cache.get_or_compute(key, lambda: _compute(df, kind, params, lo, hi, ctx=ctx))
+            if max_points:
+                columns = _downsample_indicator(columns, kind, max_points)
+        with _stage('serialize', kind):
+            data = columns_payload(columns, layout)
+        results[i] = {'code': code, 'type': kind, 'params': params, 'data': data}
+
+def _batch_body():
+    """POST 取请求体；GET 的 requests 参数为JSON数组，其余查询参数与请求体中的同名字段相同"""
+    if request.method == 'POST':
+        return request.get_json(silent=True)
+    body = dict(request.args.items())
+    try:
+        body['requests'] = json.loads(body.get('requests', ''))
+    except ValueError:
+        return None
+    return body
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+def api_batch():
+    """
+    批量获取多只股票的K线与指标，一次请求返回
+
+    请求体:
+    {"requests": [{"code": "HK.00700", "type": "kline"}, {"code": "HK.00700", "type": "supertrend", "params": {...}}],
+     "format"/"from"/"to"/"limit"/"max_points": 与单个接口含义相同，作用于全部请求}
+    GET 时 requests 以JSON字符串作为查询参数，浏览器可缓存并以 If-None-Match 验证
+    返回: {"results": [...]}，与 requests 一一对应，单项出错时该项为 {"code", "type", "error"}
+    """
+    body = _batch_body()
+    if not isinstance(body, dict) or not isinstance(body.get('requests'), list):
+        abort(400, description='请求体需为包含 requests 列表的JSON对象')
+    args = {name: str(value) for name, value in body.items() if name != 'requests' and value is not None}
+    layout = _layout(args)
+    max_points = _max_points(args)
+
+    specs = body['requests']
+    results = [None] * len(specs)
+    by_code = {}
+    for i, spec in enumerate(specs):
+        spec = spec if isinstance(spec, dict) else {}
+        code = spec.get('code')
+        kind = spec.get('type')
+        if not code or not kind:
+            results[i] = {'code': code, 'type': kind, 'error': '缺少 code 或 type'}
+            continue
+        params = None
+        if kind != 'kline':
+            try:
+                params = normalize_params(kind, spec.get('params'))
+            except (TypeError, ValueError) as e:
+                results[i] = {'code': code, 'type': kind, 'error': f'无效的指标参数: {e}'}
+                continue
+            if params is None:
+                results[i] = {'code': code, 'type': kind, 'error': f'未知指标类型: {kind}'}
+                continue
+        by_code.setdefault(code, []).append((i, kind, params))
+
+    def build():
+        for code, items in by_code.items():
+            _batch_symbol(code, items, args, layout, max_points, results)
+        with _stage('serialize'):
+            return dumps({'results': results})
+
+    # 各股票的数据版本与规范化后的请求决定响应内容
+    versions = tuple((code, _load(code)[1]) for code in by_code)
+    requested = tuple((code, tuple((i, kind, params and tuple(params.items())) for i, kind, params in items))
+                      for code, items in by_code.items())
+    parts = ('batch', requested, repr(results), tuple(sorted(args.items())), versions)
+    return _cached_response(parts, build, 'application/json')
+
+def _universe():
+    """
+    筛选的股票池：codes 参数（逗号分隔）> universe=local（本地全部K线）> config/code.txt
+    返回: (可加载的代码列表, 找不到数据的代码列表)
+    """
+    if request.args.get('codes'):
+        codes = [code.strip() for code in request.args['codes'].split(',') if code.strip()]
+    elif request.args.get('universe') == 'local':
+        codes = [stock['code'] for stock in get_available_stocks()]
+    else:
+        codes = load_universe(UNIVERSE_FILE)
+    resolved = []
+    missing = []
+    for code in codes:
+        found = resolve_code(DATA_DIR, code)
+        if found is None:
+            missing.append(code)
+        else:
+            resolved.append(found)
+    return resolved, missing
+
+@app.route('/api/screen')
+def api_screen():
+    """
+    在股票池上筛选满足指标条件的股票，如 condition=supertrend_buy、squeeze_fired
+    参数: condition、lookback（信号回看K线数，默认1即最新一根）、top（最多返回数）、
+         codes/universe（股票池），以及对应指标的参数
+    """
+    condition = request.args.get('condition')
+    if condition not in SCREEN_CONDITIONS:
+        abort(400, description=f'未知筛选条件: {condition}，可选: {", ".join(SCREEN_CONDITIONS)}')
+    try:
+        params = normalize_params(SCREEN_CONDITIONS[condition][0], request.args)
+        lookback = int(request.args.get('lookback', 1))
+        top = int(request.args['top']) if request.args.get('top') else None
+    except ValueError as e:
+        abort(400, description=f'无效的筛选参数: {e}')
+    if lookback < 1:
+        abort(400, description='lookback 必须为正整数')
+    codes, missing = _universe()
+    result = screener.scan(condition, codes, params, lookback, top)
+    result['missing'] = missing
+    return _json_response(dumps(result))
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    实时推送（Server-Sent Events）：订阅一只或多只股票的新K线、盘中更新的K线及指标增量
+    参数: code 或 codes（逗号分隔）
+    事件:
+    - bar: {"code", "seq", "replace", "bar": {...}, "indicators": {指标名: 该K线的值}}，
+      replace 为 true 时替换最后一根K线，否则追加；订阅时先收到最新一根K线的状态
+    - reset: 连接消费过慢被断开，客户端需重新加载全量数据
+    """
+    codes = request.args.get('codes') or request.args.get('code') or ''
+    codes = [code.strip() for code in codes.split(',') if code.strip()]
+    if not codes:
+        abort(400, description='缺少 code 或 codes 参数')
+    sub, missing = stream_hub.subscribe(codes)
+    if not sub.codes:
+        abort(404, description=f'无K线数据: {", ".join(missing)}')
+
+    def generate():
+        try:
+            yield from sub.frames(keepalive=STREAM_KEEPALIVE)
+        finally:
+            stream_hub.unsubscribe(sub)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    REQUESTS.inc(endpoint, str(response.status_code))
+    if response.status_code == 200 and response.content_length is not None:
+        # 只按已知的指标类型分组，避免任意的 type 参数产生大量标签
+        indicator = request.args.get('type', '') if endpoint == 'api_indicator' else ''
+        RESPONSE_BYTES.observe(response.content_length, endpoint, indicator if indicator in INDICATOR_PARAMS else '')
+    return response
+
+def _cache_metrics():
+    """各缓存的命中、占用与推送连接数，输出 /metrics 时读取"""
+    caches = {'kline': kline_cache.stats(), 'indicator': indicator_cache.stats(), 'response': response_cache.stats()}
+    def samples(field):
+        return [({'cache': name}, stats[field]) for name, stats in caches.items()]
+    ratios = [({'cache': name}, stats['hits'] / (stats['hits'] + stats['misses']) if stats['hits'] + stats['misses'] else 0.0)
+              for name, stats in caches.items()]
+    stream = stream_hub.stats()
+    return [
+        ('sesame_cache_hits_total', 'counter', '缓存命中次数', samples('hits')),
+        ('sesame_cache_misses_total', 'counter', '缓存未命中次数', samples('misses')),
+        ('sesame_cache_hit_ratio', 'gauge', '缓存命中率（进程启动以来）', ratios),
+        ('sesame_cache_bytes', 'gauge', '缓存占用内存（字节）', samples('bytes')),
+        ('sesame_cache_evictions_total', 'counter', '缓存淘汰次数', samples('evictions')),
+        ('sesame_stream_subscribers', 'gauge', '推送连接订阅的股票数之和', [({}, stream['subscribers'])]),
+        ('sesame_stream_symbols', 'gauge', '有推送流的股票数', [({}, stream['streams'])]),
+    ]
+
+registry.add_collector(_cache_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的请求耗时、阶段耗时、响应大小与缓存统计"""
+    return app.response_class(registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def start_stream_simulator():
+    """
+    环境变量 STREAM_SIMULATE（秒）不为空时，启动本地模拟行情，按该间隔向已订阅的股票推送随机成交，
+    用于在没有实时行情源时调试推送与前端更新
+    """
+    interval = float(os.environ.get('STREAM_SIMULATE', 0))
+    if not interval:
+        return None
+    feed = SimulatedTickFeed(stream_hub, interval=interval)
+    feed.start()
+    return feed
+
+def start_stream_watcher():
+    """
+    环境变量 STREAM_WATCH_INTERVAL（秒）不为空时，定期检查已订阅股票的K线文件，把其他进程
+    （如独立运行的刷新服务）写入的新K线推送给本进程的订阅者
+    """
+    interval = float(os.environ.get('STREAM_WATCH_INTERVAL', 0))
+    if not interval:
+        return None
+    watcher = StreamWatcher(stream_hub, interval=interval)
+    watcher.start()
+    return watcher
+
+def _refresh_service():
+    """
+    环境变量 REFRESH_INTERVAL（秒）不为空时，创建定期从富途刷新股票池K线数据的服务，否则返回None
+    REFRESH_WORKERS 为并发数（默认2），FUTU_HOST/FUTU_PORT 为 OpenD 地址
+    """
+    interval = int(os.environ.get('REFRESH_INTERVAL', 0))
+    if not interval:
+        return None
+    return RefreshService(
+        load_universe(UNIVERSE_FILE), DATA_DIR,
+        max_workers=int(os.environ.get('REFRESH_WORKERS', 2)),
+        interval=interval,
+        store=kline_cache.store,
+        futu_host=os.environ.get('FUTU_HOST', '127.0.0.1'),
+        futu_port=int(os.environ.get('FUTU_PORT', 11111)),
+        on_update=stream_hub.sync,  # 刷新到新K线后推送给订阅者
+    )
+
+def start_refresher():
+    """在后台线程中运行刷新服务（见 _refresh_service），未配置时返回None"""
+    service = _refresh_service()
+    if service is not None:
+        service.start()
+    return service
+
+def run_refresher():
+    """
+    在当前进程前台运行刷新服务，用于多 worker 部署时由单独的进程负责刷新（见 gunicorn.conf.py），
+    各 worker 通过 KlineCache 的文件版本检查与 StreamWatcher 发现更新
+    """
+    service = _refresh_service()
+    if service is None:
+        logger.warning("未设置 REFRESH_INTERVAL，不启动刷新服务")
+        return
+    service.run_forever()
+
+def warm_caches(codes=None, indicators=WARM_INDICATORS):
+    """
+    预热缓存：加载K线（同时生成列式缓存文件），并计算全部K线上的默认参数指标，
+    与不带 from/to/limit 的图表请求使用相同的缓存键
+
+    在 gunicorn preload_app 模式下于 fork 前调用，各 worker 以写时复制的方式共享已加载的数据；
+    指标直接在当前线程计算，不经过计算池，避免 fork 前创建执行器
+
+    参数:
+    codes: 股票代码，默认为本地全部K线与 config/code.txt 的股票池
+    indicators: 指标名列表
+    返回: {'codes', 'indicators', 'missing', 'seconds'}
+    """
+    start = time.perf_counter()
+    if codes is None:
+        codes = [stock['code'] for stock in get_available_stocks()]
+        codes += [code for code in (resolve_code(DATA_DIR, code) for code in load_universe(UNIVERSE_FILE))
+                  if code is not None and code not in codes]
+    loaded = computed = 0
+    missing = []
+    for code in codes:
+        df, version = kline_cache.load(code)
+        if df is None:
+            missing.append(code)
+            continue
+        loaded += 1
+        for indicator in indicators:
+            params = normalize_params(indicator)
+            if params is None:
+                continue
+            key = IndicatorCache.make_key(code, indicator, params, version, (0, len(df)))
+            indicator_cache.get_or_compute(key, lambda: _indicator_columns(df, indicator, params, 0, len(df)))
+            computed += 1
+    return {'codes': loaded, 'indicators': computed, 'missing': missing,
+            'seconds': round(time.perf_counter() - start, 3)}
+
+def start_services(refresher=True):
+    """
+    启动后台服务：刷新服务（refresher=True 时）、模拟行情与数据更新推送，均由环境变量控制是否启用
+    """
+    if refresher:
+        start_refresher()
+    start_stream_simulator()
+    start_stream_watcher()
+
+def create_app(warm=None, services=False):
+    """
+    生产部署入口（见 wsgi.py）：预热缓存并按需启动后台服务，返回本模块的 app
+
+    参数:
+    warm: 是否预热缓存，None 时由环境变量 WARM_CACHE 决定（默认开启）
+    services: 是否在当前进程启动后台服务；gunicorn 多 worker 时由 gunicorn.conf.py 在各 worker 中启动
+    """
+    if warm is None:
+        warm = os.environ.get('WARM_CACHE', '1') not in ('0', 'false', '')
+    if warm:
+        stats = warm_caches()
+        logger.info("预热 %d 只股票、%d 个指标，耗时 %ss", stats['codes'], stats['indicators'], stats['seconds'])
+    if services:
+        start_services()
+    return app
 
 if __name__ == '__main__':
+    # debug 模式的重载器会启动两个进程，只在实际提供服务的子进程中刷新
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services()
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:application
+
+- preload_app：主进程导入 wsgi 并预热缓存后再 fork，worker 以写时复制方式共享已加载的K线与指标
+- gthread worker：SSE 推送连接会一直占用一个线程，THREADS 需大于预期的并发推送连接数
+- 刷新服务只在一个单独的进程中运行，避免每个 worker 重复请求富途；worker 通过
+  KlineCache 的文件版本检查与 StreamWatcher（STREAM_WATCH_INTERVAL，默认30秒）发现更新
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 32))
+timeout = int(os.environ.get('TIMEOUT', 120))
+keepalive = 5
+preload_app = True
+
+os.environ.setdefault('STREAM_WATCH_INTERVAL', '30')
+
+_refresher = None
+
+
+def when_ready(server):
+    # 此时应用已预加载，从主进程 fork 出刷新进程
+    global _refresher
+    if not os.environ.get('REFRESH_INTERVAL'):
+        return
+    from app import run_refresher
+    _refresher = multiprocessing.Process(target=run_refresher, name='kline-refresher', daemon=True)
+    _refresher.start()
+    server.log.info('刷新服务进程已启动 (pid: %s)', _refresher.pid)
+
+
+def post_fork(server, worker):
+    from app import start_services
+    start_services(refresher=False)
+
+
+def on_exit(server):
+    if _refresher is not None and _refresher.is_alive():
+        _refresher.terminate()
+        _refresher.join(5)
@@ -0,0 +1,64 @@
+"""
+指标计算池：缓存未命中时的指标计算交给有界的线程池或进程池执行。
+
+- 线程池（默认）：限制同时进行的重计算数量，其余请求线程仍可处理缓存命中、304 等快请求；
+  同一批量请求内的指标可继续共用 IndicatorContext
+- 进程池：计算不受 GIL 限制，K线与结果经 pickle 在进程间传递，适合 hurst 等耗时指标较多的部署
+- 执行器在第一次使用时才创建，fork 出的子进程（如 gunicorn worker）会丢弃继承的执行器重新创建
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+POOL_KINDS = ('thread', 'process')
+
+
+class ComputePool:
+    """
+    参数:
+    workers: 并发计算数，0 表示在请求线程中直接计算
+    kind: 'thread' 或 'process'
+    """
+
+    def __init__(self, workers=0, kind='thread'):
+        if kind not in POOL_KINDS:
+            raise ValueError(f'未知计算池类型: {kind}，可选: {", ".join(POOL_KINDS)}')
+        self.workers = workers
+        self.kind = kind
+        self._executor = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget)
+
+    @property
+    def shares_memory(self):
+        """计算是否在本进程内进行（可以传入 IndicatorContext 等不便跨进程的对象）"""
+        return self.workers == 0 or self.kind == 'thread'
+
+    def run(self, fn, *args):
+        """
+        执行 fn(*args) 并等待结果；进程池时 fn 须为模块级函数
+        """
+        if self.workers == 0:
+            return fn(*args)
+        return self._get_executor().submit(fn, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='compute')
+            return self._executor
+
+    def _forget(self):
+        # 父进程的工作线程/子进程不会随 fork 复制，子进程中需重新创建
+        self._executor = None
+        self._lock = threading.Lock()
@@ -0,0 +1,216 @@
+"""
+从富途下载日K线并保存为本地CSV。
+
+futu 为可选依赖，只在真正需要下载时才导入；图表服务只读取本地CSV，不需要安装。
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from indicator.kline_store import ColumnarStore, write_csv_atomic
+except ImportError:  # 在indicator目录下直接运行脚本时
+    from kline_store import ColumnarStore, write_csv_atomic
+
+
+logger = logging.getLogger(__name__)
+
+
+def open_quote_context(host='127.0.0.1', port=11111):
+    """打开富途行情连接"""
+    from futu import OpenQuoteContext
+    return OpenQuoteContext(host=host, port=port)
+
+
+class DataLoader:
+    """
+    单只股票的日K线加载器
+
+    参数:
+    code: 形如 'HK.09660'
+    csv_filename: 本地CSV路径，默认为当前目录下的 <code>_daily.csv
+    quote_ctx: 外部传入的行情连接（如 refresher.QuoteContextPool 中的连接），由调用方负责关闭；
+               为None时每次下载单独打开并关闭一个连接
+    rate_limiter: 可选的限流器，每次请求富途前调用其 acquire()
+    """
+
+    def __init__(self, code, csv_filename=None, futu_host='127.0.0.1', futu_port=11111, store=None,
+                 quote_ctx=None, rate_limiter=None):
+        self.code = code  # 形如 'HK.09660'
+        if csv_filename is None:
+            self.csv_filename = f"{code.replace('.', '_')}_daily.csv"
+        else:
+            self.csv_filename = csv_filename
+        self.futu_host = futu_host
+        self.futu_port = futu_port
+        self.store = store if store is not None else ColumnarStore()
+        self.quote_ctx = quote_ctx
+        self.rate_limiter = rate_limiter
+
+    def load(self, use_cache=True):
+        """
+        加载数据，优先使用本地缓存（csv及其列式副本），否则从富途下载。
+        返回: pd.DataFrame，time_key列为datetime64
+        """
+        if use_cache and os.path.exists(self.csv_filename):
+            logger.debug("使用本地缓存: %s", self.csv_filename)
+            return self.store.load(self.csv_filename)
+        else:
+            logger.info("本地无缓存，尝试从富途下载: %s", self.code)
+            return self._download_from_futu()
+
+    def refresh(self, full=False):
+        """
+        增量更新本地CSV：只请求本地最后一根K线及之后的数据，按时间去重后合并，原子替换原文件，
+        并预先生成列式副本；数据没有变化时不改写文件。本地没有数据或 full=True 时下载完整历史
+        返回: dict，fetched 为本次从富途获取的K线数，merged 为新增到本地的K线数，rows 为合并后的总数，
+              changed 为本地数据是否变化（有新增K线或重叠K线被修正）；失败时返回None
+        """
+        last_time = None if full else self._last_time()
+        if last_time is None:
+            data = self._download_from_futu()
+            if data is None:
+                return None
+            result = {'code': self.code, 'fetched': len(data), 'merged': len(data), 'rows': len(data),
+                      'changed': True}
+        else:
+            result = self._update_from_futu(last_time)
+            if result is None:
+                return None
+        self.store.sync(self.csv_filename)
+        return result
+
+    def _last_time(self):
+        """本地数据最后一根K线的日期（'%Y-%m-%d'），没有本地数据时返回None"""
+        if not os.path.exists(self.csv_filename):
+            return None
+        try:
+            meta, arrays = self.store.columns(self.csv_filename)
+        except (OSError, ValueError) as e:
+            logger.warning("读取本地数据失败，改为完整下载: %s", e)
+            return None
+        for name in ('time_key', 'time'):
+            if name in arrays and len(arrays[name]) > 0:
+                return pd.Timestamp(int(arrays[name].max()), unit='s').strftime('%Y-%m-%d')
+        return None
+
+    def _request_history_kline(self, quote_ctx, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        result = quote_ctx.request_history_kline(self.code, ktype='K_DAY', **kwargs)
+        if isinstance(result, tuple) and len(result) >= 2:
+            return result
+        raise RuntimeError(f"返回值格式异常: {result}")
+
+    def _fetch(self, quote_ctx, start=None):
+        """
+        按 page_req_key 翻页取回全部K线
+        返回: pd.DataFrame（可能为空），富途返回错误时为None
+        """
+        pages = []
+        page_req_key = None
+        while True:
+            result = self._request_history_kline(quote_ctx, start=start, page_req_key=page_req_key)
+            ret, data = result[0], result[1]
+            if ret != 0:
+                logger.warning("%s 获取数据失败: %s", self.code, data)
+                return None
+            if data is not None and not data.empty:
+                pages.append(data)
+            page_req_key = result[2] if len(result) >= 3 else None
+            if page_req_key is None:
+                break
+        return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+
+    def _with_quote_ctx(self, fetch):
+        quote_ctx = self.quote_ctx or open_quote_context(self.futu_host, self.futu_port)
+        try:
+            return fetch(quote_ctx)
+        except Exception as e:
+            logger.exception("%s 获取或保存数据时发生异常: %s", self.code, e)
+            return None
+        finally:
+            if quote_ctx is not self.quote_ctx:
+                quote_ctx.close()
+
+    def _download(self, quote_ctx):
+        data = self._fetch(quote_ctx)
+        if data is None:
+            return None
+        if data.empty:
+            logger.warning("获取数据失败: %s 无数据", self.code)
+            return None
+        logger.info("下载成功，保存为 %s", self.csv_filename)
+        # 先写临时文件再rename，读取方不会读到写了一半的CSV
+        write_csv_atomic(data, self.csv_filename)
+        return data
+
+    def _download_from_futu(self):
+        return self._with_quote_ctx(self._download)
+
+    def _update_from_futu(self, last_time):
+        def fetch(quote_ctx):
+            # 从本地最后一天开始请求，重叠的一根用新数据覆盖（盘中保存的K线收盘后会变化）
+            new = self._fetch(quote_ctx, start=last_time)
+            if new is None:
+                return None
+            old = pd.read_csv(self.csv_filename)
+            if new.empty:
+                return {'code': self.code, 'fetched': 0, 'merged': 0, 'rows': len(old), 'changed': False}
+            if _overlap_revised(old, new, last_time, PRICE_COLUMNS):
+                # 除权除息或拆合股后富途会重新计算之前全部K线的前复权价格，新旧数据不再可以拼接
+                logger.info("%s 重叠K线价格与本地不一致（复权基准变化），重新下载完整历史", self.code)
+                data = self._download(quote_ctx)
+                if data is None:
+                    return None
+                return {'code': self.code, 'fetched': len(new) + len(data), 'merged': len(data) - len(old),
+                        'rows': len(data), 'changed': True}
+            merged = pd.concat([old, new], ignore_index=True)
+            stamps = pd.to_datetime(merged[_time_column(merged)])
+            keep = ~stamps.duplicated(keep='last')
+            merged = merged.loc[keep].iloc[stamps[keep].argsort(kind='stable')]
+            added = len(merged) - len(old)
+            changed = added > 0 or _overlap_revised(old, new, last_time)
+            if changed:
+                # 数据未变时不改写CSV，文件版本不变，各级缓存与实时推送都不需要失效
+                write_csv_atomic(merged, self.csv_filename)
+            logger.info("增量更新 %s: 获取 %d 根，新增 %d 根", self.code, len(new), added)
+            return {'code': self.code, 'fetched': len(new), 'merged': added, 'rows': len(merged),
+                    'changed': changed}
+        return self._with_quote_ctx(fetch)
+
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
+
+def _time_column(df):
+    return 'time_key' if 'time_key' in df.columns else 'time'
+
+
+def _overlap_row(df, day):
+    """df 中日期为 day 的最后一行，不存在时返回None"""
+    rows = df[pd.to_datetime(df[_time_column(df)]).dt.normalize() == day]
+    return rows.iloc[-1] if len(rows) else None
+
+
+def _overlap_revised(old, new, last_time, columns=None):
+    """
+    重新获取的重叠K线（last_time 当天）与本地保存的是否不同，数值列允许浮点误差
+    columns: 只比较这些列，默认为两边共有的全部列
+    本地或新数据缺少这根K线时无法判断，视为未变化
+    """
+    day = pd.Timestamp(last_time)
+    old_row, new_row = _overlap_row(old, day), _overlap_row(new, day)
+    if old_row is None or new_row is None:
+        return False
+    columns = [c for c in (columns or new.columns) if c in old.columns and c in new.columns]
+    for column in columns:
+        a, b = old_row[column], new_row[column]
+        if pd.api.types.is_number(a) and pd.api.types.is_number(b):
+            if not np.isclose(float(a), float(b), rtol=1e-9, atol=1e-9, equal_nan=True):
+                return True
+        elif str(a) != str(b):
+            return True
+    return False
@@ -0,0 +1,126 @@
+"""
+宽缩放级别下的服务端降采样，保证返回的数据点数不超过画布能显示的数量。
+
+- K线：按等宽分桶聚合，open取首、high取最大、low取最小、close取末、volume求和
+- 指标线：LTTB (Largest-Triangle-Three-Buckets) 选点，保留曲线形状
+"""
+import numpy as np
+
+# K线各列的聚合方式，未列出的列取桶内第一根
+OHLCV_AGG = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'turnover_rate': 'sum',
+}
+
+
+def ohlcv_buckets(n, max_points):
+    """
+    等宽分桶
+    返回: (starts, ends)，第k个桶为 [starts[k], ends[k])，桶数不超过max_points
+    """
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.append(starts[1:], n)
+    return starts, ends
+
+
+def downsample_ohlcv(columns, max_points):
+    """
+    参数:
+    columns: {列名: 数组}，如 time/open/high/low/close/volume
+    max_points: 最大K线数
+    返回: 聚合后的 {列名: 数组}；数据量不超过max_points时原样返回
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    if n <= max_points:
+        return columns
+    starts, ends = ohlcv_buckets(n, max_points)
+    result = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        how = OHLCV_AGG.get(name, 'first')
+        if how == 'max':
+            result[name] = np.maximum.reduceat(values, starts)
+        elif how == 'min':
+            result[name] = np.minimum.reduceat(values, starts)
+        elif how == 'sum':
+            result[name] = np.add.reduceat(values, starts)
+        elif how == 'last':
+            result[name] = values[ends - 1]
+        else:
+            result[name] = values[starts]
+    return result
+
+
+def lttb_buckets(n, max_points):
+    """
+    LTTB 分桶边界：首尾两点固定，中间 n-2 个点分为 max_points-2 个桶
+    返回: edges，第i个桶为 [edges[i], edges[i+1])，且 edges[-1] == n-1
+    """
+    return np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+
+
+def lttb_indices(y, max_points):
+    """
+    LTTB 选点：每个桶内选取与上一选中点、下一桶均值构成三角形面积最大的点。
+    NaN 点不参与比较，整桶无有效面积时取桶内第一个点（如指标预热期）。
+    返回: 选中点的下标数组（升序）
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n) if n <= max_points else np.array([0, n - 1])
+
+    edges = lttb_buckets(n, max_points)
+    finite = np.isfinite(y)
+    y0 = np.where(finite, y, 0.0)
+    # 用前缀和求下一个桶的均值，避免在循环中重复求和
+    c_y = np.concatenate([[0.0], np.cumsum(y0)])
+    c_n = np.concatenate([[0], np.cumsum(finite)])
+    c_x = np.concatenate([[0.0], np.cumsum(np.where(finite, np.arange(n, dtype=np.float64), 0.0))])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo = hi
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        count = c_n[nhi] - c_n[nlo]
+        if count > 0 and finite[a]:
+            avg_x = (c_x[nhi] - c_x[nlo]) / count
+            avg_y = (c_y[nhi] - c_y[nlo]) / count
+            xs = np.arange(lo, hi, dtype=np.float64)
+            area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+            area[~finite[lo:hi]] = -1.0
+            pick = lo + int(np.argmax(area))
+        else:
+            pick = lo + int(np.argmax(finite[lo:hi])) if finite[lo:hi].any() else lo
+        selected[i + 1] = pick
+        a = pick
+    return selected
+
+
+def downsample_lines(columns, key, max_points, flags=()):
+    """
+    以 key 列为准做 LTTB 选点，其余列取相同下标；
+    flags 中的信号列（如买卖点）按桶取最大值，避免信号被跳过
+    返回: 降采样后的 {列名: 数组}
+    """
+    y = np.asarray(columns[key], dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return columns
+    idx = lttb_indices(y, max_points)
+    result = {name: np.asarray(values)[idx] for name, values in columns.items()}
+    if flags and len(idx) == max_points and max_points >= 3:
+        edges = lttb_buckets(n, max_points)
+        starts = np.concatenate([[0], edges])  # 首点、各中间桶、末点
+        for name in flags:
+            result[name] = np.maximum.reduceat(np.asarray(columns[name]), starts)
+    return result
@@ -0,0 +1,79 @@
+"""
+数据接口的HTTP缓存语义：
+
+- ETag 由数据版本与规范化后的请求参数生成，不需要先计算响应；If-None-Match 命中时直接返回304
+- 按 Accept-Encoding 协商 br（需安装 brotli）或 gzip 压缩
+- 原始与压缩后的响应体按 (ETag, 编码) 缓存，热门股票的重复请求不再序列化与压缩
+"""
+import gzip
+import hashlib
+
+from indicator.result_cache import IndicatorCache
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024  # 小于该长度的响应不压缩
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 压缩结果会被缓存，但首个请求仍需同步压缩，不使用最高质量
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def make_etag(*parts):
+    """由数据版本与请求参数生成ETag（不含引号），parts 需有稳定的 repr"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def negotiate_encoding(accept_encodings):
+    """
+    参数:
+    accept_encodings: werkzeug 的 request.accept_encodings
+    返回: 'br'、'gzip' 或None（不压缩）
+    """
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f'不支持的编码: {encoding}')
+
+
+# 历史区间同样可能变化（刷新覆盖重叠K线、复权基准变化会改写全部历史），
+# 所有响应都由浏览器每次向服务端验证ETag，未变化时为304，几乎不传输数据
+CACHE_CONTROL = 'no-cache'
+
+
+class ResponseBodyCache:
+    """
+    响应体缓存，以字节数为上限按LRU淘汰；键为 (ETag, 编码)，原始响应体的编码为None
+
+    参数:
+    max_bytes: 内存上限
+    compressor: (响应体, 编码) -> 压缩后的响应体，默认为 compress，可替换为带耗时统计的版本
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, compressor=compress):
+        self.cache = IndicatorCache(max_bytes=max_bytes)
+        self.compressor = compressor
+
+    def get(self, etag, encoding, build):
+        """
+        参数:
+        build: 无参函数，生成原始响应体（bytes）
+        返回: (响应体, 实际使用的编码)，响应体过小时不压缩，编码为None
+        """
+        body = self.cache.get_or_compute((etag, None), build)
+        if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+            return body, None
+        return self.cache.get_or_compute((etag, encoding), lambda: self.compressor(body, encoding)), encoding
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
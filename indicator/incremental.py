@@ -0,0 +1,558 @@
+"""
+增量（只追加）指标计算：新K线到达时以 O(1) 推进状态，而不是对全部历史重新计算。
+
+- 各指标对象可由全量计算结果播种（seed），之后逐根 update
+- state_dict()/from_state() 可把状态保存为 JSON 兼容的 dict，用于检查点与恢复
+- 各滑动窗口记录最近一次 push 的撤销信息（几个标量与被移出的元素），盘中替换最后一根K线时
+  逐个撤销再重新推进，不复制整个窗口
+- 输出与 TechAnalysis 的全量计算一致（滚动和的累加顺序不同，浮点末位可能有差异）
+"""
+import copy
+import math
+from collections import deque
+
+import numpy as np
+
+from indicator.indicators import INDICATOR_PARAMS, warmup_bars
+from indicator.kernels import supertrend_kernel
+
+NAN = float('nan')
+
+# 支持增量计算的指标（hurst 等窗口分析指标每次都需要整段窗口，不做增量）
+INCREMENTAL_INDICATORS = ('supertrend', 'squeeze_momentum', 'ma5', 'ma10')
+
+# 每推进这么多次重新求和一次，防止滚动和的舍入误差累积
+RESUM_INTERVAL = 1024
+
+
+def _isnan(value):
+    return value is None or value != value
+
+
+class RollingWindow:
+    """
+    定长滑动窗口，维护平移后的 Σx 与 Σx²，O(1) 给出均值与样本标准差。
+    窗口未满或含 NaN 时输出 NaN，与 pandas rolling(window).mean()/std() 一致。
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.values = deque()
+        self.shift = None  # 平移量，减小 Σx² 的相消误差
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.nan_count = 0
+        self.updates = 0
+        self._undo = None
+
+    def push(self, value):
+        """加入新值，返回被移出窗口的旧值（窗口未满时为None）"""
+        value = NAN if value is None else float(value)
+        undo = (self.shift, self.sum, self.sumsq, self.nan_count)
+        if self.shift is None and not _isnan(value):
+            self.shift = value
+        self.values.append(value)
+        self._add(value, 1)
+        popped = None
+        if len(self.values) > self.length:
+            popped = self.values.popleft()
+            self._add(popped, -1)
+        self.updates += 1
+        if self.updates % RESUM_INTERVAL == 0:
+            self._resum()
+        self._undo = undo + (popped,)
+        return popped
+
+    def undo(self):
+        """撤销最近一次 push（只保留一次）"""
+        self.shift, self.sum, self.sumsq, self.nan_count, popped = self._undo
+        self._undo = None
+        self.values.pop()
+        if popped is not None:
+            self.values.appendleft(popped)
+        self.updates -= 1
+
+    def full(self):
+        return len(self.values) == self.length and self.nan_count == 0
+
+    def mean(self):
+        if not self.full():
+            return NAN
+        return self.shift + self.sum / self.length
+
+    def std(self):
+        if not self.full() or self.length < 2:
+            return NAN
+        var = (self.sumsq - self.sum * self.sum / self.length) / (self.length - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def _add(self, value, sign):
+        if _isnan(value):
+            self.nan_count += sign
+            return
+        d = value - self.shift
+        self.sum += sign * d
+        self.sumsq += sign * d * d
+
+    def _resum(self):
+        self.sum = self.sumsq = 0.0
+        self.nan_count = 0
+        for value in self.values:
+            self._add(value, 1)
+
+    def state_dict(self):
+        return {'length': self.length, 'values': list(self.values), 'shift': self.shift, 'updates': self.updates}
+
+    @classmethod
+    def from_state(cls, state):
+        window = cls(state['length'])
+        window.shift = state['shift']
+        window.values = deque(state['values'])
+        window.updates = state['updates']
+        window._resum()
+        return window
+
+
+class RollingExtreme:
+    """单调队列实现的滑动最大/最小值，均摊 O(1)"""
+
+    def __init__(self, length, mode='max'):
+        self.length = length
+        self.mode = mode
+        self.index = 0
+        self.queue = deque()  # (下标, 值)，值单调
+        self.nan_index = -1   # 最近一个 NaN 的下标
+        self._undo = None
+
+    def push(self, value):
+        value = NAN if value is None else float(value)
+        nan_index = self.nan_index
+        dominated = []  # 被新值淘汰的队尾元素
+        appended = False
+        if _isnan(value):
+            self.nan_index = self.index
+        else:
+            better = (lambda a, b: a <= b) if self.mode == 'max' else (lambda a, b: a >= b)
+            while self.queue and better(self.queue[-1][1], value):
+                dominated.append(self.queue.pop())
+            self.queue.append((self.index, value))
+            appended = True
+        expired = []  # 移出窗口的队首元素
+        while self.queue and self.queue[0][0] <= self.index - self.length:
+            expired.append(self.queue.popleft())
+        self.index += 1
+        self._undo = (nan_index, dominated, appended, expired)
+
+    def undo(self):
+        """撤销最近一次 push（只保留一次），按相反顺序恢复队列"""
+        self.nan_index, dominated, appended, expired = self._undo
+        self._undo = None
+        self.index -= 1
+        self.queue.extendleft(reversed(expired))
+        if appended:
+            self.queue.pop()
+        self.queue.extend(reversed(dominated))
+
+    def value(self):
+        if self.index < self.length or self.nan_index > self.index - 1 - self.length or not self.queue:
+            return NAN
+        return self.queue[0][1]
+
+    def state_dict(self):
+        return {'length': self.length, 'mode': self.mode, 'index': self.index,
+                'queue': [list(item) for item in self.queue], 'nan_index': self.nan_index}
+
+    @classmethod
+    def from_state(cls, state):
+        ext = cls(state['length'], state['mode'])
+        ext.index = state['index']
+        ext.queue = deque(tuple(item) for item in state['queue'])
+        ext.nan_index = state['nan_index']
+        return ext
+
+
+class RollingLinreg:
+    """
+    滑动线性回归端点值（与 kernels.rolling_linreg 定义相同），
+    递推维护窗口内 Σy 与 Σx·y，窗口整体左移一位时：
+        Σx·y' = Σx·y - (Σy - y_old) + (length-1)·y_new
+    """
+
+    def __init__(self, length, offset=0):
+        self.window = RollingWindow(length)
+        self.offset = offset
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        self._undo = None
+
+    def push(self, value):
+        window = self.window
+        value = NAN if value is None else float(value)
+        self._undo = (self.sum_y, self.sum_xy)
+        popped = window.push(value)
+        if (popped is None or window.nan_count or _isnan(popped) or _isnan(self.sum_y)
+                or window.updates % RESUM_INTERVAL == 0):
+            self._resum()
+            return
+        self.sum_xy = self.sum_xy - (self.sum_y - popped) + (window.length - 1) * value
+        self.sum_y = self.sum_y - popped + value
+
+    def undo(self):
+        self.window.undo()
+        self.sum_y, self.sum_xy = self._undo
+
+    def value(self):
+        window = self.window
+        length = window.length
+        if not window.full() or length < 2:
+            return NAN
+        sum_x = length * (length - 1) / 2.0
+        sum_xx = (length - 1) * length * (2 * length - 1) / 6.0
+        slope = (self.sum_xy - sum_x * self.sum_y / length) / (sum_xx - sum_x * sum_x / length)
+        intercept = (self.sum_y - slope * sum_x) / length
+        return intercept + slope * (length - 1 - self.offset)
+
+    def _resum(self):
+        values = self.window.values
+        if self.window.nan_count:
+            self.sum_y = self.sum_xy = NAN
+            return
+        self.sum_y = sum(values)
+        self.sum_xy = sum(k * v for k, v in enumerate(values))
+
+    def state_dict(self):
+        return {'window': self.window.state_dict(), 'offset': self.offset}
+
+    @classmethod
+    def from_state(cls, state):
+        reg = cls(state['window']['length'], state['offset'])
+        reg.window = RollingWindow.from_state(state['window'])
+        reg._resum()
+        return reg
+
+
+def _true_range(high, low, prev_close):
+    """真实波幅，第一根K线没有前收盘价时取 high-low（与 pandas max(axis=1) 跳过NaN一致）"""
+    if prev_close is None:
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class IncrementalMA:
+    """简单移动平均，与 close.rolling(window=period).mean() 一致"""
+
+    name = 'ma'
+
+    def __init__(self, period):
+        self.period = period
+        self.window = RollingWindow(period)
+
+    def seed(self, df):
+        """窗口指标的状态只取决于最近 period 根K线，回放尾部即可"""
+        for close in df['close'].to_numpy()[-self.period:].tolist():
+            self.window.push(close)
+
+    def update(self, bar):
+        self.window.push(bar['close'])
+        ma = self.window.mean()
+        return {'time': bar.get('time'), 'ma': None if _isnan(ma) else ma}
+
+    def undo(self):
+        """撤销最近一次 update"""
+        self.window.undo()
+
+    def state_dict(self):
+        return {'period': self.period, 'window': self.window.state_dict()}
+
+    @classmethod
+    def from_state(cls, state):
+        ma = cls(state['period'])
+        ma.window = RollingWindow.from_state(state['window'])
+        return ma
+
+
+class IncrementalSuperTrend:
+    """
+    SuperTrend 增量计算。状态为上一根K线的收盘价、调整后的上下轨、趋势方向，
+    以及最近 period 根 TR（用于 ATR）。
+    """
+
+    name = 'supertrend'
+
+    def __init__(self, period=10, multiplier=3.0):
+        self.period = period
+        self.multiplier = multiplier
+        self.tr = RollingWindow(period)
+        self.prev_close = None
+        self.up_adj = None
+        self.dn_adj = None
+        self.trend = None
+        self._undo = None
+
+    def seed(self, df):
+        """SuperTrend 为递推指标，用全量计算（与 TechAnalysis 相同的内核）得到最后状态"""
+        high = df['high'].to_numpy(np.float64)
+        low = df['low'].to_numpy(np.float64)
+        close = df['close'].to_numpy(np.float64)
+        if len(close) == 0:
+            return
+        prev_close = np.concatenate([[np.nan], close[:-1]])
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        atr = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            atr[self.period - 1:] = np.convolve(tr, np.ones(self.period) / self.period, mode='valid')
+        src = (high + low) / 2
+        up_adj, dn_adj, trend = supertrend_kernel(close, src - self.multiplier * atr, src + self.multiplier * atr)
+        for value in tr[-self.period:].tolist():
+            self.tr.push(value)
+        self.prev_close = float(close[-1])
+        self.up_adj = float(up_adj[-1])
+        self.dn_adj = float(dn_adj[-1])
+        self.trend = float(trend[-1])
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        self._undo = (self.prev_close, self.up_adj, self.dn_adj, self.trend)
+        self.tr.push(_true_range(high, low, self.prev_close))
+        atr = self.tr.mean()
+        src = (high + low) / 2
+        up = src - self.multiplier * atr
+        dn = src + self.multiplier * atr
+
+        prev_trend = self.trend
+        if self.trend is None:
+            # 第一根K线
+            up_adj, dn_adj, trend = up, dn, 1.0
+        else:
+            # 与 kernels._supertrend_loop 的单步逻辑相同
+            up_adj = up
+            if not (self.prev_close <= self.up_adj) and self.up_adj > up_adj:
+                up_adj = self.up_adj
+            dn_adj = dn
+            if not (self.prev_close >= self.dn_adj) and self.dn_adj < dn_adj:
+                dn_adj = self.dn_adj
+            if self.trend == -1 and close > self.dn_adj:
+                trend = 1.0
+            elif self.trend == 1 and close < self.up_adj:
+                trend = -1.0
+            else:
+                trend = self.trend
+        self.prev_close, self.up_adj, self.dn_adj, self.trend = close, up_adj, dn_adj, trend
+
+        st = up_adj if trend == 1 else dn_adj
+        return {
+            'time': bar.get('time'),
+            'supertrend': st if st > 0 else None,  # NaN 比较为False，同样输出None
+            'trend': int(trend),
+            'buy': int(trend == 1 and prev_trend == -1),
+            'sell': int(trend == -1 and prev_trend == 1),
+        }
+
+    def undo(self):
+        """撤销最近一次 update"""
+        self.tr.undo()
+        self.prev_close, self.up_adj, self.dn_adj, self.trend = self._undo
+
+    def state_dict(self):
+        return {'period': self.period, 'multiplier': self.multiplier, 'tr': self.tr.state_dict(),
+                'prev_close': self.prev_close, 'up_adj': self.up_adj, 'dn_adj': self.dn_adj, 'trend': self.trend}
+
+    @classmethod
+    def from_state(cls, state):
+        st = cls(state['period'], state['multiplier'])
+        st.tr = RollingWindow.from_state(state['tr'])
+        st.prev_close, st.up_adj, st.dn_adj, st.trend = state['prev_close'], state['up_adj'], state['dn_adj'], state['trend']
+        return st
+
+
+class IncrementalSqueeze:
+    """
+    Squeeze Momentum 增量计算，各滚动量（布林带均值/标准差、肯特纳通道、
+    最高/最低价、动量线性回归）各自维护一个滑动窗口。
+    """
+
+    name = 'squeeze_momentum'
+
+    def __init__(self, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5, use_true_range=True):
+        self.params = {'bb_length': bb_length, 'bb_mult': bb_mult, 'kc_length': kc_length,
+                       'kc_mult': kc_mult, 'use_true_range': use_true_range}
+        self.bb = RollingWindow(bb_length)
+        self.kc = RollingWindow(kc_length)
+        self.range = RollingWindow(kc_length)
+        self.highest = RollingExtreme(kc_length, 'max')
+        self.lowest = RollingExtreme(kc_length, 'min')
+        self.linreg = RollingLinreg(kc_length)
+        self.prev_close = None
+        self.prev_momentum = NAN
+        self._undo = None
+
+    def seed(self, df):
+        """窗口指标的状态只取决于最近若干根K线，回放预热所需的尾部即可"""
+        start = max(0, len(df) - warmup_bars('squeeze_momentum', self.params) - 1)
+        tail = df.iloc[start:]
+        if start > 0:
+            # 尾部第一根K线的TR需要前一根收盘价
+            self.prev_close = float(df['close'].iloc[start - 1])
+        for high, low, close in zip(tail['high'].tolist(), tail['low'].tolist(), tail['close'].tolist()):
+            self.update({'high': high, 'low': low, 'close': close})
+
+    def update(self, bar):
+        p = self.params
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        self._undo = (self.prev_close, self.prev_momentum)
+        self.bb.push(close)
+        self.kc.push(close)
+        self.range.push(_true_range(high, low, self.prev_close) if p['use_true_range'] else high - low)
+        self.highest.push(high)
+        self.lowest.push(low)
+        self.prev_close = close
+
+        bb_basis = self.bb.mean()
+        bb_dev = p['bb_mult'] * self.bb.std()
+        upper_bb, lower_bb = bb_basis + bb_dev, bb_basis - bb_dev
+        kc_ma = self.kc.mean()
+        range_ma = self.range.mean()
+        upper_kc, lower_kc = kc_ma + range_ma * p['kc_mult'], kc_ma - range_ma * p['kc_mult']
+
+        sqz_on = lower_bb > lower_kc and upper_bb < upper_kc
+        sqz_off = lower_bb < lower_kc and upper_bb > upper_kc
+        no_sqz = not sqz_on and not sqz_off
+
+        avg_hl = (self.highest.value() + self.lowest.value()) / 2
+        self.linreg.push(close - (avg_hl + kc_ma) / 2)
+        momentum = self.linreg.value()
+        prev = self.prev_momentum
+        self.prev_momentum = momentum
+        # 颜色判断与全量计算的 np.where 相同（NaN 比较为False）
+        if momentum > 0:
+            bar_color = 'lime' if momentum > prev else 'green'
+        else:
+            bar_color = 'red' if momentum < prev else 'maroon'
+        squeeze_color = 'blue' if no_sqz else ('black' if sqz_on else 'gray')
+
+        def clean(value):
+            return None if _isnan(value) else value
+
+        return {
+            'momentum': clean(momentum),
+            'squeeze_on': int(sqz_on),
+            'squeeze_off': int(sqz_off),
+            'no_squeeze': int(no_sqz),
+            'bar_color': bar_color,
+            'squeeze_color': squeeze_color,
+            'upper_bb': clean(upper_bb),
+            'lower_bb': clean(lower_bb),
+            'upper_kc': clean(upper_kc),
+            'lower_kc': clean(lower_kc),
+            'time': bar.get('time'),
+        }
+
+    def undo(self):
+        """撤销最近一次 update"""
+        for window in (self.bb, self.kc, self.range, self.highest, self.lowest, self.linreg):
+            window.undo()
+        self.prev_close, self.prev_momentum = self._undo
+
+    def state_dict(self):
+        return {'params': dict(self.params), 'bb': self.bb.state_dict(), 'kc': self.kc.state_dict(),
+                'range': self.range.state_dict(), 'highest': self.highest.state_dict(),
+                'lowest': self.lowest.state_dict(), 'linreg': self.linreg.state_dict(),
+                'prev_close': self.prev_close, 'prev_momentum': self.prev_momentum}
+
+    @classmethod
+    def from_state(cls, state):
+        sqz = cls(**state['params'])
+        sqz.bb = RollingWindow.from_state(state['bb'])
+        sqz.kc = RollingWindow.from_state(state['kc'])
+        sqz.range = RollingWindow.from_state(state['range'])
+        sqz.highest = RollingExtreme.from_state(state['highest'])
+        sqz.lowest = RollingExtreme.from_state(state['lowest'])
+        sqz.linreg = RollingLinreg.from_state(state['linreg'])
+        sqz.prev_close, sqz.prev_momentum = state['prev_close'], state['prev_momentum']
+        return sqz
+
+
+def make_incremental(indicator, params=None):
+    """按指标名与规范化参数创建增量指标对象"""
+    params = dict(INDICATOR_PARAMS[indicator], **(params or {}))
+    if indicator == 'supertrend':
+        return IncrementalSuperTrend(params['period'], params['multiplier'])
+    if indicator == 'squeeze_momentum':
+        return IncrementalSqueeze(**params)
+    if indicator in ('ma5', 'ma10'):
+        return IncrementalMA(int(indicator[2:]))
+    raise ValueError(f'未知指标类型: {indicator}')
+
+
+_CLASSES = {'supertrend': IncrementalSuperTrend, 'squeeze_momentum': IncrementalSqueeze, 'ma': IncrementalMA}
+
+
+class IncrementalIndicators:
+    """
+    一只股票的一组增量指标。
+
+    update(bar) 追加一根新K线；update(bar, replace=True) 用于盘中更新最后一根K线：
+    先撤销最后一根K线的推进再以新值重新推进。撤销信息在每次 update 时记录，
+    from_state() 恢复的对象在下一次追加之前不能 replace。
+    """
+
+    def __init__(self, indicators=None):
+        indicators = indicators or {name: {} for name in INCREMENTAL_INDICATORS}
+        self.indicators = {name: make_incremental(name, params) for name, params in indicators.items()}
+        self.last_time = None
+        self._can_replace = False
+
+    def seed(self, df):
+        """
+        用全量历史数据播种，之后的 update 只需 O(1)
+        最后一根K线单独推进一次，播种后即可 replace 最后一根
+        """
+        self._can_replace = False
+        self.last_time = None
+        history = df.iloc[:-1]
+        for ind in self.indicators.values():
+            ind.seed(history)
+        if len(df):
+            last = df.iloc[-1]
+            self.update({'time': last['time'], 'high': last['high'], 'low': last['low'], 'close': last['close']})
+
+    def update(self, bar, replace=False):
+        """
+        参数:
+        bar: dict，包含 time/high/low/close
+        replace: True 表示更新最后一根K线（盘中刷新），False 表示追加新K线
+        返回: {指标名: 该K线的指标值}
+        """
+        if replace:
+            if not self._can_replace:
+                raise ValueError('没有可替换的K线：replace 需要在 seed() 或追加K线之后')
+            for ind in self.indicators.values():
+                ind.undo()
+        self._can_replace = True
+        self.last_time = bar.get('time')
+        return {name: ind.update(bar) for name, ind in self.indicators.items()}
+
+    def extend(self, df):
+        """逐根追加新K线（如日终追加或增量下载后的新数据）"""
+        bars = df[['time', 'high', 'low', 'close']].to_dict(orient='records')
+        return [self.update(bar) for bar in bars]
+
+    def state_dict(self):
+        return {
+            'last_time': self.last_time,
+            'indicators': {name: {'kind': ind.name, 'state': copy.deepcopy(ind.state_dict())}
+                           for name, ind in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        # 不经过 __init__：恢复的指标会整体替换默认指标，无需先构造再丢弃
+        obj = cls.__new__(cls)
+        obj.indicators = cls._restore(state['indicators'])
+        obj.last_time = state['last_time']
+        obj._can_replace = False
+        return obj
+
+    @staticmethod
+    def _restore(states):
+        return {name: _CLASSES[item['kind']].from_state(item['state']) for name, item in states.items()}
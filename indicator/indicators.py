@@ -0,0 +1,145 @@
+"""
+接口指标的统一入口：参数规范化、预热K线数与计算。
+
+/api/indicator 以及后续的批量、筛选等功能都通过这里计算指标，
+保证同一指标在各处的参数默认值和输出列一致。
+"""
+import numpy as np
+import pandas as pd
+
+from indicator.tech_analysis_web import IndicatorContext, TechAnalysis
+
+# 指标名 -> 参数默认值（参数顺序即规范化后元组的顺序）
+INDICATOR_PARAMS = {
+    'supertrend': {'period': 10, 'multiplier': 3.0},
+    'squeeze_momentum': {'bb_length': 20, 'bb_mult': 2.0, 'kc_length': 20, 'kc_mult': 1.5, 'use_true_range': True},
+    'ma5': {},
+    'ma10': {},
+    # 滑动窗口多重分形分析：window 天的窗口每 step 天估计一次
+    'hurst': {'window': 120, 'step': 5},
+}
+
+# 滑动窗口的最短长度，太短时 τ(q) 的回归没有意义
+HURST_MIN_WINDOW = 16
+
+# 降采样时 LTTB 选点依据的主线列，以及需要按桶保留的信号列
+DOWNSAMPLE_KEYS = {
+    'supertrend': ('supertrend', ('buy', 'sell')),
+    'squeeze_momentum': ('momentum', ()),
+    'ma5': ('ma', ()),
+    'ma10': ('ma', ()),
+    'hurst': ('hurst', ()),
+}
+
+# SuperTrend 为递推指标，无法用有限的预热得到与全量计算完全一致的结果；
+# 轨道在趋势切换后由近期K线重新决定，取 period 的若干倍作为预热通常已足够收敛
+SUPERTREND_WARMUP_PERIODS = 20
+
+
+def _parse_value(default, value):
+    if isinstance(default, bool):
+        return str(value).lower() == 'true'
+    return type(default)(value)
+
+
+def normalize_params(indicator, args=None):
+    """
+    将请求参数规范化为带默认值的有序dict，未知参数被忽略
+    返回: dict，未知指标返回None；参数无法解析或不为正数时抛出 ValueError
+    """
+    defaults = INDICATOR_PARAMS.get(indicator)
+    if defaults is None:
+        return None
+    args = args or {}
+    params = {name: _parse_value(default, args[name]) if name in args else default
+              for name, default in defaults.items()}
+    for name, value in params.items():
+        # 长度与倍数都必须为正：为0或负数时面板内核报错或输出全空列，预热长度也会变为负数
+        if not isinstance(value, bool) and not (np.isfinite(value) and value > 0):
+            raise ValueError(f'{name} 必须为正数')
+    if indicator == 'hurst' and (params['window'] < HURST_MIN_WINDOW or params['step'] < 1):
+        raise ValueError(f'window 不能小于 {HURST_MIN_WINDOW}，step 不能小于 1')
+    return params
+
+
+def warmup_bars(indicator, params):
+    """计算区间起点之前需要额外带上的K线数"""
+    if indicator == 'supertrend':
+        return params['period'] * SUPERTREND_WARMUP_PERIODS
+    if indicator == 'squeeze_momentum':
+        # 动量源需要 kc_length-1 根，线性回归再需要 kc_length-1 根，TR 需要前一根收盘价
+        return max(params['bb_length'] - 1, 2 * params['kc_length'] - 2) + 1
+    if indicator in ('ma5', 'ma10'):
+        return int(indicator[2:]) - 1
+    if indicator == 'hurst':
+        # 区间起点的值来自在它之前（最多 step-1 根）结束的窗口，窗口本身再需要 window 根
+        return params['window'] + params['step'] - 1
+    return 0
+
+
+def window_start(indicator, params, lo, warmup=None):
+    """
+    计算 df.iloc[lo:hi] 时数据切片的起点：lo 之前带上 warmup（默认 warmup_bars）根预热K线。
+    hurst 的窗口以第一根K线为原点每 step 根一个，起点再向前对齐到 step 的倍数，
+    使切片上的窗口与全量计算的窗口重合
+    """
+    if warmup is None:
+        warmup = warmup_bars(indicator, params)
+    start = max(0, lo - warmup)
+    if indicator == 'hurst':
+        start -= start % params['step']
+    return start
+
+
+def compute_indicator(df, indicator, params, ctx=None):
+    """
+    计算指标
+    ctx: IndicatorContext，同一份数据上计算多个指标时传入以共用中间结果
+    返回: 含time列的DataFrame，与df逐行对应
+    """
+    ctx = ctx or IndicatorContext(df)
+    if indicator == 'supertrend':
+        return TechAnalysis.supertrend(df, params['period'], params['multiplier'], ctx=ctx)
+    if indicator == 'squeeze_momentum':
+        sqz = TechAnalysis.squeeze_momentum(df, params['bb_length'], params['bb_mult'], params['kc_length'],
+                                            params['kc_mult'], params['use_true_range'], ctx=ctx)
+        # 确保时间格式一致
+        sqz['time'] = df['time']  # 使用处理后的时间格式
+        return sqz
+    if indicator in ('ma5', 'ma10'):
+        # 计算5日/10日移动平均线
+        ma = ctx.rolling_mean('close', int(indicator[2:]))[0]
+        return pd.DataFrame({'time': df['time'], 'ma': ma}, index=df.index)
+    if indicator == 'hurst':
+        return _hurst(df, params['window'], params['step'])
+    raise ValueError(f'未知指标类型: {indicator}')
+
+
+def _hurst(df, window, step):
+    """
+    收盘价的滑动窗口 H、alpha_0、λ、σ²：窗口从第一根K线开始每 step 根一个（新K线到达时已有的值不变），
+    每个估计值一直保持到下一个窗口结束，第一个窗口结束之前为NaN
+    """
+    # mmar 是分析用的完整包，只在请求 hurst 时导入，其他指标与 worker 启动不受其影响
+    from mmar.rolling import rolling_profile
+
+    profile = rolling_profile(df['close'].to_numpy(), window, step, align='start')
+    result = pd.DataFrame({'time': df['time']}, index=df.index)
+    for column, name in [('H', 'hurst'), ('alpha_0', 'alpha_0'), ('lambda', 'lambda'), ('sigma2', 'sigma2')]:
+        values = np.full(len(df), np.nan)
+        values[profile['end'].to_numpy()] = profile[column].to_numpy()
+        result[name] = pd.Series(values, index=df.index).ffill().to_numpy()
+    return result
+
+
+def compute_window(df, indicator, params, lo, hi, warmup=None, ctx=None):
+    """
+    只计算 df.iloc[lo:hi] 区间的指标，自动带上足够的预热K线
+    warmup: 预热K线数，默认 warmup_bars
+    ctx: 批量计算时共用的 IndicatorContext，须建立在 df.iloc[window_start(...):hi] 上
+    返回: 与 df.iloc[lo:hi] 逐行对应的DataFrame
+    """
+    start = window_start(indicator, params, lo, warmup)
+    window_df = ctx.df if ctx is not None else df.iloc[start:hi]
+    result = compute_indicator(window_df, indicator, params, ctx)
+    return result.iloc[lo - start:]
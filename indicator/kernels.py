@@ -0,0 +1,159 @@
+"""
+指标计算的底层数值内核，只接收/返回连续的 numpy float64 数组，
+供 panel（tech_analysis_web.TechAnalysis 与筛选器的计算引擎）与 tech_analysis.TechAnalysis 共用。
+
+安装了 numba 时使用 JIT 编译版本，否则退回纯 Python/NumPy 实现，两者结果逐位一致。
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖
+    njit = None
+
+
+def _supertrend_loop(close, up, dn, up_adj, dn_adj, trend):
+    """
+    SuperTrend 轨道递推（原地写入 up_adj/dn_adj/trend）
+
+    比较顺序与内置 max/min 保持一致：max(a, b) 仅在 b > a 时取 b，
+    因此预热期的 NaN 与原 .iloc 循环的传播方式完全相同。
+    """
+    for i in range(1, len(close)):
+        u = up[i]
+        if not (close[i - 1] <= up_adj[i - 1]) and up_adj[i - 1] > u:
+            u = up_adj[i - 1]
+        up_adj[i] = u
+
+        d = dn[i]
+        if not (close[i - 1] >= dn_adj[i - 1]) and dn_adj[i - 1] < d:
+            d = dn_adj[i - 1]
+        dn_adj[i] = d
+
+        # 趋势切换
+        if trend[i - 1] == -1 and close[i] > dn_adj[i - 1]:
+            trend[i] = 1.0
+        elif trend[i - 1] == 1 and close[i] < up_adj[i - 1]:
+            trend[i] = -1.0
+        else:
+            trend[i] = trend[i - 1]
+
+
+_supertrend_jit = njit(cache=True)(_supertrend_loop) if njit is not None else None
+
+
+def supertrend_kernel(close, up, dn):
+    """
+    计算调整后的上下轨与趋势方向
+
+    参数:
+    close: 收盘价数组
+    up: 原始下轨 src - multiplier * atr
+    dn: 原始上轨 src + multiplier * atr
+    二维输入 (品种 × K线) 时逐行递推；行首的 NaN 填充不改变有效部分的结果
+    返回: (up_adj, dn_adj, trend)，均为float64数组，trend取值为1/-1
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if close.ndim == 2:
+        rows = [supertrend_kernel(close[i], up[i], dn[i]) for i in range(close.shape[0])]
+        if not rows:
+            return close.copy(), close.copy(), np.ones(close.shape)
+        return tuple(np.stack(arrays) for arrays in zip(*rows))
+    up = np.ascontiguousarray(up, dtype=np.float64)
+    dn = np.ascontiguousarray(dn, dtype=np.float64)
+    n = len(close)
+    if _supertrend_jit is not None:
+        up_adj = up.copy()
+        dn_adj = dn.copy()
+        trend = np.ones(n)
+        _supertrend_jit(close, up, dn, up_adj, dn_adj, trend)
+        return up_adj, dn_adj, trend
+
+    # 纯Python回退：在list上逐元素访问比numpy标量索引快得多
+    up_list = up.tolist()
+    dn_list = dn.tolist()
+    up_adj = list(up_list)
+    dn_adj = list(dn_list)
+    trend = [1.0] * n
+    _supertrend_loop(close.tolist(), up_list, dn_list, up_adj, dn_adj, trend)
+    return np.array(up_adj, dtype=np.float64), np.array(dn_adj, dtype=np.float64), np.array(trend, dtype=np.float64)
+
+
+def trend_signals(trend):
+    """
+    由趋势序列生成买卖信号
+    返回: (buy, sell) 布尔数组，趋势由-1转1为买入，由1转-1为卖出（沿最后一个轴）
+    """
+    trend = np.asarray(trend)
+    prev = np.empty_like(trend, dtype=np.float64)
+    if trend.shape[-1] > 0:
+        prev[..., 0] = np.nan
+        prev[..., 1:] = trend[..., :-1]
+    buy = (trend == 1) & (prev == -1)
+    sell = (trend == -1) & (prev == 1)
+    return buy, sell
+
+
+def rolling_linreg(y, length, offset=0, block=64):
+    """
+    滚动线性回归端点值，等价于 Pine 的 linreg(src, length, offset)
+
+    对每个以 i 结尾、长度为 length 的窗口，以 x=0..length-1 做最小二乘拟合，
+    返回 slope * (length - 1 - offset) + intercept。
+    窗口内 Σy 与 Σx·y 由前缀和一次算出，复杂度 O(n)，与窗口长度无关。
+    前缀和每 block 根K线重新起算，避免长序列上 Σj·y 数值过大导致相减时丢失精度。
+    沿最后一个轴计算，支持 (品种 × K线) 的二维输入。
+    前 length-1 个位置以及窗口内含 NaN 的位置结果为 NaN。
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[-1]
+    out = np.full(y.shape, np.nan)
+    if length < 1 or n < length:
+        return out
+
+    block = max(block, length)
+    n_blocks = -(-n // block)
+    valid = np.isfinite(y)
+    pad = [(0, 0)] * (y.ndim - 1) + [(0, n_blocks * block - n)]
+    yz = np.pad(np.where(valid, y, 0.0), pad).reshape(y.shape[:-1] + (n_blocks, block))
+
+    # 块内前缀和（含当前元素）及块内下标加权前缀和
+    k = np.arange(block, dtype=np.float64)
+    p_y = np.cumsum(yz, axis=-1)
+    p_ky = np.cumsum(k * yz, axis=-1)
+    t_y, t_ky = p_y[..., -1], p_ky[..., -1]
+    flat = y.shape[:-1] + (n_blocks * block,)
+    yz, p_y, p_ky = yz.reshape(flat), p_y.reshape(flat), p_ky.reshape(flat)
+
+    s = np.arange(n - length + 1)  # 窗口起点
+    e = s + length - 1             # 窗口终点
+    s_blk, s_loc = s // block, (s % block).astype(np.float64)
+    e_pre_y = p_y[..., s] - yz[..., s]    # 块内s之前的部分和
+    e_pre_ky = p_ky[..., s] - k[s % block] * yz[..., s]
+
+    same = (e // block) == s_blk
+    # 窗口在一个块内
+    sum_y_in = p_y[..., e] - e_pre_y
+    sum_xy_in = (p_ky[..., e] - e_pre_ky) - s_loc * sum_y_in
+    # 窗口跨越两个块（length <= block，最多跨一次）
+    head_y = t_y[..., s_blk] - e_pre_y
+    head_ky = t_ky[..., s_blk] - e_pre_ky
+    tail_y, tail_ky = p_y[..., e], p_ky[..., e]
+    sum_y_cross = head_y + tail_y
+    sum_xy_cross = (head_ky - s_loc * head_y) + (tail_ky + (block - s_loc) * tail_y)
+
+    sum_y = np.where(same, sum_y_in, sum_y_cross)
+    sum_xy = np.where(same, sum_xy_in, sum_xy_cross)
+
+    sum_x = length * (length - 1) / 2.0
+    sum_xx = (length - 1) * length * (2 * length - 1) / 6.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sum_xy - sum_x * sum_y / length) / (sum_xx - sum_x * sum_x / length)
+        intercept = (sum_y - slope * sum_x) / length
+    value = intercept + slope * (length - 1 - offset)
+
+    c_bad = np.cumsum(~valid, axis=-1)
+    c_bad = np.concatenate([np.zeros(y.shape[:-1] + (1,), dtype=c_bad.dtype), c_bad], axis=-1)
+    value[(c_bad[..., length:] - c_bad[..., :-length]) > 0] = np.nan
+    out[..., length - 1:] = value
+    return out
@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 富途导出的列名 -> 图表使用的列名
+RENAME_DICT = {'open_price': 'open', 'high_price': 'high', 'low_price': 'low', 'close_price': 'close'}
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+TIME_COLUMNS = ['time_key', 'time']
+
+
+def find_kline_file(data_dir, code):
+    """
+    按两种命名规则查找K线文件: <code>.csv 或 <code_with_underscore>_daily.csv
+    返回: 文件路径，找不到时返回None
+    """
+    for fname in [f'{code}.csv', f'{code.replace(".", "_")}_daily.csv']:
+        fpath = os.path.join(data_dir, fname)
+        if os.path.exists(fpath):
+            return fpath
+    return None
+
+
+def normalize_kline(df):
+    """
+    统一K线数据格式：重命名OHLC列、价格转为float64、生成'%Y-%m-%d'格式的time列，
+    以及int64 epoch秒的ts列（按时间升序，供二分查找区间）
+    """
+    df = df.rename(columns={k: v for k, v in RENAME_DICT.items() if k in df.columns})
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float64)
+    # 生成time列
+    if 'time_key' in df.columns:
+        stamps = pd.to_datetime(df['time_key']).values
+    elif 'time' in df.columns:
+        stamps = pd.to_datetime(df['time']).values
+    else:
+        stamps = pd.date_range(start='2020-01-01', periods=len(df)).values
+    df['time'] = _format_dates(stamps)
+    df['ts'] = stamps.astype('datetime64[s]').astype(np.int64)
+    if not df['ts'].is_monotonic_increasing:
+        df = df.sort_values('ts', kind='stable').reset_index(drop=True)
+    return df
+
+
+def time_slice(ts, start=None, end=None, limit=None):
+    """
+    在升序时间索引上二分查找区间
+    参数:
+    ts: int64 epoch秒数组
+    start/end: 闭区间端点（epoch秒），None表示不限
+    limit: 最多返回的K线数，取区间内最新的limit根
+    返回: (lo, hi)，对应切片 [lo, hi)
+    """
+    lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+    hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='right'))
+    hi = max(hi, lo)
+    if limit is not None and limit >= 0:
+        lo = max(lo, hi - limit)
+    return lo, hi
+
+
+def parse_time(value, end_of_day=False):
+    """
+    解析接口的时间参数：epoch秒或日期字符串（如'2024-06-30'）
+    end_of_day: 纯日期时取当天最后一秒，使区间终点包含当天
+    返回: epoch秒
+    """
+    value = str(value).strip()
+    if value.lstrip('-').isdigit():
+        return int(value)
+    stamp = pd.Timestamp(value)
+    seconds = int(stamp.value // 10**9)
+    if end_of_day and len(value) == 10:
+        seconds += 86400 - 1
+    return seconds
+
+
+def _format_dates(values):
+    """datetime64数组转为'%Y-%m-%d'字符串（numpy向量化实现，比Series.dt.strftime快一个数量级）"""
+    days = values.astype('datetime64[D]')
+    return np.datetime_as_string(days, unit='D').astype(object)
+
+
+def write_csv_atomic(df, fpath):
+    """
+    原子写入CSV：先写同目录下的临时文件再rename，读者只会看到旧文件或完整的新文件
+    临时文件以 . 开头，不会被 *.csv 的股票列表扫描到
+    """
+    dirname = os.path.dirname(os.path.abspath(fpath))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.csv', dir=dirname)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            df.to_csv(f, index=False)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认只有属主可读
+        os.replace(tmp_path, fpath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _file_signature(fpath):
+    """文件签名(mtime_ns, size)，任一变化即视为数据已更新"""
+    st = os.stat(fpath)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ColumnarStore:
+    """
+    K线CSV的二进制列式存储。
+
+    每个CSV首次读取时转换为一组 .npy 文件（每列一个），之后直接内存映射只读加载：
+    - 时间列存为int64 epoch秒，数值列存为float64/int64
+    - code/name 等整列相同的字符串只在 meta.json 中保存一次
+    - 目录按源文件签名(mtime_ns, size)命名，CSV变化后自动重新转换；
+      新版本先写临时目录再rename，读者不会看到写了一半的文件
+    """
+
+    def __init__(self, cache_dir=None, mmap=True):
+        self.cache_dir = cache_dir  # None表示放在CSV同目录的.columnar下
+        self.mmap = mmap
+
+    def columns(self, csv_path):
+        """
+        加载列数据（必要时先转换）
+        返回: (meta, {列名: np.ndarray})，数组为只读内存映射
+        """
+        store_dir = self.sync(csv_path)
+        with open(os.path.join(store_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if self.mmap else None
+        arrays = {}
+        for col in meta['columns']:
+            if col['kind'] != 'constant':
+                arrays[col['name']] = np.load(os.path.join(store_dir, col['file']), mmap_mode=mmap_mode)
+        return meta, arrays
+
+    def load(self, csv_path):
+        """
+        按原CSV的列顺序还原DataFrame，时间列还原为datetime64
+        返回: pd.DataFrame
+        """
+        meta, arrays = self.columns(csv_path)
+        data = {}
+        for col in meta['columns']:
+            name = col['name']
+            if col['kind'] == 'constant':
+                data[name] = np.full(meta['rows'], col['value'], dtype=object)
+            elif col['kind'] == 'datetime':
+                data[name] = arrays[name].astype('datetime64[s]').astype('datetime64[ns]')
+            else:
+                data[name] = arrays[name]
+        return pd.DataFrame(data, columns=[col['name'] for col in meta['columns']])
+
+    def sync(self, csv_path):
+        """
+        确保列式文件与CSV同步
+        返回: 当前版本的存储目录
+        """
+        base_dir = self._base_dir(csv_path)
+        signature = _file_signature(csv_path)
+        version = f'{signature[0]}_{signature[1]}'
+        store_dir = os.path.join(base_dir, version)
+        if os.path.exists(os.path.join(store_dir, 'meta.json')):
+            return store_dir
+
+        os.makedirs(base_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=base_dir)
+        try:
+            self._convert(csv_path, tmp_dir, signature)
+            try:
+                os.rename(tmp_dir, store_dir)
+            except OSError:
+                # 其他进程已完成同一版本的转换
+                if not os.path.exists(os.path.join(store_dir, 'meta.json')):
+                    raise
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        # 清理旧版本，已打开的内存映射在POSIX下仍然有效
+        for name in os.listdir(base_dir):
+            if name != version and not name.startswith('.tmp-'):
+                shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+        return store_dir
+
+    def _base_dir(self, csv_path):
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(csv_path), '.columnar')
+        return os.path.join(cache_dir, stem)
+
+    @staticmethod
+    def _convert(csv_path, out_dir, signature):
+        df = pd.read_csv(csv_path)
+        columns = []
+        for i, name in enumerate(df.columns):
+            values = df[name]
+            col = {'name': name}
+            if name in TIME_COLUMNS:
+                col['kind'] = 'datetime'
+                arr = pd.to_datetime(values).values.astype('datetime64[s]').astype(np.int64)
+            elif values.dtype == object:
+                if len(values) > 0 and values.nunique(dropna=False) == 1 and isinstance(values.iloc[0], str):
+                    columns.append({'name': name, 'kind': 'constant', 'value': values.iloc[0]})
+                    continue
+                col['kind'] = 'array'
+                arr = values.astype(str).values.astype(np.str_)
+            elif values.dtype.kind == 'f':
+                col['kind'] = 'array'
+                arr = values.values.astype(np.float64)
+            else:
+                col['kind'] = 'array'
+                arr = values.values
+            col['file'] = f'{i}.npy'
+            np.save(os.path.join(out_dir, col['file']), np.ascontiguousarray(arr))
+            columns.append(col)
+        meta = {
+            'source': os.path.basename(csv_path),
+            'signature': list(signature),
+            'rows': len(df),
+            'columns': columns,
+        }
+        # meta.json最后写入，作为转换完成的标志
+        with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+
+class KlineCache:
+    """
+    进程内K线缓存，按股票代码缓存规范化后的DataFrame。
+
+    - 每次读取都会比对源文件的 mtime/size，文件变化后自动重新加载
+    - 以字节数为上限，超出时按LRU顺序淘汰
+    - 返回的DataFrame为共享对象，调用方不应原地修改
+    """
+
+    def __init__(self, data_dir, max_bytes=256 * 1024 * 1024, store=None):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        self.store = store  # ColumnarStore，为None时直接解析CSV
+        self._entries = OrderedDict()  # code -> (signature, frame, nbytes)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, code):
+        """
+        获取规范化后的K线数据
+        返回: pd.DataFrame，找不到数据文件时返回None
+        """
+        return self.load(code)[0]
+
+    def load(self, code):
+        """
+        获取K线数据及其数据版本
+        返回: (pd.DataFrame, version)，version 由源文件 mtime/size 生成，
+              文件更新后随之变化，可用作下游缓存的键；找不到文件时返回 (None, None)
+        """
+        fpath = find_kline_file(self.data_dir, code)
+        if fpath is None:
+            self.invalidate(code)
+            return None, None
+        signature = _file_signature(fpath)
+        version = f'{signature[0]}-{signature[1]}'
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(code)
+                self.hits += 1
+                return entry[1], version
+            self.misses += 1
+
+        # 解析放在锁外，避免慢速IO阻塞其他股票的命中
+        frame = normalize_kline(self._read(fpath))
+        nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            self._pop(code)
+            if nbytes <= self.max_bytes:
+                self._entries[code] = (signature, frame, nbytes)
+                self.total_bytes += nbytes
+                self._evict()
+        return frame, version
+
+    def _read(self, fpath):
+        if self.store is not None:
+            try:
+                return self.store.load(fpath)
+            except OSError as e:
+                # 缓存目录不可写等情况，退回直接解析CSV
+                logger.warning("列式存储不可用，改为读取CSV: %s (%s)", fpath, e)
+        return pd.read_csv(fpath)
+
+    def invalidate(self, code=None):
+        """清除指定股票的缓存，code为None时清空全部"""
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            else:
+                self._pop(code)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _pop(self, code):
+        entry = self._entries.pop(code, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.total_bytes -= nbytes
+            self.evictions += 1
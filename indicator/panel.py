@@ -0,0 +1,177 @@
+"""
+面板计算引擎：在 (品种 × K线) 的二维数组上按行同时计算指标。
+
+- 每行一个品种，沿最后一个轴（时间）计算，一次调用覆盖全部品种，没有逐品种的 Python 开销
+- 历史长度不同的品种右对齐（最新K线在最后一列），左侧以 NaN 填充；
+  NaN 不参与滚动窗口，填充部分的输出为 NaN，有效部分与单独计算该品种一致
+- 单品种即 1 × n 的面板，tech_analysis_web.TechAnalysis 与筛选器共用同一套计算
+"""
+import numpy as np
+import pandas as pd
+
+from indicator.kernels import rolling_linreg, supertrend_kernel, trend_signals
+
+
+def align_right(series_list, width=None, out=None):
+    """
+    将长度不同的一维数组右对齐为二维面板，左侧以 NaN 填充
+    参数:
+    series_list: 一维数组列表
+    width: 面板宽度，默认为最长序列的长度；更长的序列只保留最近的 width 个值
+    out: 可选的输出数组（如共享内存上的视图），形状需为 (len(series_list), width)
+    返回: float64 二维数组
+    """
+    if width is None:
+        width = max((len(values) for values in series_list), default=0)
+    if out is None:
+        out = np.empty((len(series_list), width), dtype=np.float64)
+    out.fill(np.nan)
+    for row, values in enumerate(series_list):
+        m = min(len(values), width)
+        if m:
+            out[row, width - m:] = np.asarray(values, dtype=np.float64)[len(values) - m:]
+    return out
+
+
+def rolling(x, window, how):
+    """
+    沿时间轴的滚动统计（mean/std/max/min/sum），窗口内含 NaN 时结果为 NaN
+
+    转置为 (K线 × 品种) 后交给 pandas 的逐列滚动实现，一次调用完成所有品种，
+    数值与对单个 Series 调用 rolling 逐位一致。
+    """
+    frame = pd.DataFrame(np.asarray(x, dtype=np.float64).T)
+    return getattr(frame.rolling(window=window), how)().to_numpy().T
+
+
+def shift(x, periods=1):
+    """沿时间轴右移，空出的位置为 NaN"""
+    out = np.full(x.shape, np.nan)
+    if periods < x.shape[-1]:
+        out[..., periods:] = x[..., :x.shape[-1] - periods]
+    return out
+
+
+def true_range(high, low, close):
+    """真实波幅 max(high-low, |high-prev_close|, |low-prev_close|)，首根K线只取 high-low"""
+    prev_close = shift(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+class PanelContext:
+    """
+    面板上的中间结果缓存。
+
+    同一批数据上计算多个指标时共用 TR、滚动均值/标准差/极值等中间数组，
+    例如 Squeeze 的布林带中轨与肯特纳中轨在长度相同时只算一次。
+
+    参数:
+    columns: {'high'/'low'/'close'/...: 二维float64数组}，形状均为 (品种, K线)
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._memo = {}
+
+    @property
+    def shape(self):
+        return self.columns['close'].shape
+
+    def _get(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def series(self, name):
+        """原始列，'tr' 为真实波幅，'hl' 为高低价差"""
+        if name == 'tr':
+            return self.tr()
+        if name == 'hl':
+            return self._get('hl', lambda: self.columns['high'] - self.columns['low'])
+        return self.columns[name]
+
+    def tr(self):
+        return self._get('tr', lambda: true_range(self.columns['high'], self.columns['low'], self.columns['close']))
+
+    def rolling_mean(self, name, window):
+        return self._get(('mean', name, window), lambda: rolling(self.series(name), window, 'mean'))
+
+    def rolling_std(self, name, window):
+        return self._get(('std', name, window), lambda: rolling(self.series(name), window, 'std'))
+
+    def rolling_max(self, name, window):
+        return self._get(('max', name, window), lambda: rolling(self.series(name), window, 'max'))
+
+    def rolling_min(self, name, window):
+        return self._get(('min', name, window), lambda: rolling(self.series(name), window, 'min'))
+
+
+def sma(ctx, window, name='close'):
+    return ctx.rolling_mean(name, window)
+
+
+def atr(ctx, period):
+    """平均真实波幅（TR 的简单移动平均）"""
+    return ctx.rolling_mean('tr', period)
+
+
+def bollinger(ctx, length=20, mult=2.0):
+    """布林带，返回: (中轨, 上轨, 下轨)"""
+    basis = ctx.rolling_mean('close', length)
+    dev = mult * ctx.rolling_std('close', length)
+    return basis, basis + dev, basis - dev
+
+
+def keltner(ctx, length=20, mult=1.5, use_true_range=True):
+    """肯特纳通道，返回: (中轨, 上轨, 下轨)"""
+    ma = ctx.rolling_mean('close', length)
+    range_ma = ctx.rolling_mean('tr' if use_true_range else 'hl', length)
+    return ma, ma + range_ma * mult, ma - range_ma * mult
+
+
+def supertrend(ctx, period=10, multiplier=3.0):
+    """
+    SuperTrend
+    返回: dict，supertrend（上升趋势取下轨、下降趋势取上轨，无效值为NaN）、
+          trend（1/-1）、buy/sell（bool）
+    """
+    high, low, close = ctx.columns['high'], ctx.columns['low'], ctx.columns['close']
+    src = (high + low) / 2
+    band = multiplier * atr(ctx, period)
+    up = src - band
+    dn = src + band
+    up_adj, dn_adj, trend = supertrend_kernel(close, up, dn)
+    buy, sell = trend_signals(trend)
+    line = np.where(trend == 1, up_adj, dn_adj)
+    with np.errstate(invalid='ignore'):
+        line = np.where(line > 0, line, np.nan)
+    return {'supertrend': line, 'trend': trend, 'buy': buy, 'sell': sell}
+
+
+def squeeze_momentum(ctx, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5, use_true_range=True):
+    """
+    Squeeze Momentum [LazyBear]
+    返回: dict，momentum、squeeze_on/squeeze_off/no_squeeze（bool）以及布林带、肯特纳通道上下轨
+    """
+    _, upper_bb, lower_bb = bollinger(ctx, bb_length, bb_mult)
+    kc_ma, upper_kc, lower_kc = keltner(ctx, kc_length, kc_mult, use_true_range)
+
+    with np.errstate(invalid='ignore'):
+        sqz_on = (lower_bb > lower_kc) & (upper_bb < upper_kc)
+        sqz_off = (lower_bb < lower_kc) & (upper_bb > upper_kc)
+    no_sqz = ~sqz_on & ~sqz_off
+
+    # 动量源：收盘价减去 (区间高低中点 + 均价) / 2，再做滚动线性回归
+    avg_hl = (ctx.rolling_max('high', kc_length) + ctx.rolling_min('low', kc_length)) / 2
+    source = ctx.columns['close'] - (avg_hl + kc_ma) / 2
+    momentum = rolling_linreg(source, kc_length, 0)
+    return {
+        'momentum': momentum,
+        'squeeze_on': sqz_on,
+        'squeeze_off': sqz_off,
+        'no_squeeze': no_sqz,
+        'upper_bb': upper_bb,
+        'lower_bb': lower_bb,
+        'upper_kc': upper_kc,
+        'lower_kc': lower_kc,
+    }
@@ -0,0 +1,209 @@
+"""
+后台数据刷新服务：保持股票池（默认 config/code.txt）的本地日K线为最新。
+
+- 行情连接池：复用少量富途连接，不再每只股票打开/关闭一次 OpenQuoteContext
+- 令牌桶限流 + 并发上限，避免触发富途的历史K线频率限制
+- DataLoader 先写临时文件再rename，app.py 的读者只会看到完整的CSV；
+  KlineCache 按文件 mtime/size 发现更新后自动重新加载
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from indicator.data_loader import DataLoader, open_quote_context
+
+logger = logging.getLogger(__name__)
+
+# 富途历史K线接口的频率限制：每30秒最多60次请求
+FUTU_HISTORY_RATE = (60, 30.0)
+
+
+def futu_code(code):
+    """
+    股票池代码 -> 富途代码：已带市场前缀的原样返回，
+    纯数字的A股代码 6/9/5 开头为上海，其余为深圳
+    """
+    if '.' in code or not code.isdigit():
+        return code
+    return f"{'SH' if code[0] in '695' else 'SZ'}.{code}"
+
+
+class RateLimiter:
+    """
+    令牌桶限流：平均每 per 秒 rate 次，最多允许 burst 次突发（默认等于 rate）
+    acquire() 在令牌不足时阻塞到轮到自己为止，多线程安全
+    """
+
+    def __init__(self, rate, per=1.0, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.fill_rate = rate / per  # 每秒补充的令牌数
+        self.burst = burst if burst is not None else rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.fill_rate)
+            self._last = now
+            # 先预订令牌，令牌为负时按欠缺的数量计算需要等待的时间
+            self._tokens -= 1
+            wait = -self._tokens / self.fill_rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+
+
+class QuoteContextPool:
+    """
+    行情连接池：最多 size 个连接，按需创建并在之后复用
+
+    参数:
+    factory: 无参函数，返回新的行情连接（需提供 request_history_kline 与 close）
+    size: 连接数上限，同时也是可并发使用连接的线程数上限
+    """
+
+    def __init__(self, factory, size=2):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._contexts = []
+
+    @contextmanager
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                ctx = self._idle.get_nowait()
+            except queue.Empty:
+                ctx = self.factory()
+                with self._lock:
+                    self._contexts.append(ctx)
+            try:
+                yield ctx
+            finally:
+                self._idle.put(ctx)
+        finally:
+            self._slots.release()
+
+    @property
+    def created(self):
+        with self._lock:
+            return len(self._contexts)
+
+    def close(self):
+        with self._lock:
+            contexts, self._contexts = self._contexts, []
+        self._idle = queue.LifoQueue()
+        for ctx in contexts:
+            try:
+                ctx.close()
+            except Exception as e:
+                logger.warning("关闭行情连接失败: %s", e)
+
+
+class RefreshService:
+    """
+    股票池数据刷新服务
+
+    参数:
+    codes: 股票代码列表（纯数字的A股代码自动补全市场前缀）
+    data_dir: CSV所在目录，文件名为 <code_with_underscore>_daily.csv，与 app.py 的查找规则一致
+    context_factory: 行情连接工厂，默认连接 futu_host:futu_port 的 OpenD；测试时可传入假连接
+    max_workers: 并发刷新的股票数上限（同时也是连接池大小）
+    rate: (次数, 秒)，请求频率上限，默认为富途历史K线的限制
+    interval: start() 后每轮刷新的间隔秒数
+    store: ColumnarStore，刷新后预先生成列式副本
+    on_update: 可选回调 on_update(code)，某只股票的本地数据变化后调用（如通知实时推送）
+    """
+
+    def __init__(self, codes, data_dir, context_factory=None, max_workers=2, rate=FUTU_HISTORY_RATE,
+                 interval=3600, store=None, futu_host='127.0.0.1', futu_port=11111, on_update=None):
+        self.codes = [futu_code(code) for code in codes]
+        self.data_dir = data_dir
+        self.max_workers = max_workers
+        self.interval = interval
+        self.store = store
+        self.on_update = on_update
+        if context_factory is None:
+            context_factory = lambda: open_quote_context(futu_host, futu_port)
+        self.pool = QuoteContextPool(context_factory, size=max_workers)
+        self.rate_limiter = RateLimiter(rate[0], rate[1])
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def csv_path(self, code):
+        return os.path.join(self.data_dir, f"{code.replace('.', '_')}_daily.csv")
+
+    def refresh_code(self, code):
+        """
+        刷新单只股票
+        返回: DataLoader.refresh() 的结果，失败或服务已停止时为None
+        """
+        if self._stop.is_set():
+            return None
+        with self.pool.acquire() as quote_ctx:
+            loader = DataLoader(code, csv_filename=self.csv_path(code), store=self.store,
+                                quote_ctx=quote_ctx, rate_limiter=self.rate_limiter)
+            result = loader.refresh()
+        if result is not None and result['changed'] and self.on_update is not None:
+            try:
+                self.on_update(code)
+            except Exception as e:
+                logger.exception("%s 更新回调失败: %s", code, e)
+        return result
+
+    def refresh_once(self, codes=None):
+        """
+        刷新一轮，本地还没有数据的股票优先下载，已有数据的只增量获取新K线
+        返回: dict，包含 ok/failed 列表、获取与新增的K线总数以及耗时
+        """
+        codes = self.codes if codes is None else [futu_code(code) for code in codes]
+        codes = sorted(codes, key=lambda code: os.path.exists(self.csv_path(code)))
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.refresh_code, codes))
+        result = {
+            'ok': [r for r in results if r is not None],
+            'failed': [code for code, r in zip(codes, results) if r is None],
+            'fetched': sum(r['fetched'] for r in results if r is not None),
+            'merged': sum(r['merged'] for r in results if r is not None),
+            'elapsed': round(time.perf_counter() - begin, 3),
+            'finished_at': time.time(),
+        }
+        self.last_result = result
+        logger.info("刷新完成: 成功 %d，失败 %d，获取 %d 根，新增 %d 根，耗时 %ss", len(result['ok']),
+                    len(result['failed']), result['fetched'], result['merged'], result['elapsed'])
+        return result
+
+    def start(self):
+        """在后台线程中立即刷新一轮，之后每 interval 秒刷新一次"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='kline-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.pool.close()
+
+    def run_forever(self):
+        """在当前线程中立即刷新一轮，之后每 interval 秒刷新一次，直到 stop()"""
+        while not self._stop.is_set():
+            try:
+                self.refresh_once()
+            except Exception as e:
+                logger.exception("刷新异常: %s", e)
+            self._stop.wait(self.interval)
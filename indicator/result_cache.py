@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+
+def result_nbytes(result):
+    """估算缓存结果占用的内存（DataFrame、{列名: 数组}或bytes）"""
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return sum(getattr(values, 'nbytes', 0) for values in result.values())
+
+
+class IndicatorCache:
+    """
+    指标计算结果缓存（memoize），以字节数为上限按LRU淘汰。
+
+    键为 (code, indicator, 规范化参数元组, 数据版本, 区间)，数据版本来自 KlineCache.load，
+    源文件更新后旧版本的键不会再被命中，随后被LRU自然淘汰。
+    缓存的结果为共享对象，调用方不应原地修改。
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (result, nbytes)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(code, indicator, params, version, window=None):
+        return (code, indicator, tuple(params.items()), version, window)
+
+    def get_or_compute(self, key, compute):
+        """
+        命中时直接返回缓存结果，否则调用 compute() 计算并缓存
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 计算放在锁外，避免慢指标阻塞其他请求的命中
+        result = compute()
+        nbytes = result_nbytes(result)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (result, nbytes)
+                self.total_bytes += nbytes
+                while self.total_bytes > self.max_bytes and self._entries:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,243 @@
+"""
+全市场指标筛选：在股票池（默认 config/code.txt）上批量评估指标条件，返回排序后的匹配结果。
+
+- 每只股票只取判断信号所需的最近一段K线（指标预热 + 回看窗口），右对齐成 (品种 × K线) 面板，
+  由 indicator.panel 一次算出全部品种的指标，条件判断同样按行向量化
+- 面板放在一块共享内存中，按品种分块交给进程池，子进程直接映射计算，不再逐只序列化传输K线
+- 股票数较少或只有一个工作进程时在当前进程内计算
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from indicator import panel
+from indicator.indicators import warmup_bars
+from indicator.kline_store import find_kline_file
+
+# 面板计算所需的K线列（按此顺序写入共享内存的第一维）
+INPUT_COLUMNS = ('high', 'low', 'close')
+
+
+def _last_hit(hits):
+    """
+    hits: (品种, lookback) 布尔数组
+    返回: 每行最近一次为True距最后一列的K线数，没有时为-1
+    """
+    if hits.shape[1] == 0:
+        return np.full(hits.shape[0], -1)
+    bars_ago = np.argmax(hits[:, ::-1], axis=1)
+    return np.where(hits.any(axis=1), bars_ago, -1)
+
+
+def _supertrend_signal(column):
+    """最近 lookback 根K线内出现 SuperTrend 买/卖信号；得分为收盘价与趋势线的相对距离"""
+    def check(result, close, lookback):
+        bars_ago = _last_hit(result[column][:, -lookback:])
+        line = result['supertrend'][:, -1]
+        with np.errstate(invalid='ignore'):
+            score = np.abs(close[:, -1] - line) / close[:, -1]
+        return bars_ago, np.nan_to_num(score)
+    return check
+
+
+def _squeeze_fired(result, close, lookback):
+    """挤压在最近 lookback 根K线内释放且动量为正；得分为动量相对收盘价的大小"""
+    on = result['squeeze_on']
+    momentum = result['momentum']
+    with np.errstate(invalid='ignore'):
+        fired = on[:, :-1] & ~on[:, 1:] & (momentum[:, 1:] > 0)
+    bars_ago = _last_hit(fired[:, -lookback:])
+    i = on.shape[1] - 1 - np.maximum(bars_ago, 0)
+    rows = np.arange(on.shape[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = momentum[rows, i] / close[rows, i]
+    return bars_ago, np.nan_to_num(score)
+
+
+def _squeeze_on(result, close, lookback):
+    """当前处于挤压状态；得分为连续挤压的K线数"""
+    on = result['squeeze_on']
+    if on.shape[1] == 0:
+        return np.full(on.shape[0], -1), np.zeros(on.shape[0])
+    off = ~on[:, ::-1]
+    run = np.where(off.any(axis=1), np.argmax(off, axis=1), on.shape[1])
+    return np.where(on[:, -1], 0, -1), run.astype(np.float64)
+
+
+# 条件名 -> (所需指标, 判断函数)
+# 判断函数按行返回 (bars_ago, score)，bars_ago 为-1表示不匹配；结果按 bars_ago 升序、score 降序排列
+SCREEN_CONDITIONS = {
+    'supertrend_buy': ('supertrend', _supertrend_signal('buy')),
+    'supertrend_sell': ('supertrend', _supertrend_signal('sell')),
+    'squeeze_fired': ('squeeze_momentum', _squeeze_fired),
+    'squeeze_on': ('squeeze_momentum', _squeeze_on),
+}
+
+# 指标名 -> 面板计算函数
+PANEL_INDICATORS = {
+    'supertrend': panel.supertrend,
+    'squeeze_momentum': panel.squeeze_momentum,
+}
+
+
+def load_universe(path):
+    """读取股票池文件，每行一个代码，忽略空行与#注释"""
+    with open(path, encoding='utf-8') as f:
+        codes = [line.split('#', 1)[0].strip() for line in f]
+    return [code for code in codes if code]
+
+
+def resolve_code(data_dir, code):
+    """
+    将股票池中的代码对应到本地K线文件的代码
+    纯数字的A股代码依次尝试 SH./SZ. 前缀（6/9/5开头优先上海），再尝试 HK.
+    返回: 有数据文件的代码，找不到时返回None
+    """
+    candidates = [code]
+    if code.isdigit():
+        markets = ['SH', 'SZ'] if code[0] in '695' else ['SZ', 'SH']
+        candidates += [f'{market}.{code}' for market in markets + ['HK']]
+    for candidate in candidates:
+        if find_kline_file(data_dir, candidate):
+            return candidate
+    return None
+
+
+def screen_panel(data, condition, params, lookback):
+    """
+    在面板上评估条件
+    参数:
+    data: (len(INPUT_COLUMNS), 品种, K线) 的float64数组，各品种右对齐、左侧NaN填充
+    返回: (bars_ago, score)，均为长度等于品种数的数组，bars_ago 为-1表示不匹配
+    """
+    indicator, check = SCREEN_CONDITIONS[condition]
+    ctx = panel.PanelContext({name: data[row] for row, name in enumerate(INPUT_COLUMNS)})
+    result = PANEL_INDICATORS[indicator](ctx, **params)
+    return check(result, ctx.columns['close'], lookback)
+
+
+def _screen_shared(shm_name, shape, lo, hi, condition, params, lookback):
+    """
+    进程池任务：映射共享内存，计算第 [lo, hi) 只股票。
+    子进程与创建者共用同一个资源跟踪器，由创建者负责 unlink
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        result = screen_panel(data[:, lo:hi], condition, params, lookback)
+        del data  # 释放对共享内存缓冲区的引用后才能close
+        return result
+    finally:
+        shm.close()
+
+
+class Screener:
+    """
+    股票池筛选器，进程池在首次并行扫描时创建并在之后复用
+
+    参数:
+    kline_cache: KlineCache，提供K线数据
+    workers: 进程数，None为CPU核数
+    chunk_size: 每个进程池任务包含的股票数
+    parallel_threshold: 股票数少于此值时在当前进程内计算
+    """
+
+    def __init__(self, kline_cache, workers=None, chunk_size=256, parallel_threshold=512):
+        self.kline_cache = kline_cache
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+        self._pool = None
+
+    def scan(self, condition, codes, params, lookback=1, top=None):
+        """
+        参数:
+        condition: SCREEN_CONDITIONS 中的条件名
+        codes: 股票代码列表（已可直接加载）
+        params: 指标的规范化参数
+        lookback: 信号回看的K线数，1表示只看最新一根
+        top: 最多返回的匹配数
+        返回: dict，包含排序后的 matches 以及 scanned/skipped/elapsed 统计
+        """
+        begin = time.perf_counter()
+        indicator, _ = SCREEN_CONDITIONS[condition]
+        # 判断信号只需要最近的K线：预热 + 回看 + 前一根（判断状态切换）
+        width = warmup_bars(indicator, params) + lookback + 1
+
+        frames = {}
+        skipped = []
+        for code in codes:
+            df = self.kline_cache.get(code)
+            if df is None or len(df) == 0:
+                skipped.append(code)
+            else:
+                frames[code] = df
+        scanned = list(frames)
+        shape = (len(INPUT_COLUMNS), len(scanned), width)
+
+        if self._parallel(len(scanned)):
+            bars_ago, score = self._scan_pool(frames, shape, condition, params, lookback)
+        else:
+            data = self._pack(np.empty(shape), frames)
+            bars_ago, score = screen_panel(data, condition, params, lookback)
+
+        hits = np.flatnonzero(bars_ago >= 0)
+        order = sorted(hits.tolist(), key=lambda i: (bars_ago[i], -score[i], scanned[i]))
+        if top is not None:
+            order = order[:top]
+        rows = []
+        for i in order:
+            df = frames[scanned[i]]
+            rows.append({
+                'code': scanned[i],
+                'time': df['time'].iat[len(df) - 1 - bars_ago[i]],
+                'bars_ago': int(bars_ago[i]),
+                'score': float(score[i]),
+                'close': float(df['close'].iat[-1]),
+            })
+        return {
+            'condition': condition,
+            'indicator': indicator,
+            'params': params,
+            'lookback': lookback,
+            'scanned': len(scanned),
+            'skipped': skipped,
+            'matches': rows,
+            'elapsed': round(time.perf_counter() - begin, 4),
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _parallel(self, count):
+        return self.workers > 1 and count >= max(self.parallel_threshold, 1)
+
+    @staticmethod
+    def _pack(data, frames):
+        for row, name in enumerate(INPUT_COLUMNS):
+            panel.align_right([df[name].to_numpy() for df in frames.values()], data.shape[2], out=data[row])
+        return data
+
+    def _scan_pool(self, frames, shape, condition, params, lookback):
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        try:
+            data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            self._pack(data, frames)
+            del data
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [
+                self._pool.submit(_screen_shared, shm.name, shape, lo, min(lo + self.chunk_size, shape[1]),
+                                  condition, params, lookback)
+                for lo in range(0, shape[1], self.chunk_size)
+            ]
+            results = [future.result() for future in futures]
+            return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,172 @@
+"""
+接口数据的JSON序列化：直接从列数组生成JSON，NaN 统一输出为 null。
+
+支持两种响应形状：
+- records: [{"time": ..., "close": ...}, ...]，与原 to_dict(orient='records') 相同
+- columns: {"time": [...], "close": [...]}，省去逐行对象，体积更小、解析更快
+
+另有二进制格式（bin），见 binary_chunks：小的JSON头 + 按列排列的小端数组，
+浏览器直接创建 Float64Array/Int32Array 视图，无需文本解析。
+"""
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库
+    orjson = None
+
+LAYOUTS = ('records', 'columns')
+
+BINARY_LAYOUT = 'bin'
+BINARY_MIMETYPE = 'application/octet-stream'
+BINARY_MAGIC = b'SSB1'
+_ALIGN = 8  # 各列数据按8字节对齐，客户端可直接创建 Float64Array 视图
+_INT32_MIN, _INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def column_values(values):
+    """
+    单列数组转为可JSON序列化的list，NaN/NaT/None -> None
+    """
+    arr = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if arr.dtype.kind == 'f':
+        out = arr.tolist()
+        for i in np.flatnonzero(~np.isfinite(arr)).tolist():
+            out[i] = None
+        return out
+    if arr.dtype.kind in 'iub':
+        return arr.tolist()
+    out = arr.tolist()
+    for i in np.flatnonzero(pd.isna(arr)).tolist():
+        out[i] = None
+    return out
+
+
+def columns_payload(columns, layout='records'):
+    """
+    参数:
+    columns: {列名: 数组}，按插入顺序输出
+    layout: 'records' 或 'columns'
+    返回: 可直接JSON序列化的list或dict，便于嵌入更大的响应（如批量接口）
+    """
+    names = list(columns)
+    lists = [column_values(columns[name]) for name in names]
+    if layout == 'columns':
+        return dict(zip(names, lists))
+    return [dict(zip(names, row)) for row in zip(*lists)]
+
+
+def dumps(payload):
+    """JSON对象 -> bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_columns(columns, layout='records'):
+    """
+    {列名: 数组} -> JSON bytes，参数同 columns_payload
+    """
+    return dumps(columns_payload(columns, layout))
+
+
+def dumps_frame(df, fields=None, layout='records'):
+    """
+    DataFrame -> JSON bytes，fields为None时输出全部列
+    """
+    fields = list(df.columns) if fields is None else fields
+    return dumps_columns({name: df[name] for name in fields}, layout)
+
+
+def empty_payload(layout='records'):
+    return b'{}' if layout == 'columns' else b'[]'
+
+
+def _pad(length):
+    return b'\0' * (-length % _ALIGN)
+
+
+def _binary_column(name, values):
+    """
+    单列 -> (头部描述, 数据buffer)
+    float -> f8；整数/布尔 -> i4（超出int32范围时为f8）；日期/日期字符串 -> date（自1970-01-01的天数，i4）；
+    其余（如颜色字符串）-> cat（i4编码 + categories，-1 表示空值）
+    """
+    arr = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    kind = arr.dtype.kind
+    if kind == 'f':
+        # 已是连续的小端float64时不复制（如缓存中的内存映射列）
+        return {'name': name, 'type': 'f8'}, np.ascontiguousarray(arr, dtype='<f8')
+    if kind in 'iub':
+        if arr.size and (arr.min() < _INT32_MIN or arr.max() > _INT32_MAX):
+            # 超出int32的整数（如成交量）按float64传输，2^53以内仍是精确值
+            return {'name': name, 'type': 'f8'}, np.ascontiguousarray(arr, dtype='<f8')
+        return {'name': name, 'type': 'i4'}, np.ascontiguousarray(arr, dtype='<i4')
+    if kind == 'M' or name == 'time':
+        days = np.asarray(arr, dtype='datetime64[D]').astype('<i4')
+        return {'name': name, 'type': 'date'}, days
+    codes, categories = pd.factorize(arr)
+    return ({'name': name, 'type': 'cat', 'categories': [str(c) for c in categories]},
+            codes.astype('<i4'))
+
+
+def binary_chunks(columns):
+    """
+    {列名: 数组} -> 二进制响应的分段列表（bytes/memoryview），可直接作为WSGI响应体，数值列不复制
+
+    格式:
+    - 4字节 magic 'SSB1'，4字节小端uint32：JSON头长度（含补齐的空格，8 + 头长度为8的倍数）
+    - JSON头：{"rows": 行数, "columns": [{"name", "type", "offset"[, "categories"]}]}
+    - 各列数据，offset 为相对头部之后数据区开头的字节偏移，均为8的倍数
+    """
+    specs = []
+    buffers = []
+    offset = 0
+    for name in columns:
+        spec, data = _binary_column(name, columns[name])
+        spec['offset'] = offset
+        specs.append(spec)
+        buffers.append(data)
+        offset += data.nbytes + len(_pad(data.nbytes))
+    rows = len(buffers[0]) if buffers else 0
+    header = json.dumps({'rows': rows, 'columns': specs}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header += _pad(8 + len(header)).replace(b'\0', b' ')
+    chunks = [BINARY_MAGIC + struct.pack('<I', len(header)) + header]
+    for data in buffers:
+        chunks.append(memoryview(data).cast('B'))
+        if data.nbytes % _ALIGN:
+            chunks.append(_pad(data.nbytes))
+    return chunks
+
+
+def dumps_binary(columns):
+    """{列名: 数组} -> 二进制格式的bytes，格式见 binary_chunks"""
+    return b''.join(binary_chunks(columns))
+
+
+def loads_binary(body):
+    """
+    二进制格式 -> {列名: 数组}（与 static/lightweight-charts.js 的 decodeBinaryColumns 对应）
+    f8/i4 列为只读的 numpy 视图；date 列为 '%Y-%m-%d' 字符串数组；cat 列为对象数组，空值为None
+    """
+    if bytes(body[:4]) != BINARY_MAGIC:
+        raise ValueError('不是有效的二进制数据')
+    header_len = struct.unpack_from('<I', body, 4)[0]
+    header = json.loads(bytes(body[8:8 + header_len]))
+    start = 8 + header_len
+    rows = header['rows']
+    out = {}
+    for spec in header['columns']:
+        dtype = '<f8' if spec['type'] == 'f8' else '<i4'
+        values = np.frombuffer(body, dtype=dtype, count=rows, offset=start + spec['offset'])
+        if spec['type'] == 'date':
+            values = np.datetime_as_string(values.astype('datetime64[D]'))
+        elif spec['type'] == 'cat':
+            categories = np.array(spec['categories'] + [None], dtype=object)
+            values = categories[values]  # -1 取到末尾的None
+        out[spec['name']] = values
+    return out
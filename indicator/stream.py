@@ -0,0 +1,449 @@
+"""
+实时推送：把新K线、盘中更新的K线及对应的指标增量推送给订阅的客户端（Server-Sent Events）。
+
+- 每只股票一个 SymbolStream：指标由 IncrementalIndicators 增量计算，每笔更新只计算、
+  只序列化一次，再把同一份数据帧分发给该股票的全部订阅者
+- 一个客户端连接对应一个 Subscription，可同时订阅多只股票；每个订阅有界队列，
+  消费过慢（队列已满）或已推送的历史K线被修订时收到 reset 事件并断开，由客户端重新加载全量数据
+- SimulatedTickFeed 在本地生成随机成交，用于开发与测试
+- StreamWatcher 定期检查数据文件是否更新，用于刷新服务在其他进程中运行时（如 gunicorn 多 worker）
+"""
+import logging
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicator.incremental import IncrementalIndicators
+from indicator.serialize import dumps
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+KEEPALIVE = b': keepalive\n\n'
+
+
+def format_event(event, data, event_id=None):
+    """
+    一个SSE数据帧
+
+    参数:
+    event: 事件名
+    data: JSON bytes（不含换行）
+    event_id: 事件序号，客户端断线重连时通过 Last-Event-ID 带回
+    """
+    head = f'event: {event}\n' if event_id is None else f'id: {event_id}\nevent: {event}\n'
+    return head.encode('utf-8') + b'data: ' + data + b'\n\n'
+
+
+def clean_bar(bar):
+    """K线dict -> 只含 BAR_FIELDS 的可序列化dict（numpy 标量转为 Python 类型）"""
+    out = {'time': str(bar['time'])}
+    for name in BAR_FIELDS[1:]:
+        value = bar.get(name)
+        if value is not None:
+            out[name] = float(value)
+    return out
+
+
+class Subscription:
+    """
+    一个客户端连接的订阅
+
+    参数:
+    max_queue: 待发送帧的上限，超过时视为消费过慢
+    """
+
+    def __init__(self, max_queue=256):
+        self.codes = []
+        self.lagged = False
+        self.closed = False
+        self.reset_reason = None
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def put(self, frame):
+        """返回: False 表示队列已满，订阅已标记为过慢"""
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.lagged = True
+            self.reset_reason = 'lagged'
+            return False
+
+    def reset(self, reason):
+        """要求客户端重新加载全量数据：下一次 get 返回 reset 事件并关闭订阅"""
+        self.reset_reason = reason
+        try:
+            self._queue.put_nowait(None)  # 唤醒等待中的 get
+        except queue.Full:
+            pass
+
+    def get(self, timeout=None):
+        """
+        取下一帧，超时返回None；订阅过慢或被 reset 时丢弃积压的帧，返回 reset 事件并关闭订阅
+        """
+        if self.reset_reason is None:
+            try:
+                frame = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if frame is not None:
+                return frame
+        if self.reset_reason is None:
+            return None
+        self.closed = True
+        return format_event('reset', dumps({'codes': self.codes, 'reason': self.reset_reason}))
+
+    def frames(self, keepalive=15.0, retry=3000):
+        """
+        SSE响应体的生成器：先发送重连间隔，之后逐帧输出，空闲 keepalive 秒发送一次注释行保持连接
+        """
+        yield f'retry: {retry}\n\n'.encode('utf-8')
+        while not self.closed:
+            frame = self.get(timeout=keepalive)
+            yield KEEPALIVE if frame is None else frame
+
+
+class SymbolStream:
+    """
+    一只股票的推送流
+
+    参数:
+    code: 股票代码
+    df: 历史K线（至少一根），用于播种增量指标
+    indicators: {指标名: 参数}，默认为 INCREMENTAL_INDICATORS 的默认参数
+    version: df 的数据版本（KlineCache.load 的 version），用于判断重新加载的数据是否变化
+    """
+
+    def __init__(self, code, df, indicators=None, version=None):
+        self.code = code
+        self.config = indicators
+        self.version = version
+        self.seq = 0
+        self.computed = 0  # 指标计算次数，与订阅者数量无关
+        self.last_frame = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # 串行化 sync，同一数据版本只应用一次
+        self._seed(df)
+
+    def _seed(self, df):
+        # 播种后可直接替换最后一根（盘中更新）
+        self.indicators = IncrementalIndicators(self.config)
+        self.indicators.seed(df)
+        self.source = df  # 播种或最近一次同步所用的历史K线
+        self.last_bar = clean_bar(df.iloc[-1].to_dict())
+        self._published = {}  # 播种/同步之后推送的K线（time -> bar），用于判断历史是否被修订
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def add(self, sub):
+        """加入订阅者，并先推送最新一根K线的状态（若已有推送）"""
+        with self._lock:
+            if self.last_frame is not None:
+                sub.put(self.last_frame)
+            self._subscribers.append(sub)
+
+    def remove(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def publish(self, bar):
+        """
+        推送一根K线：时间与最后一根相同时为盘中更新（替换），更晚时为新K线
+
+        参数:
+        bar: dict，包含 time/open/high/low/close，可选 volume
+        返回: 推送的事件；早于最后一根的K线被忽略，返回None
+        """
+        bar = clean_bar(bar)
+        with self._lock:
+            if bar['time'] < self.last_bar['time']:
+                return None
+            replace = bar['time'] == self.last_bar['time']
+            values = self.indicators.update(bar, replace=replace)
+            self.computed += 1
+            self.seq += 1
+            event = {'code': self.code, 'seq': self.seq, 'replace': replace, 'bar': bar, 'indicators': values}
+            frame = format_event('bar', dumps(event), self.seq)
+            self.last_bar = bar
+            self.last_frame = frame
+            self._published[bar['time']] = bar
+            for sub in [sub for sub in self._subscribers if not sub.put(frame)]:
+                self._subscribers.remove(sub)
+        return event
+
+    def sync(self, df, version=None):
+        """
+        与重新加载的历史K线对齐：替换最后一根并追加其后的新K线（如后台刷新写入新数据后）。
+        最后一根之前已推送过的K线被修订（如数据源更正、去重时以新数据为准）时，
+        增量状态已不可用：向全部订阅者发送 reset，并用新数据重新播种
+
+        参数:
+        version: df 的数据版本，与已同步的版本相同时不做任何处理；None 表示总是同步
+        返回: 推送的K线数
+        """
+        # 后台刷新回调与 StreamWatcher 可能同时同步同一只股票，比较与更新版本需在同一把锁内
+        with self._sync_lock:
+            if version is not None and version == self.version:
+                return 0
+            pushed = self._sync(df)
+            if version is not None:
+                self.version = version
+            return pushed
+
+    def _sync(self, df):
+        fields = [name for name in BAR_FIELDS if name in df.columns]
+        times = df['time'].to_numpy()
+        start = int(np.searchsorted(times, self.last_bar['time']))
+        with self._lock:
+            revised = self._history_revised(df, start, fields)
+            if revised:
+                subscribers, self._subscribers = self._subscribers, []
+                self.last_frame = None
+                self._seed(df)
+        if revised:
+            for sub in subscribers:
+                sub.reset('revised')
+            return 0
+        bars = df.iloc[start:][fields].to_dict(orient='records')
+        pushed = sum(self.publish(bar) is not None for bar in bars)
+        with self._lock:
+            self.source = df
+            last_time = str(times[-1])
+            self._published = {time: bar for time, bar in self._published.items() if time > last_time}
+        return pushed
+
+    def _history_revised(self, df, start, fields):
+        """
+        df 中最后一根之前的K线（前 start 根）与已推送的是否不同：
+        播种/同步之后推送过的K线与推送的值比较，其余与上次的历史数据比较
+        """
+        old = self.source
+        old_times = old['time'].to_numpy()
+        cut = int(np.searchsorted(old_times, self.last_bar['time']))
+        if self._published:
+            cut = min(cut, int(np.searchsorted(old_times, min(self._published))))
+        if start < cut:
+            return True
+        for name in fields:
+            if name not in old.columns:
+                return True
+            a, b = df[name].to_numpy()[:cut], old[name].to_numpy()[:cut]
+            same = np.array_equal(a, b) if name == 'time' else np.array_equal(
+                a.astype(np.float64), b.astype(np.float64), equal_nan=True)
+            if not same:
+                return True
+        for row in df.iloc[cut:start][fields].to_dict(orient='records'):
+            time = str(row['time'])
+            expected = self._published.get(time)
+            if expected is None:
+                i = int(np.searchsorted(old_times, time))
+                if i == len(old) or old_times[i] != time:
+                    return True  # 从未推送过的K线
+                expected = clean_bar(old.iloc[i][fields].to_dict())
+            if clean_bar(row) != expected:
+                return True
+        return False
+
+
+class StreamHub:
+    """
+    全部股票的推送流，按需创建
+
+    参数:
+    loader: code -> (历史K线DataFrame, 数据版本)，无数据时为 (None, None)，如 KlineCache.load
+    indicators: 传给 SymbolStream 的指标配置
+    max_queue: 每个订阅的队列上限
+    """
+
+    def __init__(self, loader, indicators=None, max_queue=256):
+        self.loader = loader
+        self.indicators = indicators
+        self.max_queue = max_queue
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def codes(self):
+        with self._lock:
+            return list(self._streams)
+
+    def stream(self, code, create=True):
+        """返回: 该股票的 SymbolStream，没有历史数据时为None"""
+        with self._lock:
+            stream = self._streams.get(code)
+        if stream is not None or not create:
+            return stream
+        # 加载与播种在锁外进行，不阻塞其他股票的推送；并发创建时保留先插入的一个
+        df, version = self.loader(code)
+        if df is None or len(df) == 0:
+            return None
+        stream = SymbolStream(code, df, self.indicators, version)
+        with self._lock:
+            return self._streams.setdefault(code, stream)
+
+    def subscribe(self, codes):
+        """
+        返回: (Subscription, 没有数据的代码列表)，Subscription.codes 为实际订阅的代码
+        """
+        sub = Subscription(self.max_queue)
+        missing = []
+        for code in codes:
+            stream = self.stream(code)
+            if stream is None:
+                missing.append(code)
+                continue
+            stream.add(sub)
+            sub.codes.append(code)
+        return sub, missing
+
+    def unsubscribe(self, sub):
+        sub.closed = True
+        for code in sub.codes:
+            stream = self.stream(code, create=False)
+            if stream is not None:
+                stream.remove(sub)
+
+    def publish(self, code, bar):
+        """推送一根K线，参见 SymbolStream.publish；该股票没有数据时返回None"""
+        stream = self.stream(code)
+        return None if stream is None else stream.publish(bar)
+
+    def sync(self, code):
+        """
+        已有推送流的股票重新加载历史K线，数据版本变化时推送变化，供后台刷新回调
+        返回: 推送的K线数
+        """
+        stream = self.stream(code, create=False)
+        if stream is None:
+            return 0
+        df, version = self.loader(code)
+        if df is None or len(df) == 0:
+            return 0
+        return stream.sync(df, version)
+
+    def sync_all(self):
+        """所有推送流各同步一次，返回推送的K线总数"""
+        return sum(self.sync(code) for code in self.codes())
+
+    def stats(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        return {
+            'streams': len(streams),
+            'subscribers': sum(stream.subscribers for stream in streams),
+            'computed': sum(stream.computed for stream in streams),
+        }
+
+
+class SimulatedTickFeed:
+    """
+    本地模拟行情：每 interval 秒为每只股票生成一笔成交，更新当前K线（盘中替换），
+    每 ticks_per_bar 笔后开始下一个交易日的新K线。价格为几何随机游走。
+
+    参数:
+    hub: StreamHub
+    codes: 模拟的股票代码，None 表示 hub 中当前已有推送流的全部股票
+    volatility: 每笔成交的对数收益率标准差
+    seed: 随机种子
+    """
+
+    def __init__(self, hub, codes=None, interval=1.0, ticks_per_bar=10, volatility=0.002, seed=None):
+        self.hub = hub
+        self.codes = codes
+        self.interval = interval
+        self.ticks_per_bar = ticks_per_bar
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+        self._ticks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_bar(self, code):
+        """该股票的下一笔成交后的K线"""
+        stream = self.hub.stream(code)
+        if stream is None:
+            return None
+        bar = dict(stream.last_bar)
+        ticks = self._ticks.get(code, 0)
+        price = bar['close'] * float(np.exp(self.rng.normal(0.0, self.volatility)))
+        volume = float(self.rng.integers(100, 10000))
+        if ticks >= self.ticks_per_bar:
+            day = pd.Timestamp(bar['time']) + pd.offsets.BDay(1)
+            bar = {'time': day.strftime('%Y-%m-%d'), 'open': price, 'high': price, 'low': price, 'close': price,
+                   'volume': volume}
+            ticks = 0
+        else:
+            bar.update(high=max(bar['high'], price), low=min(bar['low'], price), close=price,
+                       volume=bar.get('volume', 0.0) + volume)
+        self._ticks[code] = ticks + 1
+        return bar
+
+    def tick(self):
+        """
+        所有股票各成交一笔
+        返回: 推送的事件列表
+        """
+        events = []
+        for code in self.hub.codes() if self.codes is None else self.codes:
+            bar = self.next_bar(code)
+            if bar is not None:
+                events.append(self.hub.publish(code, bar))
+        return events
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='simulated-ticks', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.exception("模拟行情异常: %s", e)
+
+
+class StreamWatcher:
+    """
+    每 interval 秒调用一次 hub.sync_all()，把其他进程写入的新K线推送给本进程的订阅者
+    """
+
+    def __init__(self, hub, interval=30.0):
+        self.hub = hub
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stream-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.hub.sync_all()
+            except Exception as e:
+                logger.exception("同步数据更新失败: %s", e)
@@ -1,55 +1,14 @@
-from futu import OpenQuoteContext
 import pandas as pd
 import numpy as np
-import traceback
-import os
 import matplotlib.pyplot as plt
 import mplfinance as mpf
 
-class DataLoader:
-    def __init__(self, code, csv_filename=None, futu_host='127.0.0.1', futu_port=11111):
-        self.code = code  # 形如 'HK.09660'
-        if csv_filename is None:
-            self.csv_filename = f"{code.replace('.', '_')}_daily.csv"
-        else:
-            self.csv_filename = csv_filename
-        self.futu_host = futu_host
-        self.futu_port = futu_port
-
-    def load(self, use_cache=True):
-        """
-        加载数据，优先使用本地缓存（csv），否则从富途下载。
-        返回: pd.DataFrame
-        """
-        if use_cache and os.path.exists(self.csv_filename):
-            print(f"[DataLoader] 使用本地缓存: {self.csv_filename}")
-            return pd.read_csv(self.csv_filename)
-        else:
-            print(f"[DataLoader] 本地无缓存，尝试从富途下载: {self.code}")
-            return self._download_from_futu()
-
-    def _download_from_futu(self):
-        quote_ctx = OpenQuoteContext(host=self.futu_host, port=self.futu_port)
-        try:
-            result = quote_ctx.request_history_kline(self.code, ktype='K_DAY')
-            if isinstance(result, tuple) and len(result) >= 2:
-                ret, data = result[0], result[1]
-            else:
-                raise RuntimeError(f"返回值格式异常: {result}")
-            if ret == 0 and data is not None and not data.empty:
-                print(f"[DataLoader] 下载成功，保存为 {self.csv_filename}")
-                data.to_csv(self.csv_filename, index=False)
-                return data
-            else:
-                print(f"[DataLoader] 获取数据失败: {data}")
-                return None
-        except Exception as e:
-            print('[DataLoader] 获取或保存数据时发生异常:')
-            print(e)
-            traceback.print_exc()
-            return None
-        finally:
-            quote_ctx.close()
+try:
+    from indicator.data_loader import DataLoader
+    from indicator.kernels import supertrend_kernel, trend_signals
+except ImportError:  # 在indicator目录下直接运行本脚本时
+    from data_loader import DataLoader
+    from kernels import supertrend_kernel, trend_signals
 
 class TechAnalysis:
     def __init__(self, data):
@@ -85,23 +44,11 @@ class TechAnalysis:
             atr = self._sma(tr, period=period)
         up = src - multiplier * atr
         dn = src + multiplier * atr
-        trend = np.ones(len(df))
-        up_adj = up.copy()
-        dn_adj = dn.copy()
-        for i in range(1, len(df)):
-            # 先继承前值
-            up_adj.iloc[i] = up.iloc[i] if (df['close'].iloc[i-1] <= up_adj.iloc[i-1]) else max(up.iloc[i], up_adj.iloc[i-1])
-            dn_adj.iloc[i] = dn.iloc[i] if (df['close'].iloc[i-1] >= dn_adj.iloc[i-1]) else min(dn.iloc[i], dn_adj.iloc[i-1])
-            # 趋势切换
-            if trend[i-1] == -1 and df['close'].iloc[i] > dn_adj.iloc[i-1]:
-                trend[i] = 1
-            elif trend[i-1] == 1 and df['close'].iloc[i] < up_adj.iloc[i-1]:
-                trend[i] = -1
-            else:
-                trend[i] = trend[i-1]
+        up_adj, dn_adj, trend = supertrend_kernel(df['close'].to_numpy(), up.to_numpy(), dn.to_numpy())
+        buy, sell = trend_signals(trend)
         trend_series = pd.Series(trend, index=df.index)
-        buy_signal = (trend_series == 1) & (trend_series.shift(1) == -1)
-        sell_signal = (trend_series == -1) & (trend_series.shift(1) == 1)
+        buy_signal = pd.Series(buy, index=df.index)
+        sell_signal = pd.Series(sell, index=df.index)
         df['supertrend_up'] = up_adj
         df['supertrend_dn'] = dn_adj
         df['supertrend_trend'] = trend_series
@@ -1,65 +1,55 @@
+import logging
+
 import pandas as pd
 import numpy as np
-from scipy import stats
+from indicator import panel
+from indicator.panel import PanelContext
+
+logger = logging.getLogger(__name__)
+
+class IndicatorContext(PanelContext):
+    """
+    单只股票的 PanelContext（1 × n 面板）。
+
+    批量计算多个指标时共用 TR、滚动均值/标准差/极值等中间结果；
+    不传入时每个指标各自创建，行为与单独计算相同。
+    """
+
+    def __init__(self, df):
+        columns = {name: df[name].to_numpy(dtype=np.float64)[np.newaxis, :]
+                   for name in ('open', 'high', 'low', 'close') if name in df.columns}
+        super().__init__(columns)
+        self.df = df
+
 
 class TechAnalysis:
     @staticmethod
-    def supertrend(df, period=10, multiplier=3.0):
-        src = (df['high'] + df['low']) / 2
-        tr = pd.concat([
-            df['high'] - df['low'],
-            (df['high'] - df['close'].shift(1)).abs(),
-            (df['low'] - df['close'].shift(1)).abs()
-        ], axis=1).max(axis=1)
-        atr = tr.rolling(window=period, min_periods=period).mean()
-        up = src - multiplier * atr
-        dn = src + multiplier * atr
-        trend = np.ones(len(df))
-        up_adj = up.copy()
-        dn_adj = dn.copy()
-        for i in range(1, len(df)):
-            up_adj.iloc[i] = up.iloc[i] if (df['close'].iloc[i-1] <= up_adj.iloc[i-1]) else max(up.iloc[i], up_adj.iloc[i-1])
-            dn_adj.iloc[i] = dn.iloc[i] if (df['close'].iloc[i-1] >= dn_adj.iloc[i-1]) else min(dn.iloc[i], dn_adj.iloc[i-1])
-            if trend[i-1] == -1 and df['close'].iloc[i] > dn_adj.iloc[i-1]:
-                trend[i] = 1
-            elif trend[i-1] == 1 and df['close'].iloc[i] < up_adj.iloc[i-1]:
-                trend[i] = -1
-            else:
-                trend[i] = trend[i-1]
-        trend_series = pd.Series(trend, index=df.index)
-        buy_signal = (trend_series == 1) & (trend_series.shift(1) == -1)
-        sell_signal = (trend_series == -1) & (trend_series.shift(1) == 1)
-        # 创建SuperTrend线：上升趋势显示下轨，下降趋势显示上轨
-        st_line = np.where(trend_series == 1, up_adj, dn_adj)
-        
-        # 确保SuperTrend值有效
-        st_series = pd.Series(st_line, index=df.index)
-        
-        # 过滤掉0值和无效值
-        st_series = st_series.where((st_series > 0) & (st_series.notna()), None)
-        
-        # 调试信息
-        print(f"SuperTrend计算完成:")
-        print(f"  数据长度: {len(df)}")
-        print(f"  有效SuperTrend值: {st_series.notna().sum()}")
-        if st_series.notna().sum() > 0:
-            print(f"  SuperTrend范围: {st_series.min():.2f} - {st_series.max():.2f}")
-        print(f"  上升趋势数量: {(trend_series == 1).sum()}")
-        print(f"  下降趋势数量: {(trend_series == -1).sum()}")
-        print(f"  前5个SuperTrend值: {st_series.head().tolist()}")
-        print(f"  后5个SuperTrend值: {st_series.tail().tolist()}")
-        print(f"  零值数量: {(st_series == 0).sum()}")
-        
+    def supertrend(df, period=10, multiplier=3.0, ctx=None):
+        ctx = ctx or IndicatorContext(df)
+        result = panel.supertrend(ctx, period, multiplier)
+        st_series = pd.Series(result['supertrend'][0], index=df.index)  # 0值和无效值为NaN，序列化时输出为null
+        trend_series = pd.Series(result['trend'][0], index=df.index)
+        
+        # 调试信息：统计本身需要遍历整列，只在开启 DEBUG 日志时计算
+        if logger.isEnabledFor(logging.DEBUG):
+            valid = st_series.notna().sum()
+            logger.debug(
+                "SuperTrend计算完成: 数据长度 %d，有效值 %d，范围 %s，上升趋势 %d，下降趋势 %d，"
+                "前5个值 %s，后5个值 %s，零值 %d",
+                len(df), valid, f"{st_series.min():.2f} - {st_series.max():.2f}" if valid else '-',
+                (trend_series == 1).sum(), (trend_series == -1).sum(),
+                st_series.head().tolist(), st_series.tail().tolist(), (st_series == 0).sum())
+
         return pd.DataFrame({
             'time': df['time'],
             'supertrend': st_series,
             'trend': trend_series.astype(int),
-            'buy': buy_signal.astype(int),
-            'sell': sell_signal.astype(int)
+            'buy': result['buy'][0].astype(int),
+            'sell': result['sell'][0].astype(int)
         })
     
     @staticmethod
-    def squeeze_momentum(df, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5, use_true_range=True):
+    def squeeze_momentum(df, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5, use_true_range=True, ctx=None):
         """
         Squeeze Momentum Indicator [LazyBear]
         
@@ -69,61 +59,13 @@ class TechAnalysis:
         kc_length: 肯特纳通道长度 (默认20)
         kc_mult: 肯特纳通道倍数 (默认1.5)
         use_true_range: 是否使用真实波幅 (默认True)
+        ctx: IndicatorContext，批量计算时共用中间结果
         """
-        source = df['close']
-        
-        # 计算布林带 (Bollinger Bands)
-        bb_basis = source.rolling(window=bb_length).mean()
-        bb_dev = bb_mult * source.rolling(window=bb_length).std()
-        upper_bb = bb_basis + bb_dev
-        lower_bb = bb_basis - bb_dev
-        
-        # 计算肯特纳通道 (Keltner Channel)
-        kc_ma = source.rolling(window=kc_length).mean()
-        
-        if use_true_range:
-            # 计算真实波幅 (True Range)
-            tr = pd.concat([
-                df['high'] - df['low'],
-                (df['high'] - df['close'].shift(1)).abs(),
-                (df['low'] - df['close'].shift(1)).abs()
-            ], axis=1).max(axis=1)
-            range_ma = tr.rolling(window=kc_length).mean()
-        else:
-            # 使用简单的高低价差
-            range_val = df['high'] - df['low']
-            range_ma = range_val.rolling(window=kc_length).mean()
-        
-        upper_kc = kc_ma + range_ma * kc_mult
-        lower_kc = kc_ma - range_ma * kc_mult
-        
-        # 判断挤压状态
-        sqz_on = (lower_bb > lower_kc) & (upper_bb < upper_kc)  # 挤压开启
-        sqz_off = (lower_bb < lower_kc) & (upper_bb > upper_kc)  # 挤压关闭
-        no_sqz = ~sqz_on & ~sqz_off  # 无挤压
-        
-        # 计算动量值 (使用线性回归)
-        def linear_regression(y, length, offset=0):
-            """计算线性回归值"""
-            result = pd.Series(index=y.index, dtype=float)
-            for i in range(length - 1, len(y)):
-                if i - length + 1 >= 0:
-                    y_slice = y.iloc[i - length + 1:i + 1]
-                    x = np.arange(len(y_slice))
-                    if len(y_slice) == length and not y_slice.isna().any():
-                        slope, intercept, _, _, _ = stats.linregress(x, y_slice)
-                        result.iloc[i] = slope * (length - 1 - offset) + intercept
-            return result
-        
-        # 计算动量源数据
-        highest_high = df['high'].rolling(window=kc_length).max()
-        lowest_low = df['low'].rolling(window=kc_length).min()
-        avg_hl = (highest_high + lowest_low) / 2
-        avg_close = source.rolling(window=kc_length).mean()
-        momentum_source = source - (avg_hl + avg_close) / 2
-        
-        # 计算线性回归值作为动量
-        momentum = linear_regression(momentum_source, kc_length, 0)
+        ctx = ctx or IndicatorContext(df)
+        result = panel.squeeze_momentum(ctx, bb_length, bb_mult, kc_length, kc_mult, use_true_range)
+        values = {name: pd.Series(result[name][0], index=df.index) for name in result}
+        momentum = values['momentum']
+        sqz_on, sqz_off, no_sqz = values['squeeze_on'], values['squeeze_off'], values['no_squeeze']
         
         # 计算颜色信号
         momentum_prev = momentum.shift(1)
@@ -150,8 +92,8 @@ class TechAnalysis:
             'no_squeeze': no_sqz.astype(int),
             'bar_color': bar_color,
             'squeeze_color': squeeze_color,
-            'upper_bb': upper_bb,
-            'lower_bb': lower_bb,
-            'upper_kc': upper_kc,
-            'lower_kc': lower_kc
+            'upper_bb': values['upper_bb'],
+            'lower_bb': values['lower_bb'],
+            'upper_kc': values['upper_kc'],
+            'lower_kc': values['lower_kc']
         }) 
\ No newline at end of file
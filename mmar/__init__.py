@@ -0,0 +1,9 @@
+"""
+MMAR（多重分形资产收益模型）分析。
+
+- partition: 分区函数 S_q(Δt)
+- spectrum: 标度函数 τ(q)、Hurst 指数、多重分形谱与级联参数
+- cascade / simulate: 对数正态级联与 MMAR 价格路径模拟
+- pipeline: 按阶段串联的分析流水线，命令行入口为 python -m mmar
+"""
+from mmar.pipeline import DEFAULT_Q, STAGES, load_ecb_csv, run, write_results
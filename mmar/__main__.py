@@ -0,0 +1,66 @@
+"""
+命令行入口：对一个或多个 ECB 格式的汇率CSV运行 MMAR 分析流水线，结果与图表写入目录
+
+用法:
+    python -m mmar mmar/USD_NOK.csv --out output --start 1989-01-25 --end 2019-03-01 --max-points 7561
+    python -m mmar data/*.csv --out output --stages tau,lognormal --no-figures
+    python -m mmar mmar/USD_NOK.csv --out output --stages tau --rolling-window 2048 --rolling-step 21
+"""
+import argparse
+import os
+import sys
+
+from mmar.pipeline import STAGES, load_ecb_csv, run, write_results
+from mmar.rolling import rolling_profile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m mmar', description='MMAR 多重分形分析')
+    parser.add_argument('csv', nargs='+', help='ECB 格式（分号分隔，TIME_PERIOD/OBS_VALUE 列）的CSV文件')
+    parser.add_argument('--out', default='mmar_output', help='输出目录，多个CSV时每个文件一个子目录')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"逗号分隔的阶段，依赖的阶段自动补上（默认全部：{','.join(STAGES)}）")
+    parser.add_argument('--start', help='起始日期（含）')
+    parser.add_argument('--end', help='结束日期（含）')
+    parser.add_argument('--max-points', type=int, help='只使用前 N 个数据点')
+    parser.add_argument('--fit-q-max', type=float, default=4.0, help='多项式谱只拟合 q < 该值的部分')
+    parser.add_argument('--paths', type=int, default=100, help='模拟路径条数')
+    parser.add_argument('--steps', type=int, help='模拟天数，默认与历史等长')
+    parser.add_argument('--magnitude', type=float, default=0.15, help='fBm 区间长度')
+    parser.add_argument('--seed', type=int, help='模拟的随机种子')
+    parser.add_argument('--workers', type=int, help='模拟使用的进程数，默认CPU核数')
+    parser.add_argument('--rolling-window', type=int, help='同时做滑动窗口分析的窗口天数，结果写入 rolling.csv')
+    parser.add_argument('--rolling-step', type=int, default=21, help='滑动窗口每次前移的天数')
+    parser.add_argument('--no-figures', action='store_true', help='不生成PNG图')
+    parser.add_argument('--quiet', action='store_true', help='不输出各阶段进度')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    failed = []
+    for path in args.csv:
+        name = os.path.splitext(os.path.basename(path))[0]
+        out_dir = args.out if len(args.csv) == 1 else os.path.join(args.out, name)
+        try:
+            prices = load_ecb_csv(path, args.start, args.end, args.max_points)
+            results = run(prices, stages, fit_q_max=args.fit_q_max, n_paths=args.paths, n_steps=args.steps,
+                          magnitude=args.magnitude, seed=args.seed, workers=args.workers,
+                          log=None if args.quiet else print)
+            if args.rolling_window:
+                results['rolling'] = rolling_profile(prices, args.rolling_window, args.rolling_step,
+                                                     fit_q_max=args.fit_q_max, workers=args.workers)
+            written = write_results(results, out_dir, figures=not args.no_figures)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[MMAR] {path} 处理失败: {e}", file=sys.stderr)
+            failed.append(path)
+            continue
+        hurst = results.get('hurst', {}).get('H')
+        summary = f"H={hurst:.4f}" if hurst is not None else 'H=无'
+        print(f"[MMAR] {name}: {summary} -> {out_dir} ({len(written)} 个文件)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+对数正态二分级联（MMAR 的交易时间测度）。
+
+逐层生成：第 level 层一次抽取 2^(level+1) 个乘子，与上一层的质量（每格复制为两格）相乘，
+不递归、不构造嵌套列表；多条独立级联作为二维数组 (条数, 2^k) 一起生成。
+"""
+import numpy as np
+
+
+def lognormal_cascade(k, mean, sigma, size=None, seed=None):
+    """
+    生成对数正态二分级联的质量数组
+
+    参数:
+    k: 级数，共 2^k 个格
+    mean, sigma: 乘子 ln M ~ N(mean, sigma^2)，与 np.random.lognormal(mean, sigma) 相同
+    size: 级联条数，None 时返回一维数组
+    seed: 随机种子或 np.random.Generator
+    返回: (2^k,) 或 (size, 2^k) 的质量数组
+    """
+    rng = np.random.default_rng(seed)
+    n = 1 if size is None else size
+    mass = np.ones((n, 1))
+    for level in range(k):
+        multipliers = rng.lognormal(mean, sigma, size=(n, 2 ** (level + 1)))
+        mass = np.repeat(mass, 2, axis=1)
+        mass *= multipliers
+    return mass[0] if size is None else mass
+
+
+def trading_time_cdf(k, mass):
+    """
+    将级联质量转换为交易时间：沿最后一个轴累积求和，并归一化到 [0, 2^k]
+    k: 级数（总区间数为2^k）
+    mass: 级联数组，(2^k,) 或 (条数, 2^k)
+    返回: 与mass同形状的数组
+    """
+    cdf = np.cumsum(mass, axis=-1)
+    return 2 ** k * cdf / cdf[..., -1:]
@@ -0,0 +1,101 @@
+"""
+把 pipeline.run() 的结果画成PNG。
+
+matplotlib 只在调用 save_figures 时导入，并使用无界面的 Agg 后端，可在服务器或定时任务中运行。
+"""
+import os
+
+import numpy as np
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def save_figures(results, out_dir):
+    """
+    返回: 写出的图片文件名列表；未安装 matplotlib 时返回空列表
+    """
+    try:
+        plt = _pyplot()
+    except ImportError:
+        print("[MMAR] 未安装 matplotlib，跳过图表")
+        return []
+    written = []
+
+    def save(fig, name):
+        fig.tight_layout()
+        fig.savefig(os.path.join(out_dir, name), dpi=100)
+        plt.close(fig)
+        written.append(name)
+
+    if 'returns' in results:
+        returns = results['returns']
+        fig, axes = plt.subplots(3, 1, figsize=(12, 12), sharex=True)
+        for ax, column, color in zip(axes, ['Price', 'Log_Returns', 'Relative_Log_Returns'], ['red', 'blue', 'green']):
+            ax.plot(returns.index, returns[column], linewidth=0.8, color=color)
+            ax.set_title(column)
+            ax.grid(True, alpha=0.3, linestyle='--')
+        save(fig, 'returns.png')
+
+    if 'partition' in results:
+        partition = results['partition']
+        ln_dt = np.log(partition.columns.to_numpy(dtype=np.float64))
+        fig, ax = plt.subplots(figsize=(12, 7))
+        for q, row in partition.iterrows():
+            # 与原脚本一致，每条曲线以 Δt=1 处的值归一化
+            ax.plot(ln_dt, np.log(row.to_numpy() / row.iloc[0]), color='red', linewidth=0.5)
+        ax.set_xlabel('ln (delta_t)')
+        ax.set_ylabel('ln ( Sq(delta_t) / Sq(1) )')
+        ax.set_title('Partition function')
+        save(fig, 'partition.png')
+
+    if 'tau' in results:
+        tau = results['tau']
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(tau.index, tau.to_numpy(), marker='o', markersize=3)
+        ax.axhline(0, color='grey', linewidth=0.8)
+        if 'hurst' in results:
+            ax.set_title(f"Scaling function tau(q), H = {results['hurst']['H']:.4f}")
+        ax.set_xlabel('q')
+        ax.set_ylabel('tau(q)')
+        save(fig, 'tau.png')
+
+    if 'spectrum' in results:
+        spec = results['spectrum']
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(spec['alpha'], spec['f_alpha'], marker='o', markersize=3, label='Gradient')
+        ax.plot(spec['poly_alpha'], spec['poly_f_alpha'], marker='x', markersize=3, label='Polyfit')
+        ax.set_xlabel('alpha')
+        ax.set_ylabel('f(alpha)')
+        ax.set_title('Multifractal spectrum')
+        ax.legend()
+        save(fig, 'spectrum.png')
+
+    if 'simulation' in results:
+        paths = results['simulation']
+        fig, ax = plt.subplots(figsize=(12, 6))
+        for path in paths[:50]:
+            ax.plot(path, linewidth=0.5, alpha=0.6)
+        ax.plot(np.median(paths, axis=0), color='black', linewidth=1.5, label='Median')
+        ax.set_xlabel('Days')
+        ax.set_ylabel('Simulated price')
+        ax.set_title(f'MMAR simulation ({len(paths)} paths)')
+        ax.legend()
+        save(fig, 'simulation.png')
+
+    if 'rolling' in results and not results['rolling'].empty:
+        rolling = results['rolling']
+        fig, axes = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+        axes[0].plot(rolling.index, rolling['H'], color='purple', linewidth=1)
+        axes[0].axhline(0.5, color='grey', linewidth=0.8, linestyle='--')
+        axes[0].set_ylabel('H')
+        axes[1].plot(rolling.index, rolling['lambda'], linewidth=1, label='lambda')
+        axes[1].plot(rolling.index, rolling['sigma2'], linewidth=1, label='sigma^2')
+        axes[1].legend()
+        axes[0].set_title('Rolling multifractal profile')
+        save(fig, 'rolling.png')
+    return written
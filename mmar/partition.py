@@ -0,0 +1,92 @@
+"""
+多重分形分析的分区函数 S_q(T, Δt) = Σ_i |X(iΔt + Δt) - X(iΔt)|^q 。
+
+- 每个 Δt 只取一次增量，|x|^q 以 exp(q·ln|x|) 对整组 q 广播计算，不再逐个 (Δt, q) 做幂运算
+- 增量按块计算，(序列数 × q 数 × 块长) 的中间数组不超过 max_elements 个元素
+- 支持多条序列：二维输入 (序列 × 时间) 一次算完；长度不同的序列按长度分组批量计算
+"""
+import numpy as np
+
+# 单次广播计算的中间数组元素上限（float64，约32MB）
+DEFAULT_MAX_ELEMENTS = 1 << 22
+
+
+def get_factors(n):
+    """n 的全部因子（升序），用作 Δt 网格"""
+    small = [i for i in range(1, int(n ** 0.5) + 1) if n % i == 0]
+    return sorted(set(small + [n // i for i in small]))
+
+
+def relative_log_prices(prices):
+    """
+    相对起点的对数价格 X(t) = ln P(t) - ln P(0)，沿最后一个轴计算
+    """
+    log_prices = np.log(np.asarray(prices, dtype=np.float64))
+    return log_prices - log_prices[..., :1]
+
+
+def _power_sums(a, q, max_elements):
+    """
+    Σ_i a_i^q，对每个 q 求和
+    a: (序列, 增量数) 非负数组；q: 一维数组
+    返回: (序列, len(q))
+    """
+    n_series, m = a.shape
+    with np.errstate(divide='ignore'):
+        log_a = np.log(a)  # 0 -> -inf，exp(q·-inf) 在 q>0 时为0、q<0 时为inf，与 0^q 一致
+    out = np.zeros((n_series, len(q)))
+    chunk = max(1, max_elements // max(1, n_series * len(q)))
+    with np.errstate(invalid='ignore'):
+        for lo in range(0, m, chunk):
+            block = log_a[:, lo:lo + chunk]
+            out += np.exp(q[np.newaxis, :, np.newaxis] * block[:, np.newaxis, :]).sum(axis=2)
+    # q=0 时 0·(-inf) 为nan，而 0^0 = 1
+    out[:, q == 0] = m
+    return out
+
+
+def partition_function(x, delta_t, q, max_elements=DEFAULT_MAX_ELEMENTS):
+    """
+    计算分区函数
+
+    参数:
+    x: 相对对数价格，(T,) 或 (序列, T)
+    delta_t: Δt 列表
+    q: q 列表
+    max_elements: 中间数组的元素上限，用于限制内存
+    返回: (len(q), len(delta_t))，二维输入时为 (序列, len(q), len(delta_t))
+    """
+    x = np.asarray(x, dtype=np.float64)
+    squeeze = x.ndim == 1
+    x = np.atleast_2d(x)
+    q = np.asarray(q, dtype=np.float64)
+    T = x.shape[1]
+    result = np.zeros((x.shape[0], len(q), len(delta_t)))
+    for j, dt in enumerate(delta_t):
+        # 第i个区间为 [i*dt, i*dt+dt]，只保留终点在序列内的区间
+        n = (T - 1) // dt
+        if n == 0:
+            continue
+        starts = np.arange(n) * dt
+        increments = np.abs(x[:, starts + dt] - x[:, starts])
+        result[:, :, j] = _power_sums(increments, q, max_elements)
+    return result[0] if squeeze else result
+
+
+def partition_functions(series, delta_t, q, max_elements=DEFAULT_MAX_ELEMENTS):
+    """
+    多条价格序列的分区函数，长度相同的序列合并为一次二维计算
+
+    参数:
+    series: {名称: 价格数组}，如 indicator/ 下各股票的收盘价
+    返回: {名称: (len(q), len(delta_t)) 数组}
+    """
+    groups = {}
+    for name, prices in series.items():
+        groups.setdefault(len(prices), []).append(name)
+    results = {}
+    for names in groups.values():
+        x = relative_log_prices(np.stack([np.asarray(series[name], dtype=np.float64) for name in names]))
+        sq = partition_function(x, delta_t, q, max_elements)
+        results.update(zip(names, sq))
+    return results
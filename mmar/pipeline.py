@@ -0,0 +1,271 @@
+"""
+MMAR 多重分形分析流水线，各阶段可单独调用，也可由 run() 按需串联：
+
+load -> returns -> normality -> partition -> tau -> spectrum -> lognormal -> simulate
+
+不在导入时做任何计算、不弹出窗口；图表见 figures.py，命令行入口见 __main__.py。
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kstest, shapiro
+
+try:
+    from mmar.partition import get_factors, partition_function, relative_log_prices
+    from mmar.simulate import simulate_paths
+    from mmar.spectrum import (estimate_hurst, gradient_spectrum, lognormal_params, polyfit_spectrum,
+                               scaling_function)
+except ImportError:  # 在mmar目录下直接运行脚本时
+    from partition import get_factors, partition_function, relative_log_prices
+    from simulate import simulate_paths
+    from spectrum import estimate_hurst, gradient_spectrum, lognormal_params, polyfit_spectrum, scaling_function
+
+STAGES = ('load', 'returns', 'normality', 'partition', 'tau', 'spectrum', 'lognormal', 'simulate')
+
+# 默认q网格：在 q=2 附近加密
+DEFAULT_Q = (
+    0.01, 0.1, 0.2, 0.3, 0.4, 0.5, 0.55, 0.6, 0.65, 0.7,
+    0.75, 0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2,
+    1.25, 1.3, 1.35, 1.4, 1.45, 1.5, 1.55, 1.6, 1.65, 1.7,
+    1.75, 1.8, 1.81, 1.82, 1.83, 1.84, 1.85, 1.86, 1.87, 1.88,
+    1.89, 1.9, 1.91, 1.92, 1.93, 1.94, 1.95, 1.96, 1.97, 1.98,
+    1.985, 1.99, 1.991, 1.992, 1.993, 1.994, 1.995, 1.996, 1.997, 1.998,
+    1.999, 2.0, 2.001, 2.002, 2.003, 2.004, 2.005, 2.006, 2.007, 2.008,
+    2.009, 2.01, 2.015, 2.02, 2.025, 2.03, 2.04, 2.05, 2.06, 2.07,
+    2.08, 2.09, 2.1, 2.15, 2.2, 2.25, 2.3, 2.35, 2.4, 2.45,
+    2.5, 2.6, 2.7, 2.8, 2.9, 3.0, 3.1, 3.2, 3.3, 3.4,
+    3.5, 3.6, 3.7, 3.8, 3.9, 4.0, 4.5, 5.0, 6.0, 7.0,
+    8.0, 9.0, 10.0, 12.5, 15.0, 17.5, 20.0, 22.5, 25.0, 27.5,
+    30.0,
+)
+
+# 阶段依赖：运行某个阶段前需要先运行的阶段
+_REQUIRES = {
+    'load': (),
+    'returns': ('load',),
+    'normality': ('returns',),
+    'partition': ('returns',),
+    'tau': ('partition',),
+    'spectrum': ('tau',),
+    'lognormal': ('spectrum',),
+    'simulate': ('lognormal',),
+}
+
+
+def load_ecb_csv(path, start=None, end=None, max_points=None):
+    """
+    读取 ECB 格式（分号分隔，TIME_PERIOD/OBS_VALUE 列）的汇率CSV
+
+    参数:
+    start, end: 可选的起止日期（含）
+    max_points: 只保留前 max_points 个数据点
+    返回: pd.Series，索引为日期，名称为 'Price'，已按时间排序并去除无效价格
+    """
+    df = pd.read_csv(path, sep=';', usecols=['TIME_PERIOD', 'OBS_VALUE'])
+    prices = pd.Series(pd.to_numeric(df['OBS_VALUE'], errors='coerce').to_numpy(),
+                       index=pd.to_datetime(df['TIME_PERIOD']), name='Price')
+    prices.index.name = 'TIME_PERIOD'
+    prices = prices.sort_index()
+    if start is not None:
+        prices = prices[prices.index >= pd.to_datetime(start)]
+    if end is not None:
+        prices = prices[prices.index <= pd.to_datetime(end)]
+    prices = prices[prices > 0].dropna()
+    if max_points is not None:
+        prices = prices.iloc[:max_points]
+    return prices
+
+
+def compute_returns(prices):
+    """
+    返回: DataFrame，列为 Price、Log_Returns（相邻对数差值，首行为NaN）与 Relative_Log_Returns（相对t0）
+    """
+    values = prices.to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        'Price': values,
+        'Log_Returns': np.concatenate([[np.nan], np.diff(np.log(values))]),
+        'Relative_Log_Returns': relative_log_prices(values),
+    }, index=prices.index)
+
+
+def normality_tests(log_returns, alpha=0.05):
+    """
+    Kolmogorov-Smirnov（标准化后对比标准正态）与 Shapiro-Wilk 正态性检验
+    返回: dict，normal 为 False 表示两个检验都在 alpha 水平上拒绝了正态性假设
+    """
+    data = pd.Series(log_returns).dropna().to_numpy()
+    ks_stat, ks_p = kstest((data - data.mean()) / data.std(ddof=1), 'norm')
+    shapiro_stat, shapiro_p = shapiro(data)
+    return {
+        'ks_stat': float(ks_stat), 'ks_p': float(ks_p),
+        'shapiro_stat': float(shapiro_stat), 'shapiro_p': float(shapiro_p),
+        'normal': bool(ks_p >= alpha or shapiro_p >= alpha),
+    }
+
+
+def default_delta_t(n_points, min_count=12):
+    """
+    Δt 网格：优先取 n_points-1 的全部因子（每个Δt都恰好覆盖整段序列）；
+    因子太少时改为 1 到 (n_points-1)/2 之间按对数等距取整
+    """
+    span = n_points - 1
+    factors = get_factors(span)
+    if len(factors) >= min_count:
+        return factors
+    return sorted(set(np.unique(np.geomspace(1, max(1, span // 2), 40).astype(int)).tolist()))
+
+
+def partition_table(x, delta_t, q):
+    """分区函数 DataFrame，行为q，列为Δt"""
+    return pd.DataFrame(partition_function(x, delta_t, q), index=list(q), columns=list(delta_t))
+
+
+def run(prices, stages=STAGES, q=DEFAULT_Q, delta_t=None, fit_q_max=4.0, n_paths=100, n_steps=None,
+        magnitude=0.15, seed=None, workers=None, log=print):
+    """
+    对一条价格序列运行所选阶段（自动补上依赖的阶段）
+
+    参数:
+    prices: load_ecb_csv 返回的价格序列
+    stages: 需要的阶段名
+    q, delta_t: q 网格与 Δt 网格，delta_t 为None时由 default_delta_t 生成
+    fit_q_max: 多项式谱只拟合 q < fit_q_max 的部分
+    n_paths, n_steps, magnitude, seed, workers: 模拟参数，n_steps 默认与历史等长，起始价格为最后一个价格
+    log: 进度输出函数，None 表示不输出
+    返回: dict，各阶段结果，timings 为各阶段耗时（秒），skipped 为因 H 无效而跳过的阶段
+    """
+    wanted = _resolve(stages)
+    q = np.asarray(q, dtype=np.float64)
+    results = {'stages': [s for s in STAGES if s in wanted], 'timings': {}}
+
+    def stage(name, compute):
+        if name not in wanted:
+            return
+        if name in ('lognormal', 'simulate') and not 0 < (results['hurst']['H'] or 0) < 1:
+            # τ(q) 没有过零点（常见于样本太短）时无法估计级联参数
+            results.setdefault('skipped', []).append(name)
+            if log is not None:
+                log(f"[MMAR] {name}: 跳过，Hurst 指数无效 (H={results['hurst']['H']})")
+            return
+        begin = time.perf_counter()
+        compute()
+        results['timings'][name] = round(time.perf_counter() - begin, 4)
+        if log is not None:
+            log(f"[MMAR] {name}: {results['timings'][name]}s")
+
+    def load():
+        results['prices'] = prices
+        results['summary'] = {'points': int(len(prices)), 'start': str(prices.index[0].date()),
+                              'end': str(prices.index[-1].date())}
+
+    def returns():
+        results['returns'] = compute_returns(prices)
+
+    def normality():
+        results['normality'] = normality_tests(results['returns']['Log_Returns'])
+
+    def partition():
+        x = results['returns']['Relative_Log_Returns'].to_numpy()
+        grid = default_delta_t(len(x)) if delta_t is None else list(delta_t)
+        results['delta_t'] = grid
+        results['partition'] = partition_table(x, grid, q)
+
+    def tau():
+        results['tau'] = pd.Series(scaling_function(results['partition'].to_numpy(), results['delta_t']),
+                                   index=q, name='tau')
+        H, q_star = estimate_hurst(q, results['tau'].to_numpy())
+        # 没有过零点时为 None
+        results['hurst'] = {'H': float(H) if np.isfinite(H) else None,
+                            'q_star': float(q_star) if np.isfinite(q_star) else None}
+
+    def spectrum():
+        tau_q = results['tau'].to_numpy()
+        hi = int(np.searchsorted(q, fit_q_max))
+        alpha, f_alpha = gradient_spectrum(q[:hi], tau_q[:hi])
+        poly_alpha, poly_f_alpha, coeffs = polyfit_spectrum(q, tau_q, 0, hi)
+        results['spectrum'] = pd.DataFrame({'q': q[:hi], 'alpha': alpha, 'f_alpha': f_alpha,
+                                            'poly_alpha': poly_alpha, 'poly_f_alpha': poly_f_alpha})
+        results['poly_coeffs'] = [float(v) for v in coeffs]
+
+    def lognormal():
+        spec = results['spectrum']
+        lambda_hat, sigma2_hat, alpha_0 = lognormal_params(spec['poly_alpha'].to_numpy(),
+                                                           spec['poly_f_alpha'].to_numpy(),
+                                                           results['hurst']['H'])
+        results['lognormal'] = {'lambda': float(lambda_hat), 'sigma2': float(sigma2_hat), 'alpha_0': float(alpha_0)}
+
+    def simulate():
+        params = results['lognormal']
+        steps = n_steps or len(prices) - 1
+        results['simulation'] = simulate_paths(n_paths, steps, results['hurst']['H'], params['lambda'],
+                                               params['sigma2'], magnitude, float(prices.iloc[-1]),
+                                               seed=seed, workers=workers)
+
+    for name, compute in [('load', load), ('returns', returns), ('normality', normality),
+                          ('partition', partition), ('tau', tau), ('spectrum', spectrum),
+                          ('lognormal', lognormal), ('simulate', simulate)]:
+        stage(name, compute)
+    return results
+
+
+def _resolve(stages):
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"未知阶段: {sorted(unknown)}，可选: {', '.join(STAGES)}")
+    wanted = set()
+    pending = list(stages)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(_REQUIRES[name])
+    return wanted
+
+
+def write_results(results, out_dir, figures=True):
+    """
+    把结果写入 out_dir：summary.json（标量结果与耗时）、各阶段的CSV、模拟路径 simulation.npy、
+    滑动窗口结果 rolling.csv（results 中有 rolling 时），
+    figures=True 时另存PNG图（需要 matplotlib）
+    返回: 写出的文件名列表
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+
+    def save(name, write):
+        write(os.path.join(out_dir, name))
+        written.append(name)
+
+    summary = {key: results[key] for key in ('summary', 'normality', 'hurst', 'poly_coeffs', 'lognormal', 'timings',
+                                             'skipped') if key in results}
+    summary['stages'] = results['stages']
+    if 'delta_t' in results:
+        summary['delta_t'] = [int(v) for v in results['delta_t']]
+    save('summary.json', lambda path: _write_json(summary, path))
+    if 'returns' in results:
+        save('returns.csv', results['returns'].to_csv)
+    if 'partition' in results:
+        save('partition.csv', results['partition'].to_csv)
+    if 'tau' in results:
+        save('tau.csv', results['tau'].to_frame().rename_axis('q').to_csv)
+    if 'spectrum' in results:
+        save('spectrum.csv', lambda path: results['spectrum'].to_csv(path, index=False))
+    if 'simulation' in results:
+        save('simulation.npy', lambda path: np.save(path, results['simulation']))
+    if 'rolling' in results:
+        save('rolling.csv', results['rolling'].to_csv)
+    if figures:
+        try:
+            from mmar.figures import save_figures
+        except ImportError:  # 在mmar目录下直接运行脚本时
+            from figures import save_figures
+        written.extend(save_figures(results, out_dir))
+    return written
+
+
+def _write_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,150 @@
+"""
+滑动窗口的多重分形分析：在 window 天的窗口上估计 H、alpha_0、λ、σ²，窗口每次前移 step 天。
+
+- 窗口默认对齐到序列末尾，最后一个窗口总是以最后一个数据点结束；align='start' 时第一个窗口从第一个点开始，
+  窗口位置不随序列末尾的增长而变化（图表指标使用，新数据到达时已有的估计值不变）
+- Δt 整除 step 时，各窗口的区间落在同一组格点上：|增量|^q 在整条序列上只算一次，
+  先按 step 分段求和，每个窗口再把覆盖的段相加（不用前缀和相减，避免 q 较大时的相消误差）
+- 其余 Δt 把所有窗口叠成二维数组批量计算，窗口较多时分给多个进程
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from mmar.partition import DEFAULT_MAX_ELEMENTS, _power_sums, partition_function, relative_log_prices
+    from mmar.pipeline import DEFAULT_Q, default_delta_t
+    from mmar.spectrum import estimate_hurst, lognormal_params, polyfit_spectrum, scaling_function
+except ImportError:  # 在mmar目录下直接运行脚本时
+    from partition import DEFAULT_MAX_ELEMENTS, _power_sums, partition_function, relative_log_prices
+    from pipeline import DEFAULT_Q, default_delta_t
+    from spectrum import estimate_hurst, lognormal_params, polyfit_spectrum, scaling_function
+
+PROFILE_COLUMNS = ('H', 'alpha_0', 'lambda', 'sigma2')
+
+
+def window_starts(n_points, window, step, align='end'):
+    """
+    窗口起点（每个窗口 window+1 个点）
+    align: 'end' 时最后一个窗口以第 n_points-1 个点结束；'start' 时起点为 step 的倍数
+    """
+    last = n_points - 1 - window
+    if last < 0:
+        return np.empty(0, dtype=np.int64)
+    if align not in ('end', 'start'):
+        raise ValueError(f'未知的对齐方式: {align}')
+    return np.arange(last % step if align == 'end' else 0, last + 1, step)
+
+
+def _block_powers(increments, q, max_elements=DEFAULT_MAX_ELEMENTS):
+    """逐个区间的 |增量|^q，返回 (len(q), len(increments))"""
+    out = np.empty((len(q), len(increments)))
+    chunk = max(1, max_elements // max(1, len(q)))
+    for lo in range(0, len(increments), chunk):
+        out[:, lo:lo + chunk] = _power_sums(increments[lo:lo + chunk, np.newaxis], q, max_elements).T
+    return out
+
+
+def lattice_partition(x, starts, window, step, dt, q):
+    """
+    Δt 整除 step 时各窗口的分区函数：所有窗口的区间都在以 starts[0] 为起点、间隔 Δt 的格点上
+
+    参数:
+    x: 相对对数价格（一维）
+    starts: window_starts 返回的窗口起点
+    返回: (窗口, len(q))
+    """
+    q = np.asarray(q, dtype=np.float64)
+    n = window // dt          # 每个窗口的区间数
+    k = step // dt            # 每前移一个 step 的区间数
+    m, rem = divmod(n, k)     # 每个窗口覆盖 m 个完整的段，外加 rem 个区间
+    n_windows = len(starts)
+    n_blocks = (n_windows - 1) * k + n
+    o = starts[0]
+    points = x[o:o + n_blocks * dt + 1:dt]
+    terms = _block_powers(np.abs(np.diff(points)), q)
+    out = np.zeros((n_windows, len(q)))
+    if m:
+        n_segments = n_windows - 1 + m
+        segments = terms[:, :n_segments * k].reshape(len(q), n_segments, k).sum(axis=2)
+        out += np.lib.stride_tricks.sliding_window_view(segments, m, axis=1).sum(axis=2).T
+    if rem:
+        tail = terms[:, m * k:]
+        tail = np.pad(tail, ((0, 0), (0, n_windows * k - tail.shape[1])))
+        out += tail.reshape(len(q), n_windows, k)[:, :, :rem].sum(axis=2).T
+    return out
+
+
+def _direct_partition(x, starts, window, delta_t, q):
+    """把窗口叠成 (窗口, window+1) 的二维数组批量计算，返回 (窗口, len(q), len(delta_t))"""
+    windows = np.lib.stride_tricks.sliding_window_view(x, window + 1)[starts]
+    return partition_function(windows, delta_t, q)
+
+
+def rolling_partition(x, window, step, delta_t, q, workers=1, parallel_threshold=64, align='end'):
+    """
+    所有窗口的分区函数
+
+    参数:
+    x: 相对对数价格（一维）
+    workers: 进程数，None为CPU核数；窗口数不少于 parallel_threshold 时才使用进程池
+    align: 窗口对齐方式，见 window_starts
+    返回: starts, (窗口, len(q), len(delta_t))
+    """
+    x = np.asarray(x, dtype=np.float64)
+    starts = window_starts(len(x), window, step, align)
+    result = np.zeros((len(starts), len(q), len(delta_t)))
+    if len(starts) == 0:
+        return starts, result
+    lattice = [j for j, dt in enumerate(delta_t) if step % dt == 0]
+    for j in lattice:
+        result[:, :, j] = lattice_partition(x, starts, window, step, delta_t[j], q)
+    direct = [j for j in range(len(delta_t)) if j not in lattice]
+    if direct:
+        grid = [delta_t[j] for j in direct]
+        workers = min(workers or os.cpu_count() or 1, len(starts))
+        if workers > 1 and len(starts) >= parallel_threshold:
+            chunks = np.array_split(starts, workers)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parts = list(executor.map(_direct_partition, [x] * len(chunks), chunks,
+                                          [window] * len(chunks), [grid] * len(chunks), [q] * len(chunks)))
+            partial = np.concatenate(parts)
+        else:
+            partial = _direct_partition(x, starts, window, grid, q)
+        result[:, :, direct] = partial
+    return starts, result
+
+
+def rolling_profile(prices, window=2048, step=21, q=DEFAULT_Q, delta_t=None, fit_q_max=4.0, workers=1,
+                    parallel_threshold=64, align='end'):
+    """
+    滑动窗口的 H、alpha_0、λ、σ² 时间序列
+
+    参数:
+    prices: 价格序列（pd.Series 或数组）
+    window: 每个窗口的天数（区间跨度，窗口含 window+1 个点）
+    step: 窗口每次前移的天数
+    q, delta_t: q 网格与 Δt 网格，delta_t 为None时由 default_delta_t(window+1) 生成
+    fit_q_max: 多项式谱只拟合 q < fit_q_max 的部分
+    workers: 非格点 Δt 部分使用的进程数
+    align: 窗口对齐方式，见 window_starts
+    返回: DataFrame，每个窗口一行，索引为窗口最后一个点的索引（prices 为 Series 时为其索引值），
+          列为 start、end（位置）以及 H、alpha_0、lambda、sigma2
+    """
+    values = np.asarray(prices, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    delta_t = default_delta_t(window + 1) if delta_t is None else list(delta_t)
+    starts, partition = rolling_partition(relative_log_prices(values), window, step, delta_t, q,
+                                          workers, parallel_threshold, align)
+    ends = starts + window
+    tau = scaling_function(partition, delta_t)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        H, _ = estimate_hurst(q, tau)
+        hi = int(np.searchsorted(q, fit_q_max))
+        alpha, f_alpha, _ = polyfit_spectrum(q, tau, 0, hi)
+        lambda_hat, sigma2_hat, alpha_0 = lognormal_params(alpha, f_alpha, H)
+    index = prices.index[ends] if isinstance(prices, pd.Series) else ends
+    return pd.DataFrame({'start': starts, 'end': ends, 'H': H, 'alpha_0': alpha_0,
+                         'lambda': lambda_hat, 'sigma2': sigma2_hat}, index=index)
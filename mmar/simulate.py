@@ -0,0 +1,107 @@
+"""
+MMAR 蒙特卡洛模拟：X(t) = B_H(θ(t))，价格 P(t) = P(0)·exp(X(t))。
+
+- 分数布朗运动 B_H：循环嵌入（Davies–Harte）FFT 生成分数高斯噪声再累加，一批路径一次FFT
+- 交易时间 θ(t)：对数正态级联的累积质量（trading_time_cdf），B_H 在 θ(t) 处线性插值
+- 路径按批分给多个进程；每批使用由 seed 派生的独立随机流，结果与进程数无关
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from mmar.cascade import lognormal_cascade, trading_time_cdf
+except ImportError:  # 在mmar目录下直接运行脚本时
+    from cascade import lognormal_cascade, trading_time_cdf
+
+
+def fgn_eigenvalues(n, H):
+    """
+    长度为 n 的分数高斯噪声的协方差循环嵌入（2n 阶）的特征值
+    γ(k) = (|k+1|^2H - 2|k|^2H + |k-1|^2H) / 2
+    """
+    k = np.arange(n + 1, dtype=np.float64)
+    gamma = 0.5 * (np.abs(k + 1) ** (2 * H) - 2 * k ** (2 * H) + np.abs(k - 1) ** (2 * H))
+    row = np.concatenate([gamma, gamma[-2:0:-1]])
+    eigenvalues = np.fft.fft(row).real
+    if eigenvalues.min() < -1e-8 * eigenvalues.max():
+        raise ValueError(f"H={H} 的循环嵌入不是非负定的")
+    return np.clip(eigenvalues, 0, None)
+
+
+def fractional_gaussian_noise(n, H, size=None, seed=None):
+    """
+    Davies–Harte 方法生成分数高斯噪声（单位方差）
+
+    参数:
+    n: 每条序列的长度
+    H: Hurst 指数，0 < H < 1
+    size: 序列条数，None 时返回一维数组
+    seed: 随机种子或 np.random.Generator
+    返回: (n,) 或 (size, n)
+    """
+    if not 0 < H < 1:
+        raise ValueError(f"Hurst 指数必须在 (0, 1) 之间: {H}")
+    rng = np.random.default_rng(seed)
+    rows = 1 if size is None else size
+    m = 2 * n
+    scale = np.sqrt(fgn_eigenvalues(n, H) / m)
+    # 一次复数FFT的实部与虚部是两条独立的样本
+    pairs = (rows + 1) // 2
+    z = rng.standard_normal((pairs, m)) + 1j * rng.standard_normal((pairs, m))
+    y = np.fft.fft(scale * z, axis=1)[:, :n]
+    noise = np.concatenate([y.real, y.imag])[:rows]
+    return noise[0] if size is None else noise
+
+
+def _mmar_batch(size, n_steps, H, lambda_, sigma, magnitude, start_price, seed):
+    """生成一批路径，返回 (size, n_steps + 1) 的价格"""
+    rng = np.random.default_rng(seed)
+    k = max(1, math.ceil(math.log2(n_steps)))
+    n = 2 ** k
+    # 交易时间 θ(1..n) ∈ (0, n]，θ(0) = 0
+    theta = trading_time_cdf(k, lognormal_cascade(k, lambda_, sigma, size=size, seed=rng))[:, :n_steps]
+    fbm = np.zeros((size, n + 1))
+    np.cumsum(fractional_gaussian_noise(n, H, size=size, seed=rng), axis=1, out=fbm[:, 1:])
+    # B_H 在整数交易时间上已知，θ(t) 处线性插值；
+    # 交易时间 [0, n] 对应 fBm 区间 [0, magnitude]，按自相似性每步缩放 (magnitude/n)^H
+    left = np.minimum(np.floor(theta).astype(np.int64), n - 1)
+    frac = theta - left
+    lo = np.take_along_axis(fbm, left, axis=1)
+    hi = np.take_along_axis(fbm, left + 1, axis=1)
+    log_returns = np.zeros((size, n_steps + 1))
+    log_returns[:, 1:] = (magnitude / n) ** H * (lo + frac * (hi - lo))
+    return start_price * np.exp(log_returns)
+
+
+def simulate_paths(n_paths, n_steps, H, lambda_, sigma, magnitude, start_price, seed=None,
+                   workers=None, batch_size=256):
+    """
+    MMAR 价格路径模拟
+
+    参数:
+    n_paths: 路径条数
+    n_steps: 每条路径的天数，级联取 2^k >= n_steps 格后截取
+    H: 分数布朗运动的 Hurst 指数
+    lambda_, sigma: 级联乘子 ln M ~ N(lambda_, sigma^2)，与 parse_usd_nok.MMAR 的参数含义相同
+    magnitude: fBm 的区间长度（同 fbm 包的 length），整段 2^k 天对数价格的标准差约为 magnitude^H
+    start_price: 起始价格
+    seed: 随机种子，相同 seed 与 batch_size 得到相同的路径
+    workers: 进程数，None为CPU核数，1为当前进程内计算
+    batch_size: 每个进程任务生成的路径数
+    返回: (n_paths, n_steps + 1) 的价格数组，第0列为 start_price
+    """
+    sizes = [min(batch_size, n_paths - lo) for lo in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(size, n_steps, H, lambda_, sigma, magnitude, start_price, s) for size, s in zip(sizes, seeds)]
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(_mmar_batch, *zip(*args)))
+    else:
+        batches = [_mmar_batch(*a) for a in args]
+    if not batches:
+        return np.empty((0, n_steps + 1))
+    return np.concatenate(batches)
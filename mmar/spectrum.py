@@ -0,0 +1,203 @@
+"""
+标度函数 τ(q)、Hurst 指数、多重分形谱与对数正态级联参数的批量估计。
+
+- τ(q)：ln S_q 对 ln Δt 的最小二乘斜率，整个 (q × Δt) 矩阵（可带序列维）一次闭式求解
+- Hurst：τ(q) 第一个过零点 q* 线性插值，H = 1/q*
+- 多重分形谱：梯度法 α = dτ/dq，多项式法对 τ(q) 做二次拟合，f(α) = qα - τ(q)
+- ProfileCache：按 (序列哈希, q 网格, Δt 网格, 拟合区间) 缓存每条序列的结果
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from mmar.partition import partition_function
+except ImportError:  # 在mmar目录下直接运行脚本时
+    from partition import partition_function
+
+
+def scaling_function(partition, delta_t):
+    """
+    对每条 ln S_q(Δt) ~ ln Δt 曲线做OLS回归
+
+    参数:
+    partition: 分区函数，(..., len(q), len(delta_t))
+    delta_t: Δt 列表
+    返回: tau_q，(..., len(q))
+    """
+    x = np.log(np.asarray(delta_t, dtype=np.float64))
+    x = x - x.mean()
+    with np.errstate(divide='ignore'):
+        y = np.log(np.asarray(partition, dtype=np.float64))
+    # 斜率 = Σ(x-x̄)(y-ȳ) / Σ(x-x̄)^2，x 已中心化，ȳ 项为0
+    return y @ x / (x @ x)
+
+
+def estimate_hurst(q, tau_q):
+    """
+    找到 τ(q) 第一个过零的区间，线性插值得到 q*，H = 1/q*
+
+    参数:
+    q: q 数组
+    tau_q: (..., len(q))
+    返回: (H, q_star)，形状为 tau_q 去掉最后一维；没有过零点时为 nan
+    """
+    q = np.asarray(q, dtype=np.float64)
+    tau_q = np.asarray(tau_q, dtype=np.float64)
+    crossing = tau_q[..., :-1] * tau_q[..., 1:] <= 0
+    found = crossing.any(axis=-1)
+    i = np.argmax(crossing, axis=-1)[..., np.newaxis]
+    tau_left = np.take_along_axis(tau_q, i, axis=-1)[..., 0]
+    tau_right = np.take_along_axis(tau_q, i + 1, axis=-1)[..., 0]
+    q_left, q_right = q[i[..., 0]], q[i[..., 0] + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q_star = q_left - tau_left * (q_right - q_left) / (tau_right - tau_left)
+        q_star = np.where(found, q_star, np.nan)
+        return 1.0 / q_star, q_star
+
+
+def gradient_spectrum(q, tau_q):
+    """
+    梯度法估算多重分形谱
+    返回: alpha, f_alpha，与 tau_q 同形状
+    """
+    q = np.asarray(q, dtype=np.float64)
+    alpha = np.gradient(tau_q, q, axis=-1)
+    return alpha, q * alpha - tau_q
+
+
+def polyfit_spectrum(q, tau_q, lo=0, hi=None):
+    """
+    多项式法估算多重分形谱：对 q[lo:hi] 上的 τ(q) 做二次拟合 τ(q) = a q^2 + b q + c，
+    α = 2aq + b，f(α) = qα - τ(q) = aq^2 - c，所有序列共用一次最小二乘
+
+    返回: alpha, f_alpha（在 q[lo:hi] 上，(..., hi-lo)），coeffs（(..., 3)，依次为 a, b, c）
+    """
+    q = np.asarray(q, dtype=np.float64)[lo:hi]
+    tau_q = np.asarray(tau_q, dtype=np.float64)[..., lo:hi]
+    vander = np.vander(q, 3)
+    coeffs = tau_q @ np.linalg.pinv(vander).T
+    a, b, c = coeffs[..., 0:1], coeffs[..., 1:2], coeffs[..., 2:3]
+    alpha = 2 * a * q + b
+    return alpha, a * q ** 2 - c, coeffs
+
+
+def lognormal_params(alpha, f_alpha, H, b=2):
+    """
+    根据多重分形谱顶点和Hurst指数估计对数正态级联参数
+    返回: lambda_hat, sigma2_hat, alpha_0
+    """
+    idx = np.argmax(f_alpha, axis=-1)[..., np.newaxis]
+    alpha_0 = np.take_along_axis(np.asarray(alpha), idx, axis=-1)[..., 0]
+    lambda_hat = alpha_0 / H
+    sigma2_hat = 2 * (lambda_hat - 1) / np.log(b)
+    return lambda_hat, sigma2_hat, alpha_0
+
+
+def multifractal_profile(x, delta_t, q, lo=0, hi=None, b=2):
+    """
+    一条或多条序列的完整多重分形分析
+
+    参数:
+    x: 相对对数价格，(T,) 或 (序列, T)
+    delta_t, q: Δt 网格与 q 网格
+    lo, hi: 多重分形谱使用的 q 下标区间
+    b: 级联的基底
+    返回: dict，tau/alpha/f_alpha 为 (..., len(q))，polyfit 谱为 (..., hi-lo)，其余为每条序列一个值
+    """
+    partition = partition_function(x, delta_t, q)
+    tau = scaling_function(partition, delta_t)
+    H, q_star = estimate_hurst(q, tau)
+    alpha, f_alpha = gradient_spectrum(q, tau)
+    poly_alpha, poly_f_alpha, coeffs = polyfit_spectrum(q, tau, lo, hi)
+    lambda_hat, sigma2_hat, alpha_0 = lognormal_params(poly_alpha, poly_f_alpha, H, b)
+    return {
+        'tau': tau,
+        'H': H,
+        'q_star': q_star,
+        'alpha': alpha,
+        'f_alpha': f_alpha,
+        'poly_alpha': poly_alpha,
+        'poly_f_alpha': poly_f_alpha,
+        'poly_coeffs': coeffs,
+        'alpha_0': alpha_0,
+        'lambda': lambda_hat,
+        'sigma2': sigma2_hat,
+    }
+
+
+def series_hash(x):
+    """序列内容的哈希，作为缓存键的一部分"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    return hashlib.blake2b(x.tobytes(), digest_size=16).hexdigest()
+
+
+class ProfileCache:
+    """
+    多重分形分析结果缓存，按条目数LRU淘汰
+
+    键为 (序列哈希, q 网格, Δt 网格, lo, hi, b)；批量查询时只对未命中的序列做一次批量计算
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def profiles(self, series, delta_t, q, lo=0, hi=None, b=2):
+        """
+        参数:
+        series: 相对对数价格，(序列, T)，或长度可以不同的一维数组列表
+        返回: 与 series 一一对应的结果 dict 列表（共享对象，调用方不应原地修改）
+        """
+        grid = (tuple(float(v) for v in q), tuple(int(v) for v in delta_t), lo, hi, b)
+        keys = [(series_hash(x), len(x)) + grid for x in series]
+        results = [None] * len(keys)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[i] = entry
+                else:
+                    self.misses += 1
+                    missing.setdefault(len(series[i]), []).append(i)
+
+        # 计算放在锁外；长度相同的未命中序列合并为一次批量计算
+        computed = {}
+        for rows in missing.values():
+            batch = multifractal_profile(np.stack([series[i] for i in rows]), delta_t, q, lo, hi, b)
+            for j, i in enumerate(rows):
+                results[i] = computed[keys[i]] = {name: values[j] for name, values in batch.items()}
+        with self._lock:
+            for key, result in computed.items():
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return results
+
+    def profile(self, x, delta_t, q, lo=0, hi=None, b=2):
+        """单条序列的 profiles"""
+        return self.profiles([x], delta_t, q, lo, hi, b)[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
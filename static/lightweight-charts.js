@@ -267,6 +267,9 @@ const ChartConfig = {
 // Utility Functions
 // ================================
 const ChartUtils = {
+    // GET 请求URL的长度上限，超出时批量请求改用POST
+    MAX_GET_URL_LENGTH: 2000,
+    
     /**
      * 防抖函数
      */
@@ -403,6 +406,127 @@ const ChartUtils = {
         
         console.log(`📊 成交量数据处理完成: ${volumeData.length} 个数据点`);
         return volumeData;
+    },
+    
+    /**
+     * 将按列返回的接口数据（format=columns）转换为逐行对象数组
+     * {time: [...], close: [...]} -> [{time, close}, ...]；已是数组时原样返回
+     */
+    columnsToRecords(columns) {
+        if (Array.isArray(columns)) return columns;
+        if (!columns || typeof columns !== 'object') return [];
+        
+        const keys = Object.keys(columns);
+        if (keys.length === 0) return [];
+        
+        const length = columns[keys[0]].length;
+        const records = new Array(length);
+        for (let i = 0; i < length; i++) {
+            const row = {};
+            for (let k = 0; k < keys.length; k++) {
+                const value = columns[keys[k]][i];
+                // 二进制格式的 Float64Array 以 NaN 表示缺失值，与JSON一致转为 null
+                row[keys[k]] = value !== value ? null : value;
+            }
+            records[i] = row;
+        }
+        return records;
+    },
+    
+    /**
+     * 解码二进制格式（format=bin）的接口数据
+     * 格式: 'SSB1' + uint32头长度 + JSON头 {rows, columns: [{name, type, offset, categories}]} + 8字节对齐的列数据
+     * 返回: {列名: 数组}，f8 列为 Float64Array、i4 列为 Int32Array（直接引用响应内存，不复制），
+     *       date 列转为 'YYYY-MM-DD' 字符串，cat 列转为字符串（-1 为 null）
+     */
+    decodeBinaryColumns(buffer) {
+        const bytes = new Uint8Array(buffer);
+        if (bytes.length < 8 || String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]) !== 'SSB1') {
+            throw new Error('无效的二进制数据');
+        }
+        const headerLength = new DataView(buffer).getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(bytes.subarray(8, 8 + headerLength)));
+        const start = 8 + headerLength;
+        
+        // 列数据为小端序，主流浏览器的类型化数组同为小端序，可直接创建视图
+        const columns = {};
+        header.columns.forEach(spec => {
+            const offset = start + spec.offset;
+            if (spec.type === 'f8') {
+                columns[spec.name] = new Float64Array(buffer, offset, header.rows);
+                return;
+            }
+            const values = new Int32Array(buffer, offset, header.rows);
+            if (spec.type === 'date') {
+                columns[spec.name] = Array.from(values, day => new Date(day * 86400000).toISOString().slice(0, 10));
+            } else if (spec.type === 'cat') {
+                columns[spec.name] = Array.from(values, code => code < 0 ? null : spec.categories[code]);
+            } else {
+                columns[spec.name] = values;
+            }
+        });
+        return columns;
+    },
+    
+    /**
+     * 以二进制格式请求 /api/kline 或 /api/indicator，返回逐行对象数组
+     * url: 不含 format 参数的接口地址
+     */
+    async fetchBinaryRecords(url) {
+        const response = await fetch(`${url}${url.includes('?') ? '&' : '?'}format=bin`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        return ChartUtils.columnsToRecords(ChartUtils.decodeBinaryColumns(await response.arrayBuffer()));
+    },
+    
+    /**
+     * 批量请求K线与指标（/api/batch），一次请求取回多只股票的全部数据
+     * 使用GET，浏览器可缓存响应并以 If-None-Match 验证，数据未变时服务端返回304；URL过长时改用POST
+     * specs: [{code, type, params}]，type 为 'kline' 或指标类型
+     * 返回: Map，键为 `${code}|${type}`，值为逐行对象数组；单项出错时不含该键
+     */
+    async fetchBatch(specs, baseUrl = 'http://localhost:5000') {
+        const url = `${baseUrl}/api/batch?format=columns&requests=${encodeURIComponent(JSON.stringify(specs))}`;
+        const response = url.length <= ChartUtils.MAX_GET_URL_LENGTH ? await fetch(url) : await fetch(`${baseUrl}/api/batch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ requests: specs, format: 'columns' })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        
+        const { results } = await response.json();
+        const batch = new Map();
+        results.forEach(result => {
+            if (result && !result.error) {
+                batch.set(`${result.code}|${result.type}`, ChartUtils.columnsToRecords(result.data));
+            }
+        });
+        return batch;
+    },
+    
+    /**
+     * 订阅实时推送（GET /api/stream，Server-Sent Events）
+     * handlers: {onBar(event), onReset(data), onError(error)}，onBar 的参数为
+     *           {code, seq, replace, bar, indicators}，replace 为 true 时替换最后一根K线
+     * 返回: EventSource，调用 close() 取消订阅；断线后浏览器按服务端的 retry 间隔自动重连
+     */
+    subscribeStream(codes, handlers = {}, baseUrl = 'http://localhost:5000') {
+        const source = new EventSource(`${baseUrl}/api/stream?codes=${encodeURIComponent(codes.join(','))}`);
+        source.addEventListener('bar', event => {
+            if (handlers.onBar) handlers.onBar(JSON.parse(event.data));
+        });
+        source.addEventListener('reset', event => {
+            // 服务端因消费过慢断开，不再自动重连
+            source.close();
+            if (handlers.onReset) handlers.onReset(JSON.parse(event.data));
+        });
+        source.onerror = error => {
+            if (handlers.onError) handlers.onError(error);
+        };
+        return source;
     }
 };
 
@@ -2096,6 +2220,9 @@ class MainChart extends BaseChart {
             // 准备数据加载
             this.prepareForDataLoad();
             
+            // 一次批量请求取回所有股票的K线与指标（主股票附带子图所需的Squeeze数据）
+            this.batchData = await this.loadBatchData(codes, selectedIndicators);
+            
             // 并行加载所有股票数据
             const promises = codes.map((code, idx) => 
                 this.loadStockData(code, idx, selectedIndicators)
@@ -2115,6 +2242,29 @@ class MainChart extends BaseChart {
         }
     }
     
+    /**
+     * 批量加载所有股票的K线与指标数据，失败时返回null，各部分回退为单独请求
+     */
+    async loadBatchData(codes, selectedIndicators) {
+        const specs = [];
+        codes.forEach((code, idx) => {
+            specs.push({ code, type: 'kline' });
+            selectedIndicators.forEach(type => specs.push({ code, type }));
+            if (idx === 0 && !selectedIndicators.includes('squeeze_momentum')) {
+                specs.push({ code, type: 'squeeze_momentum' });
+            }
+        });
+        
+        try {
+            const batch = await ChartUtils.fetchBatch(specs);
+            console.log(`📦 批量数据加载完成: ${batch.size}/${specs.length} 项`);
+            return batch;
+        } catch (error) {
+            console.warn('⚠️ 批量数据加载失败，改为逐个请求:', error);
+            return null;
+        }
+    }
+    
     /**
      * 加载单个股票数据
      */
@@ -2122,14 +2272,12 @@ class MainChart extends BaseChart {
         try {
             console.log(`📈 加载股票数据: ${code} (索引${index})`);
             
-            // 获取K线数据
-            const response = await fetch(`http://localhost:5000/api/kline?code=${code}`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            // 获取K线数据（优先使用批量结果）
+            let ohlc = this.batchData?.get(`${code}|kline`);
+            if (!ohlc) {
+                ohlc = await ChartUtils.fetchBinaryRecords(`http://localhost:5000/api/kline?code=${code}`);
             }
             
-            const ohlc = await response.json();
-            
             if (!ohlc || !Array.isArray(ohlc) || ohlc.length === 0) {
                 console.error(`❌ ${code}: API返回的数据无效`);
                 return;
@@ -2300,14 +2448,12 @@ class MainChart extends BaseChart {
         try {
             console.log(`📊 加载指标: ${indicator} for ${code} (股票${stockIndex})`);
             
-            // 获取Squeeze指标数据
-            const response = await fetch(`http://localhost:5000/api/indicator?code=${code}&type=squeeze_momentum`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            // 获取指标数据（优先使用批量结果）
+            let data = this.batchData?.get(`${code}|${indicator}`);
+            if (!data) {
+                data = await ChartUtils.fetchBinaryRecords(`http://localhost:5000/api/indicator?code=${code}&type=${indicator}`);
             }
             
-            const data = await response.json();
-            
             console.log(`🔍 ${indicator} API返回数据:`, {
                 length: data?.length,
                 sample: data?.slice(0, 3),
@@ -2328,6 +2474,9 @@ class MainChart extends BaseChart {
                 case 'ma10':
                     this.addMAIndicator(data, indicator, stockIndex);
                     break;
+                case 'hurst':
+                    this.addHurstIndicator(data, stockIndex);
+                    break;
                 case 'squeeze_momentum':
                     // Squeeze Momentum 指标只在子图中显示，主图不处理
                     console.log(`📊 Squeeze Momentum 指标将在子图中显示 (股票${stockIndex})`);
@@ -2341,6 +2490,142 @@ class MainChart extends BaseChart {
         }
     }
     
+    /**
+     * 开始接收实时推送：新K线追加、盘中K线替换，并增量更新 SuperTrend、MA 与 Squeeze
+     */
+    startLiveUpdates(codes) {
+        this.stopLiveUpdates();
+        this.liveSource = ChartUtils.subscribeStream(codes, {
+            onBar: event => this.applyStreamEvent(event),
+            onReset: data => {
+                console.warn('⚠️ 实时推送已断开，需要重新加载:', data);
+                this.liveSource = null;
+                this.emit('streamReset', data);
+            },
+            onError: error => console.warn('⚠️ 实时推送连接异常，等待重连', error)
+        });
+        console.log(`📡 已订阅实时推送: ${codes.join(',')}`);
+    }
+    
+    /**
+     * 停止实时推送
+     */
+    stopLiveUpdates() {
+        if (this.liveSource) {
+            this.liveSource.close();
+            this.liveSource = null;
+            console.log('📡 已停止实时推送');
+        }
+    }
+    
+    /**
+     * 按 replace 替换最后一项或追加一项（time 相同的项视为同一根K线）
+     */
+    upsertLast(items, item) {
+        if (!items) return;
+        const last = items[items.length - 1];
+        if (last && last.time === item.time) {
+            items[items.length - 1] = item;
+        } else {
+            items.push(item);
+        }
+    }
+    
+    /**
+     * 应用一条推送事件
+     */
+    applyStreamEvent(event) {
+        const stockIndex = this.stockInfos.findIndex(info => info && info.code === event.code);
+        if (stockIndex < 0 || !this.candleSeries[stockIndex]) return;
+        
+        try {
+            const bar = event.bar;
+            const ratio = this.normalizationEnabled ? (this.normalizationRatios[stockIndex] || 1) : 1;
+            
+            // K线：原始数据与显示数据同步更新
+            this.upsertLast(this.originalStockData[stockIndex], { ...bar });
+            this.upsertLast(this.stockInfos[stockIndex].data, { ...bar });
+            this.candleSeries[stockIndex].update({
+                time: bar.time,
+                open: bar.open * ratio,
+                high: bar.high * ratio,
+                low: bar.low * ratio,
+                close: bar.close * ratio
+            });
+            
+            const indicators = event.indicators || {};
+            ['ma5', 'ma10'].forEach(type => {
+                const value = indicators[type]?.ma;
+                if (value === null || value === undefined) return;
+                const entry = (this.stockIndicatorSeries[stockIndex] || []).find(item => item.type === type);
+                if (!entry) return;
+                const point = { time: bar.time, value: value };
+                this.upsertLast(entry.originalData, point);
+                entry.series.update({ time: bar.time, value: value * ratio });
+            });
+            
+            if (indicators.supertrend) {
+                this.applySupertrendDelta(stockIndex, indicators.supertrend, ratio);
+            }
+            
+            // 成交量与Squeeze子图只显示主股票
+            if (stockIndex === 0) {
+                if (this.volumeChart?.volumeSeries && bar.volume !== undefined) {
+                    const color = bar.close >= bar.open ? '#26a69a' : '#ef5350';
+                    this.volumeChart.volumeSeries.update({ time: bar.time, value: bar.volume, color: color });
+                }
+                const squeeze = indicators.squeeze_momentum;
+                if (this.squeezeChart?.squeezeSeries && squeeze && squeeze.momentum !== null) {
+                    const colors = { lime: '#00ff00', green: '#008000', red: '#dc143c', maroon: '#ff6b6b' };
+                    this.squeezeChart.squeezeSeries.update({
+                        time: bar.time,
+                        value: squeeze.momentum,
+                        color: colors[squeeze.bar_color] || '#808080'
+                    });
+                    this.squeezeChart.zeroLineSeries?.update({ time: bar.time, value: 0 });
+                }
+            }
+        } catch (error) {
+            console.error(`❌ 应用实时推送失败 (${event.code}):`, error);
+        }
+    }
+    
+    /**
+     * SuperTrend 增量：趋势未变时延长当前段，出现翻转或买卖信号时按原始数据重建线段与标记
+     */
+    applySupertrendDelta(stockIndex, point, ratio) {
+        const raw = this.originalIndicatorData[stockIndex]?.supertrend;
+        if (!raw) return;
+        const previous = raw.length && raw[raw.length - 1].time === point.time ? raw[raw.length - 2] : raw[raw.length - 1];
+        this.upsertLast(raw, point);
+        if (point.supertrend === null || point.supertrend === undefined) return;
+        
+        const type = point.trend === 1 ? 'supertrend_up' : 'supertrend_down';
+        const entry = (this.stockIndicatorSeries[stockIndex] || []).find(item => {
+            const data = item.originalData;
+            const last = data && data[data.length - 1];
+            return item.type === type && last && (last.time === point.time || (previous && last.time === previous.time));
+        });
+        if (entry && !point.buy && !point.sell) {
+            const value = { time: point.time, value: point.supertrend };
+            this.upsertLast(entry.originalData, value);
+            entry.series.update({ time: point.time, value: point.supertrend * ratio });
+            return;
+        }
+        
+        // 移除旧的线段后重建（翻转很少发生，重建代价可以接受）
+        this.stockIndicatorSeries[stockIndex] = (this.stockIndicatorSeries[stockIndex] || []).filter(item => {
+            if (!item.type || !item.type.startsWith('supertrend')) return true;
+            this.chart.removeSeries(item.series);
+            this.series = this.series.filter(series => series !== item.series);
+            return false;
+        });
+        this.addSupertrendIndicator(raw, stockIndex);
+        if (ratio !== 1) {
+            this.applyIndicatorNormalization(stockIndex, ratio);
+        }
+    }
+    
     /**
      * 添加SuperTrend指标
      */
@@ -2628,6 +2913,52 @@ class MainChart extends BaseChart {
         }
     }
     
+    /**
+     * 添加滑动窗口Hurst指数（独立价格轴，显示在主图底部，0.5为随机游走参考线）
+     */
+    addHurstIndicator(data, stockIndex) {
+        try {
+            if (!this.stockIndicatorSeries[stockIndex]) {
+                this.stockIndicatorSeries[stockIndex] = [];
+            }
+            
+            const hurstData = data
+                .filter(item => item && item.time && item.hurst !== null && isFinite(item.hurst))
+                .map(item => ({ time: item.time, value: item.hurst }));
+            
+            if (hurstData.length === 0) {
+                console.warn(`⚠️ hurst 没有有效数据 (股票${stockIndex})，K线数量可能少于窗口长度`);
+                return;
+            }
+            
+            const hurstSeries = this.addSeries('line', {
+                priceScaleId: 'hurst',
+                color: '#8e44ad',
+                lineWidth: 1,
+                lastValueVisible: true,
+                priceLineVisible: false,
+                priceFormat: { type: 'price', precision: 3, minMove: 0.001 },
+                visible: this.stockVisibility[stockIndex] !== false
+            });
+            hurstSeries.setData(hurstData);
+            hurstSeries.createPriceLine({ price: 0.5, color: '#808080', lineWidth: 1, lineStyle: 2, axisLabelVisible: false });
+            this.chart.priceScale('hurst').applyOptions({
+                scaleMargins: { top: 0.85, bottom: 0.0 }
+            });
+            
+            this.stockIndicatorSeries[stockIndex].push({
+                series: hurstSeries,
+                type: 'hurst',
+                originalData: hurstData
+            });
+            
+            console.log(`✅ hurst 指标已添加 (股票${stockIndex}), 数据点: ${hurstData.length}`);
+            
+        } catch (error) {
+            console.error(`❌ 添加hurst指标失败 (股票${stockIndex}):`, error);
+        }
+    }
+    
     /**
      * 添加Squeeze指标
      */
@@ -3080,6 +3411,8 @@ class MainChart extends BaseChart {
      */
     clearData() {
         try {
+            this.stopLiveUpdates();
+            
                     // 清空所有系列
         this.candleSeries = [];
         this.indicatorSeries = [];
@@ -3148,6 +3481,9 @@ class MainChart extends BaseChart {
             // 清除所有定时器
             this.clearAllTimers();
             
+            // 关闭实时推送
+            this.stopLiveUpdates();
+            
             // 销毁成交量子图
             this.destroyVolumeSubChart();
             
@@ -3501,8 +3837,8 @@ class MainChart extends BaseChart {
             // 处理成交量数据
             const volumeData = ChartUtils.processVolumeData(mainStock.data);
             
-            // 加载成交量数据
-            await this.volumeChart.loadVolumeData(mainStockCode);
+            // 加载成交量数据（直接复用主图K线，无需再次请求）
+            await this.volumeChart.loadVolumeData(mainStockCode, mainStock.data);
             
             // 等待一个动画帧，确保数据渲染完成
             await new Promise(resolve => requestAnimationFrame(resolve));
@@ -3757,8 +4093,8 @@ class MainChart extends BaseChart {
             // 获取主股票（第一只股票）的代码
             const mainStockCode = this.stockInfos[0].code;
             
-            // 加载Squeeze数据
-            await this.squeezeChart.loadSqueezeData(mainStockCode);
+            // 加载Squeeze数据（优先使用批量结果）
+            await this.squeezeChart.loadSqueezeData(mainStockCode, this.batchData?.get(`${mainStockCode}|squeeze_momentum`));
             
             console.log(`✅ 主股票 ${mainStockCode} Squeeze数据已加载到子图`);
             
@@ -4149,18 +4485,15 @@ class VolumeChart extends BaseChart {
     /**
      * 加载主股票的成交量数据
      */
-    async loadVolumeData(stockCode) {
+    async loadVolumeData(stockCode, ohlcData = null) {
         try {
             console.log(`📊 开始加载成交量数据: ${stockCode}`);
             
-            // 获取K线数据（包含成交量）
-            const response = await fetch(`http://localhost:5000/api/kline?code=${stockCode}`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            // 获取K线数据（包含成交量），已有数据时不再请求
+            if (!ohlcData) {
+                ohlcData = await ChartUtils.fetchBinaryRecords(`http://localhost:5000/api/kline?code=${stockCode}`);
             }
             
-            const ohlcData = await response.json();
-            
             if (!ohlcData || !Array.isArray(ohlcData) || ohlcData.length === 0) {
                 console.error(`❌ ${stockCode}: 成交量数据无效`);
                 return;
@@ -4406,18 +4739,15 @@ class SqueezeChart extends BaseChart {
     /**
      * 加载主股票的Squeeze Momentum数据
      */
-    async loadSqueezeData(stockCode) {
+    async loadSqueezeData(stockCode, squeezeData = null) {
         try {
             console.log(`📊 开始加载Squeeze Momentum数据: ${stockCode}`);
             
-            // 获取Squeeze指标数据
-            const response = await fetch(`http://localhost:5000/api/indicator?code=${stockCode}&type=squeeze_momentum`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            // 获取Squeeze指标数据，已有批量结果时不再请求
+            if (!squeezeData) {
+                squeezeData = await ChartUtils.fetchBinaryRecords(`http://localhost:5000/api/indicator?code=${stockCode}&type=squeeze_momentum`);
             }
             
-            const squeezeData = await response.json();
-            
             if (!squeezeData || !Array.isArray(squeezeData) || squeezeData.length === 0) {
                 console.error(`❌ ${stockCode}: Squeeze数据无效`);
                 return;
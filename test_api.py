@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+测试 /api/kline、/api/indicator 与 /api/batch 接口
+"""
+
+import gzip
+import json
+import math
+
+import numpy as np
+
+import app as app_module
+from app import app
+from indicator.compute_pool import ComputePool
+from indicator.result_cache import IndicatorCache
+from indicator.serialize import loads_binary
+
+CODE = 'HK.01810'
+
+
+def _get(url):
+    response = app.test_client().get(url)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_kline_layouts():
+    records = _get(f'/api/kline?code={CODE}')
+    columns = _get(f'/api/kline?code={CODE}&format=columns')
+    assert len(records) == len(columns['time']) > 0
+    for key, values in columns.items():
+        assert [row[key] for row in records] == values
+    assert _get('/api/kline?code=HK.99999') == []
+    assert _get('/api/kline?code=HK.99999&format=columns') == {}
+    print(f"✅ K线接口: {len(records)} 条")
+
+
+def test_indicator_nan_to_null():
+    for indicator in ['supertrend', 'squeeze_momentum', 'ma5', 'ma10']:
+        records = _get(f'/api/indicator?code={CODE}&type={indicator}')
+        assert len(records) > 0
+        for row in records:
+            for value in row.values():
+                assert not (isinstance(value, float) and math.isnan(value))
+    supertrend = _get(f'/api/indicator?code={CODE}&type=supertrend&format=columns')
+    assert all(v is None or v > 0 for v in supertrend['supertrend'])
+    ma5 = _get(f'/api/indicator?code={CODE}&type=ma5&format=columns')
+    assert ma5['ma'][:4] == [None] * 4 and ma5['ma'][4] is not None
+    print("✅ 指标接口 NaN 输出为 null")
+
+
+def _same(a, b):
+    """浮点值允许末位误差（滚动和的累加起点不同）"""
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def test_time_window():
+    full = _get(f'/api/kline?code={CODE}&format=columns')
+    times = full['time']
+    window = _get(f'/api/kline?code={CODE}&format=columns&from={times[50]}&to={times[99]}')
+    assert window['time'] == times[50:100]
+    assert window['close'] == full['close'][50:100]
+    latest = _get(f'/api/kline?code={CODE}&format=columns&limit=10')
+    assert latest['time'] == times[-10:]
+    assert _get(f'/api/kline?code={CODE}&format=columns&to={times[20]}&limit=5')['time'] == times[16:21]
+    assert app.test_client().get(f'/api/kline?code={CODE}&from=abc').status_code == 400
+
+    # 区间指标带预热计算，结果与全量计算后截取一致
+    for indicator in ['squeeze_momentum', 'ma5', 'ma10', 'supertrend']:
+        full_ind = _get(f'/api/indicator?code={CODE}&type={indicator}&format=columns')
+        part = _get(f'/api/indicator?code={CODE}&type={indicator}&format=columns&from={times[120]}&to={times[199]}')
+        for key, values in part.items():
+            assert all(map(_same, values, full_ind[key][120:200])), (indicator, key)
+    print("✅ 区间查询与全量结果一致")
+
+
+def test_invalid_params():
+    # 非正的长度与倍数返回400，而不是在计算中报错或输出全空列
+    client = app.test_client()
+    for query in ['type=supertrend&period=-3', 'type=supertrend&period=0', 'type=supertrend&multiplier=0',
+                  'type=squeeze_momentum&kc_length=0', 'type=squeeze_momentum&bb_length=0',
+                  'type=squeeze_momentum&bb_mult=-1', 'type=supertrend&multiplier=nan', 'type=hurst&step=0']:
+        assert client.get(f'/api/indicator?code={CODE}&{query}').status_code == 400, query
+    response = client.post('/api/batch', json={'requests': [{'code': CODE, 'type': 'supertrend', 'params': {'period': 0}}]})
+    assert 'error' in response.get_json()['results'][0]
+    print("✅ 无效参数返回400")
+
+
+def test_indicator_cache():
+    cache = app_module.indicator_cache
+    url = f'/api/indicator?code={CODE}&type=squeeze_momentum&format=columns&kc_mult=1.6'
+    first = _get(url)
+    before = cache.stats()
+    bodies = app_module.response_cache.stats()
+    assert _get(url) == first
+    # 参数写法不同但规范化后相同，ETag相同，直接命中响应体缓存
+    assert _get(url + '&bb_length=20') == first
+    assert app_module.response_cache.stats()['hits'] == bodies['hits'] + 2
+    # 响应格式不同时重新序列化，指标结果命中
+    records = _get(url.replace('format=columns', 'format=records'))
+    assert [row['momentum'] for row in records] == first['momentum']
+    after = cache.stats()
+    assert after['hits'] == before['hits'] + 1 and after['misses'] == before['misses']
+
+    # LRU按字节上限淘汰
+    small = IndicatorCache(max_bytes=100)
+    small.get_or_compute('a', lambda: {'v': np.zeros(10)})
+    small.get_or_compute('b', lambda: {'v': np.zeros(10)})
+    assert small.stats()['entries'] == 1 and small.stats()['evictions'] == 1
+    print(f"✅ 指标缓存: {cache.stats()}")
+
+
+def test_batch():
+    times = _get(f'/api/kline?code={CODE}&format=columns')['time']
+    specs = [
+        {'code': CODE, 'type': 'kline'},
+        {'code': CODE, 'type': 'squeeze_momentum', 'params': {'kc_length': 18}},
+        {'code': CODE, 'type': 'supertrend'},
+        {'code': CODE, 'type': 'ma5'},
+        {'code': 'HK.99999', 'type': 'ma10'},
+        {'code': CODE, 'type': 'macd'},
+    ]
+    response = app.test_client().post('/api/batch', json={
+        'requests': specs, 'format': 'columns', 'from': times[100], 'to': times[199]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert len(results) == len(specs)
+
+    # 与单个接口的结果一致（清空缓存，单独重新计算）
+    app_module.indicator_cache.clear()
+    window = f'format=columns&from={times[100]}&to={times[199]}'
+    assert results[0]['data'] == _get(f'/api/kline?code={CODE}&{window}')
+    for result, query in zip(results[1:4], ['squeeze_momentum&kc_length=18', 'supertrend', 'ma5']):
+        single = _get(f'/api/indicator?code={CODE}&type={query}&{window}')
+        assert list(result['data']) == list(single)
+        for key, values in single.items():
+            assert all(map(_same, values, result['data'][key])), (query, key)
+    assert results[1]['params']['kc_length'] == 18
+    assert 'error' in results[4] and 'error' in results[5]
+
+    assert app.test_client().post('/api/batch', json={'code': CODE}).status_code == 400
+
+    # 同批中有预热更长的指标时，SuperTrend 仍按自己的预热计算，缓存中的值与单个接口完全相同
+    app_module.indicator_cache.clear()
+    app_module.response_cache.clear()
+    url = f'/api/indicator?code={CODE}&type=supertrend&period=1&format=columns&from={times[50]}'
+    mixed = app.test_client().post('/api/batch', json={
+        'requests': [{'code': CODE, 'type': 'supertrend', 'params': {'period': 1}}, {'code': CODE, 'type': 'hurst'}],
+        'format': 'columns', 'from': times[50]}).get_json()['results']
+    cached = _get(url)
+    app_module.indicator_cache.clear()
+    app_module.response_cache.clear()
+    fresh = _get(url)
+    assert mixed[0]['data'] == cached == fresh
+    print(f"✅ 批量接口: {len(specs)} 项")
+
+
+def test_hurst_indicator():
+    full = _get(f'/api/indicator?code={CODE}&type=hurst&format=columns&window=64&step=5')
+    hurst = full['hurst']
+    n = len(hurst)
+    # 窗口从第一根K线开始：第一个窗口结束之前为null，之后每个值保持到下一个窗口结束
+    first = 64
+    assert hurst[:first] == [None] * first and all(0 < h < 1 for h in hurst[first:])
+    assert hurst[first:first + 5] == [hurst[first]] * 5 and hurst[first + 5] != hurst[first]
+    assert set(full) == {'time', 'hurst', 'alpha_0', 'lambda', 'sigma2'}
+
+    # 区间查询只带上所需的预热K线，结果与全量一致
+    part = _get(f'/api/indicator?code={CODE}&type=hurst&format=columns&window=64&step=5&from={full["time"][150]}')
+    assert all(map(_same, part['hurst'], hurst[150:]))
+    # 窗口位置不随区间终点（或新到的K线）变化，重叠部分的值相同
+    times = full['time']
+    for lo, hi in [(70, 160), (70, 161), (83, 197), (150, n - 3)]:
+        part = _get(f'/api/indicator?code={CODE}&type=hurst&format=columns&window=64&step=5'
+                    f'&from={times[lo]}&to={times[hi - 1]}')
+        for key in ['hurst', 'lambda']:
+            assert all(map(_same, part[key], full[key][lo:hi])), (lo, hi, key)
+    assert app.test_client().get(f'/api/indicator?code={CODE}&type=hurst&window=8').status_code == 400
+    print(f"✅ 滑动 Hurst 指标: 最新 H = {hurst[-1]:.4f}")
+
+
+def test_binary_format():
+    client = app.test_client()
+    for url in [f'/api/kline?code={CODE}', f'/api/indicator?code={CODE}&type=squeeze_momentum',
+                f'/api/indicator?code={CODE}&type=supertrend&max_points=50']:
+        expected = _get(url + '&format=columns')
+        response = client.get(url + '&format=bin')
+        assert response.mimetype == 'application/octet-stream'
+        # Accept 协商与 format=bin 相同
+        assert client.get(url, headers={'Accept': 'application/octet-stream'}).data == response.data
+        columns = loads_binary(response.data)
+        assert list(columns) == list(expected)
+        for name, values in columns.items():
+            values = values.tolist()
+            if columns[name].dtype.kind == 'f':
+                values = [None if math.isnan(v) else v for v in values]
+            assert values == expected[name], name
+    assert client.get(f'/api/kline?code={CODE}', headers={'Accept': '*/*'}).mimetype == 'application/json'
+    assert loads_binary(client.get('/api/kline?code=HK.99999&format=bin').data) == {}
+    print(f"✅ 二进制格式: {len(columns)} 列与JSON一致")
+
+
+def test_http_caching():
+    client = app.test_client()
+    url = f'/api/indicator?code={CODE}&type=supertrend&format=columns'
+    first = client.get(url)
+    etag = first.headers['ETag']
+    assert etag.startswith('W/') and first.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in first.headers['Vary']
+
+    # 数据与参数未变时返回304，不含响应体
+    again = client.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b'' and again.headers['ETag'] == etag
+    assert client.get(url + '&period=11', headers={'If-None-Match': etag}).status_code == 200
+
+    # gzip 压缩，解压后与未压缩的响应一致；压缩结果被缓存
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip' and zipped.headers['ETag'] == etag
+    assert gzip.decompress(zipped.data) == first.data and len(zipped.data) < len(first.data)
+    assert client.get(url, headers={'Accept-Encoding': 'gzip'}).data == zipped.data
+
+    # 已结束的历史区间同样可能被刷新改写，也需要每次验证
+    times = first.get_json()['time']
+    closed = client.get(f'/api/kline?code={CODE}&to={times[100]}')
+    assert closed.headers['Cache-Control'] == 'no-cache'
+
+    # 批量接口的GET形式同样支持ETag
+    requests = json.dumps([{'code': CODE, 'type': 'kline'}, {'code': CODE, 'type': 'ma5'}])
+    batch = client.get('/api/batch', query_string={'requests': requests, 'format': 'columns'})
+    assert batch.status_code == 200 and len(batch.get_json()['results']) == 2
+    assert client.post('/api/batch', json={'requests': json.loads(requests), 'format': 'columns'}).data == batch.data
+    assert client.get('/api/batch', query_string={'requests': requests, 'format': 'columns'},
+                      headers={'If-None-Match': batch.headers['ETag']}).status_code == 304
+    print(f"✅ HTTP缓存: ETag {etag}，gzip {len(zipped.data)}/{len(first.data)} 字节")
+
+
+def test_serving():
+    # 预热后，不带区间的图表请求直接命中指标缓存
+    app_module.indicator_cache.clear()
+    app_module.response_cache.clear()
+    stats = app_module.warm_caches([CODE, 'HK.99999'], ('supertrend', 'squeeze_momentum'))
+    assert stats['codes'] == 1 and stats['indicators'] == 2 and stats['missing'] == ['HK.99999']
+    before = app_module.indicator_cache.stats()
+    _get(f'/api/indicator?code={CODE}&type=supertrend&format=columns')
+    after = app_module.indicator_cache.stats()
+    assert after['hits'] == before['hits'] + 1 and after['misses'] == before['misses']
+
+    # 经计算池计算的结果与直接计算相同
+    url = f'/api/indicator?code={CODE}&type=squeeze_momentum&format=columns&kc_length=15'
+    direct = _get(url)
+    app_module.indicator_cache.clear()
+    app_module.response_cache.clear()
+    pool, app_module.compute_pool = app_module.compute_pool, ComputePool(2, 'thread')
+    try:
+        assert _get(url) == direct
+    finally:
+        app_module.compute_pool.shutdown()
+        app_module.compute_pool = pool
+    process_pool = ComputePool(1, 'process')
+    try:
+        assert not process_pool.shares_memory
+        assert process_pool.run(math.factorial, 10) == 3628800
+    finally:
+        process_pool.shutdown()
+    assert app_module.create_app(warm=False) is app
+    print(f"✅ 缓存预热: {stats}")
+
+
+def test_metrics():
+    app_module.indicator_cache.clear()
+    app_module.response_cache.clear()
+    client = app.test_client()
+    client.get(f'/api/indicator?code={CODE}&type=supertrend&format=columns&period=12',
+               headers={'Accept-Encoding': 'gzip'})
+    client.get(f'/api/kline?code={CODE}&format=bin')
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.content_type.startswith('text/plain; version=0.0.4')
+    lines = response.get_data(as_text=True).splitlines()
+    values = {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1]) for line in lines if not line.startswith('#')}
+
+    # 各阶段按接口与指标类型分组，缓存未命中时才有计算与压缩阶段
+    for stage in ('load', 'compute', 'serialize', 'compress'):
+        indicator = '' if stage in ('load', 'compress') else 'supertrend'
+        assert values[f'sesame_stage_seconds_count{{endpoint="api_indicator",stage="{stage}",indicator="{indicator}"}}'] >= 1
+    assert values['sesame_stage_seconds_count{endpoint="api_kline",stage="serialize",indicator="kline"}'] >= 1
+    assert values['sesame_request_seconds_bucket{endpoint="api_kline",le="+Inf"}'] >= 1
+    assert values['sesame_requests_total{endpoint="api_indicator",status="200"}'] >= 1
+    assert values['sesame_response_bytes_count{endpoint="api_indicator",indicator="supertrend"}'] >= 1
+    assert 0 <= values['sesame_cache_hit_ratio{cache="kline"}'] <= 1
+    assert values['sesame_cache_misses_total{cache="indicator"}'] >= 1
+
+    # 桶计数为累计值
+    buckets = [value for name, value in values.items()
+               if name.startswith('sesame_request_seconds_bucket{endpoint="api_kline"')]
+    assert buckets == sorted(buckets)
+    print(f"✅ /metrics: {len(lines)} 行")
+
+
+if __name__ == '__main__':
+    test_kline_layouts()
+    test_indicator_nan_to_null()
+    test_time_window()
+    test_invalid_params()
+    test_indicator_cache()
+    test_batch()
+    test_hurst_indicator()
+    test_binary_format()
+    test_http_caching()
+    test_serving()
+    test_metrics()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试K线分桶聚合与 LTTB 指标降采样
+"""
+
+import numpy as np
+from indicator.downsample import downsample_lines, downsample_ohlcv, lttb_indices
+
+
+def test_downsample_ohlcv():
+    n = 1000
+    np.random.seed(1)
+    close = 100 + np.cumsum(np.random.randn(n))
+    columns = {
+        'time': np.array([f't{i}' for i in range(n)], dtype=object),
+        'open': close + 0.1,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': np.arange(n),
+    }
+    result = downsample_ohlcv(columns, 300)
+    # 每桶4根，共250个桶
+    assert len(result['time']) == 250
+    assert result['time'][1] == 't4'
+    assert result['open'][1] == columns['open'][4]
+    assert result['high'][1] == columns['high'][4:8].max()
+    assert result['low'][1] == columns['low'][4:8].min()
+    assert result['close'][1] == columns['close'][7]
+    assert result['volume'].sum() == columns['volume'].sum()
+    assert downsample_ohlcv(columns, n) is columns
+    print("✅ K线分桶聚合正确")
+
+
+def test_lttb():
+    n = 5000
+    x = np.linspace(0, 20 * np.pi, n)
+    y = np.sin(x) * np.linspace(1, 3, n)
+    y[:30] = np.nan  # 预热期
+    idx = lttb_indices(y, 500)
+    assert len(idx) == 500 and idx[0] == 0 and idx[-1] == n - 1
+    assert np.all(np.diff(idx) > 0)
+    # 峰谷形状被保留
+    assert np.isclose(np.nanmax(y[idx]), np.nanmax(y), rtol=1e-3)
+    assert np.isclose(np.nanmin(y[idx]), np.nanmin(y), rtol=1e-3)
+
+    buy = np.zeros(n, dtype=int)
+    buy[[1001, 3003]] = 1
+    result = downsample_lines({'value': y, 'buy': buy}, 'value', 500, flags=('buy',))
+    assert result['buy'].sum() == 2
+    print("✅ LTTB 选点保留形状与信号")
+
+
+if __name__ == '__main__':
+    test_downsample_ohlcv()
+    test_lttb()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试增量指标与全量计算结果一致，包括检查点恢复与盘中替换最后一根K线
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from indicator import incremental
+from indicator.incremental import IncrementalIndicators
+from indicator.indicators import compute_indicator, normalize_params
+
+
+def _same(expected, value):
+    if isinstance(expected, float) and math.isnan(expected):
+        return value is None
+    if isinstance(expected, float):
+        return math.isclose(expected, value, rel_tol=1e-9, abs_tol=1e-9)
+    return expected == value
+
+
+def _history(n=400, seed=5):
+    np.random.seed(seed)
+    close = 100 + np.cumsum(np.random.randn(n))
+    return pd.DataFrame({
+        'time': pd.date_range('2023-01-01', periods=n).strftime('%Y-%m-%d'),
+        'open': close,
+        'high': close + np.random.rand(n) * 2,
+        'low': close - np.random.rand(n) * 2,
+        'close': close,
+    })
+
+
+def _assert_matches(df, outputs, start):
+    for name in ['supertrend', 'squeeze_momentum', 'ma5', 'ma10']:
+        full = compute_indicator(df, name, normalize_params(name))
+        for col in full.columns:
+            expected = full[col].iloc[start:].tolist()
+            got = [out[name][col] for out in outputs]
+            assert all(map(_same, expected, got)), (name, col)
+
+
+def test_incremental_matches_full():
+    n = 400
+    df = _history(n)
+    inc = IncrementalIndicators()
+    inc.seed(df.iloc[:300])
+    outputs = inc.extend(df.iloc[300:320])
+    # 检查点：状态可经JSON保存后恢复
+    inc = IncrementalIndicators.from_state(json.loads(json.dumps(inc.state_dict())))
+    for i in range(320, n):
+        bar = df.iloc[i].to_dict()
+        if i == 350:
+            # 盘中先推送未完成的K线，再以最终值替换
+            inc.update(dict(bar, high=bar['high'] + 5, close=bar['close'] + 5))
+            outputs.append(inc.update(bar, replace=True))
+        else:
+            outputs.append(inc.update(bar))
+    _assert_matches(df, outputs, 300)
+    print("✅ 增量指标与全量计算一致")
+
+
+def test_replace():
+    # 每根K线都先推送若干个盘中值再替换为最终值，结果与全量计算一致；
+    # 新高/新低会改变滑动最值的单调队列，撤销时需要按原顺序恢复
+    df = _history(300, seed=11)
+    rng = np.random.default_rng(2)
+    inc = IncrementalIndicators()
+    inc.seed(df.iloc[:200])
+    # 播种后即可替换最后一根K线
+    last = df.iloc[199].to_dict()
+    inc.update(dict(last, high=last['high'] + 20, close=last['close'] + 10), replace=True)
+    outputs = [inc.update(last, replace=True)]
+    for i in range(200, len(df)):
+        bar = df.iloc[i].to_dict()
+        inc.update(dict(bar, close=bar['open']))
+        for _ in range(int(rng.integers(0, 3))):
+            shock = float(rng.normal(0, 5))
+            inc.update(dict(bar, high=bar['high'] + abs(shock), low=bar['low'] - abs(shock), close=bar['close'] + shock),
+                       replace=True)
+        outputs.append(inc.update(bar, replace=True))
+    _assert_matches(df, outputs, 199)
+
+    # 从检查点恢复后没有撤销信息，replace 报错而不是把同一根K线推进两次；
+    # 恢复时直接使用检查点中的指标，不先构造默认指标
+    state = json.loads(json.dumps(inc.state_dict()))
+    make_incremental = incremental.make_incremental
+    incremental.make_incremental = None
+    try:
+        restored = IncrementalIndicators.from_state(state)
+    finally:
+        incremental.make_incremental = make_incremental
+    assert list(restored.indicators) == list(inc.indicators)
+    try:
+        restored.update(df.iloc[-1].to_dict(), replace=True)
+        raise AssertionError('应拒绝替换')
+    except ValueError:
+        pass
+    print("✅ 盘中替换最后一根K线与全量计算一致")
+
+
+if __name__ == '__main__':
+    test_incremental_matches_full()
+    test_replace()
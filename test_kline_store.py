@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+测试 KlineCache 的命中、文件变化失效与LRU淘汰，以及 ColumnarStore 的转换与同步
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from indicator.kline_store import ColumnarStore, KlineCache
+
+
+def _write_csv(path, rows):
+    df = pd.DataFrame({
+        'code': ['HK.00001'] * rows,
+        'time_key': pd.date_range('2024-01-01', periods=rows, freq='D').strftime('%Y-%m-%d 00:00:00'),
+        'open_price': [10.0 + i for i in range(rows)],
+        'high_price': [11.0 + i for i in range(rows)],
+        'low_price': [9.0 + i for i in range(rows)],
+        'close_price': [10.5 + i for i in range(rows)],
+        'volume': [1000 * (i + 1) for i in range(rows)],
+    })
+    df.to_csv(path, index=False)
+
+
+def test_kline_cache():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'HK_00001_daily.csv')
+        _write_csv(path, 30)
+        cache = KlineCache(tmp_dir)
+
+        df1 = cache.get('HK.00001')
+        df2 = cache.get('HK.00001')
+        assert df1 is df2
+        assert list(df1[['open', 'high', 'low', 'close']].dtypes) == ['float64'] * 4
+        assert df1['time'].iloc[0] == '2024-01-01'
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+        # 文件被改写后应重新加载
+        time.sleep(0.01)
+        _write_csv(path, 31)
+        df3 = cache.get('HK.00001')
+        assert df3 is not df1 and len(df3) == 31
+
+        assert cache.get('HK.99999') is None
+
+        # 内存上限只够放一个条目时，旧条目被淘汰
+        _write_csv(os.path.join(tmp_dir, 'HK_00002_daily.csv'), 30)
+        cache.max_bytes = cache.stats()['bytes']
+        cache.get('HK.00002')
+        stats = cache.stats()
+        print(f"缓存统计: {stats}")
+        assert stats['entries'] == 1 and stats['evictions'] == 1
+        assert stats['bytes'] <= stats['max_bytes']
+        print("\n✅ KlineCache 测试通过!")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_columnar_store():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'HK_00001_daily.csv')
+        _write_csv(path, 30)
+        store = ColumnarStore()
+        df = store.load(path)
+        csv_df = pd.read_csv(path)
+
+        assert list(df.columns) == list(csv_df.columns)
+        assert (df['code'] == 'HK.00001').all()
+        assert (df['time_key'] == pd.to_datetime(csv_df['time_key'])).all()
+        assert df['close_price'].equals(csv_df['close_price'])
+        assert df['volume'].dtype.kind == 'i'
+
+        meta, arrays = store.columns(path)
+        assert meta['rows'] == 30 and 'code' not in arrays
+        assert isinstance(arrays['close_price'], np.memmap)
+
+        # CSV变化后重新转换，旧版本目录被清理
+        time.sleep(0.01)
+        _write_csv(path, 31)
+        assert len(store.load(path)) == 31
+        assert len(os.listdir(os.path.join(tmp_dir, '.columnar', 'HK_00001_daily'))) == 1
+
+        # 通过列式存储加载的缓存结果与直接解析CSV一致
+        from_store = KlineCache(tmp_dir, store=store).get('HK.00001')
+        from_csv = KlineCache(tmp_dir).get('HK.00001')
+        fields = ['time', 'open', 'high', 'low', 'close', 'volume']
+        assert from_store[fields].equals(from_csv[fields])
+        print("\n✅ ColumnarStore 测试通过!")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    test_kline_cache()
+    test_columnar_store()
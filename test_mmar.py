@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+测试多重分形（MMAR）计算模块：与原脚本的逐个 (Δt, q) 循环结果一致
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+from mmar.cascade import lognormal_cascade, trading_time_cdf
+from mmar.__main__ import main as mmar_main
+from mmar.partition import get_factors, partition_function, partition_functions, relative_log_prices
+from mmar.pipeline import DEFAULT_Q, load_ecb_csv, run
+from mmar.rolling import rolling_partition, rolling_profile, window_starts
+from mmar.simulate import fractional_gaussian_noise, simulate_paths
+from mmar.spectrum import (ProfileCache, estimate_hurst, gradient_spectrum, multifractal_profile,
+                           polyfit_spectrum, scaling_function)
+
+Q = [0.01, 0.1, 0.5, 1.0, 1.5, 1.99, 2.0, 2.5, 3.0, 5.0, 10.0, 20.0, 30.0]
+
+
+def _usd_nok(n=7561):
+    df = pd.read_csv(os.path.join('mmar', 'USD_NOK.csv'), sep=';', usecols=['TIME_PERIOD', 'OBS_VALUE'])
+    prices = df['OBS_VALUE'].dropna().to_numpy(dtype=np.float64)
+    return prices[:n]
+
+
+def _loop_partition(xt, delta_t, q):
+    """原 parse_usd_nok.calc_partition_function 的逐个循环实现"""
+    T = len(xt)
+    result = np.zeros((len(q), len(delta_t)))
+    for j, dt in enumerate(delta_t):
+        idx1 = np.arange(int(T / dt)) * dt
+        idx2 = idx1 + dt
+        valid = idx2 < T
+        abs_diffs = np.abs(xt[idx2[valid]] - xt[idx1[valid]])
+        for k, qv in enumerate(q):
+            result[k, j] = np.sum(abs_diffs ** qv)
+    return result
+
+
+def test_partition_matches_loop():
+    xt = relative_log_prices(_usd_nok())
+    delta_t = get_factors(len(xt) - 1)
+    assert delta_t == [i for i in range(1, len(xt)) if (len(xt) - 1) % i == 0]
+
+    begin = time.perf_counter()
+    expected = _loop_partition(xt, delta_t, Q)
+    loop_elapsed = time.perf_counter() - begin
+    begin = time.perf_counter()
+    result = partition_function(xt, delta_t, Q)
+    elapsed = time.perf_counter() - begin
+    assert result.shape == (len(Q), len(delta_t))
+    assert np.allclose(result, expected, rtol=1e-10, atol=0)
+    # 分块计算不改变结果
+    assert np.allclose(partition_function(xt, delta_t, Q, max_elements=1000), result, rtol=1e-10, atol=0)
+    print(f"✅ 分区函数: 循环 {loop_elapsed * 1000:.1f}ms, 广播 {elapsed * 1000:.1f}ms")
+
+
+def test_partition_zero_increments():
+    xt = np.array([0.0, 0.1, 0.1, 0.3, 0.3, 0.3, 0.2])
+    q = [-1.0, 0.0, 0.5, 2.0]
+    result = partition_function(xt, [1, 2], q)
+    with np.errstate(divide='ignore'):
+        expected = _loop_partition(xt, [1, 2], q)
+    assert np.allclose(result, expected, rtol=1e-12, atol=1e-15)
+
+
+def test_partition_many_series():
+    np.random.seed(3)
+    series = {f'S{i}': 10 * np.exp(np.cumsum(np.random.randn(n) * 0.01))
+              for i, n in enumerate([241, 241, 241, 121])}
+    delta_t = [1, 2, 4, 8]
+    results = partition_functions(series, delta_t, Q)
+    assert sorted(results) == sorted(series)
+    for name, prices in series.items():
+        expected = _loop_partition(relative_log_prices(prices), delta_t, Q)
+        assert np.allclose(results[name], expected, rtol=1e-10, atol=0), name
+
+    panel = np.stack([relative_log_prices(series[f'S{i}']) for i in range(3)])
+    assert partition_function(panel, delta_t, Q).shape == (3, len(Q), len(delta_t))
+    print(f"✅ 多序列分区函数: {len(results)} 条")
+
+
+def test_lognormal_cascade():
+    mass = lognormal_cascade(10, 0.1, 0.3, seed=42)
+    assert mass.shape == (1024,)
+    assert np.array_equal(mass, lognormal_cascade(10, 0.1, 0.3, seed=42))
+    assert not np.array_equal(mass, lognormal_cascade(10, 0.1, 0.3, seed=43))
+
+    # 每格质量是k个独立乘子之积：ln(mass) ~ N(k*mean, k*sigma^2)
+    batch = lognormal_cascade(8, 0.1, 0.3, size=400, seed=1)
+    assert batch.shape == (400, 256)
+    log_mass = np.log(batch)
+    assert abs(log_mass.mean() - 8 * 0.1) < 0.08
+    assert abs(log_mass.var() - 8 * 0.09) < 0.05
+    # 同一父节点下的相邻两格共享前 k-1 层乘子
+    pair_diff = (log_mass[:, 0::2] - log_mass[:, 1::2]).var()
+    assert abs(pair_diff - 2 * 0.09) < 0.01
+
+    begin = time.perf_counter()
+    big = lognormal_cascade(22, 0.0, 0.1, seed=0)
+    elapsed = time.perf_counter() - begin
+    assert big.shape == (2 ** 22,) and np.isfinite(big).all()
+
+    cdf = trading_time_cdf(8, batch)
+    assert cdf.shape == batch.shape and np.allclose(cdf[:, -1], 256)
+    assert (np.diff(cdf, axis=1) > 0).all()
+    print(f"✅ 对数正态级联: k=22 耗时 {elapsed * 1000:.0f}ms")
+
+
+def test_fractional_gaussian_noise():
+    H = 0.7
+    noise = fractional_gaussian_noise(2048, H, size=401, seed=5)
+    assert noise.shape == (401, 2048)
+    # 单位方差，自协方差 γ(k) = (|k+1|^2H - 2|k|^2H + |k-1|^2H) / 2
+    assert abs(noise.var() - 1) < 0.02
+    for lag in [1, 2, 5]:
+        gamma = 0.5 * ((lag + 1) ** (2 * H) - 2 * lag ** (2 * H) + (lag - 1) ** (2 * H))
+        assert abs(np.mean(noise[:, lag:] * noise[:, :-lag]) - gamma) < 0.02, lag
+    # 同一次FFT得到的实部与虚部两条样本互不相关
+    assert abs(np.corrcoef(noise[:200].ravel(), noise[200:400].ravel())[0, 1]) < 0.01
+    assert fractional_gaussian_noise(16, 0.5, seed=0).shape == (16,)
+    try:
+        fractional_gaussian_noise(16, 1.2)
+        assert False, 'H 超出范围应报错'
+    except ValueError:
+        pass
+
+
+def test_simulate_paths():
+    kwargs = dict(H=0.55, lambda_=1.1, sigma=0.34, magnitude=0.15, start_price=8.0, seed=11, batch_size=64)
+    begin = time.perf_counter()
+    paths = simulate_paths(300, 1024, workers=1, **kwargs)
+    elapsed = time.perf_counter() - begin
+    assert paths.shape == (300, 1025)
+    assert (paths[:, 0] == 8.0).all() and np.isfinite(paths).all() and (paths > 0).all()
+    # 多进程与单进程结果相同
+    assert np.array_equal(simulate_paths(300, 1024, workers=2, **kwargs), paths)
+    assert simulate_paths(10, 700, workers=1, **kwargs).shape == (10, 701)
+    # θ(2^k) = 2^k，整段的对数收益 ~ N(0, magnitude^2H)
+    log_final = np.log(paths[:, -1] / 8.0)
+    assert abs(log_final.std() / 0.15 ** 0.55 - 1) < 0.15
+    print(f"✅ MMAR 模拟: 300 条路径耗时 {elapsed * 1000:.0f}ms")
+
+
+def test_spectrum_matches_reference():
+    xt = relative_log_prices(_usd_nok())
+    delta_t = get_factors(len(xt) - 1)
+    q = np.array(Q)
+    partition = partition_function(xt, delta_t, q)
+    tau = scaling_function(partition, delta_t)
+    expected = [linregress(np.log(delta_t), np.log(row)).slope for row in partition]
+    assert np.allclose(tau, expected, rtol=1e-10, atol=1e-12)
+
+    # Hurst：第一个过零区间线性插值
+    H, q_star = estimate_hurst(q, tau)
+    i = next(i for i in range(1, len(q)) if tau[i - 1] * tau[i] <= 0)
+    assert np.isclose(q_star, q[i - 1] - tau[i - 1] * (q[i] - q[i - 1]) / (tau[i] - tau[i - 1]))
+    assert np.isclose(H, 1 / q_star) and 0.3 < H < 0.8
+
+    alpha, f_alpha = gradient_spectrum(q, tau)
+    assert np.allclose(alpha, np.gradient(tau, q)) and np.allclose(f_alpha, q * alpha - tau)
+    alpha, f_alpha, coeffs = polyfit_spectrum(q, tau, 0, 10)
+    a, b, c = np.polyfit(q[:10], tau[:10], 2)
+    assert np.allclose(coeffs, [a, b, c], rtol=1e-8)
+    assert np.allclose(alpha, 2 * a * q[:10] + b) and np.allclose(f_alpha, q[:10] * alpha - np.polyval(coeffs, q[:10]))
+
+
+def test_profile_batch_and_cache():
+    np.random.seed(9)
+    series = [relative_log_prices(100 * np.exp(np.cumsum(np.random.randn(n) * 0.01))) for n in [513, 513, 513, 257]]
+    delta_t = [1, 2, 4, 8, 16, 32]
+    batch = multifractal_profile(np.stack(series[:3]), delta_t, Q, hi=8)
+    assert batch['tau'].shape == (3, len(Q)) and batch['H'].shape == (3,)
+    assert batch['poly_alpha'].shape == (3, 8)
+    single = multifractal_profile(series[1], delta_t, Q, hi=8)
+    for name, values in single.items():
+        assert np.allclose(batch[name][1], values, equal_nan=True), name
+
+    cache = ProfileCache(max_entries=3)
+    first = cache.profiles(series, delta_t, Q, hi=8)
+    assert cache.stats()['misses'] == 4 and cache.stats()['entries'] == 3
+    assert np.allclose(first[1]['lambda'], single['lambda'])
+    again = cache.profile(series[3], delta_t, Q, hi=8)
+    assert again is first[3] and cache.hits == 1
+    # 网格不同则不命中
+    cache.profile(series[3], delta_t[:-1], Q, hi=8)
+    assert cache.misses == 5
+    print(f"✅ 多重分形批量估计: H = {np.round(batch['H'], 3)}")
+
+
+def test_pipeline_stages():
+    prices = load_ecb_csv(os.path.join('mmar', 'USD_NOK.csv'), '1989-01-25', '2019-03-01', max_points=7561)
+    assert len(prices) == 7561 and prices.index.is_monotonic_increasing
+
+    # 只要求 tau 时自动补上依赖阶段，不做正态性检验与模拟
+    results = run(prices, stages=['tau'], log=None)
+    assert results['stages'] == ['load', 'returns', 'partition', 'tau']
+    assert results['delta_t'] == get_factors(7560)
+    assert 'normality' not in results and 'simulation' not in results
+
+    xt = relative_log_prices(prices.to_numpy())
+    tau = scaling_function(partition_function(xt, get_factors(7560), DEFAULT_Q), get_factors(7560))
+    assert np.allclose(results['tau'].to_numpy(), tau)
+    assert 0.4 < results['hurst']['H'] < 0.5
+
+    try:
+        run(prices, stages=['plot'], log=None)
+        assert False, '未知阶段应报错'
+    except ValueError:
+        pass
+
+
+def test_cli():
+    with tempfile.TemporaryDirectory() as out_dir:
+        code = mmar_main([os.path.join('mmar', 'USD_NOK.csv'), '--out', out_dir, '--start', '2005-01-01',
+                          '--max-points', '2049',
+                          '--paths', '8', '--seed', '1', '--workers', '1', '--no-figures', '--quiet'])
+        assert code == 0
+        names = sorted(os.listdir(out_dir))
+        assert names == ['partition.csv', 'returns.csv', 'simulation.npy', 'spectrum.csv', 'summary.json', 'tau.csv']
+        with open(os.path.join(out_dir, 'summary.json'), encoding='utf-8') as f:
+            summary = json.load(f)
+        assert summary['summary']['points'] == 2049 and summary['delta_t'] == get_factors(2048)
+        assert set(summary['lognormal']) == {'lambda', 'sigma2', 'alpha_0'}
+        assert np.load(os.path.join(out_dir, 'simulation.npy')).shape == (8, 2049)
+
+        assert mmar_main([os.path.join(out_dir, 'missing.csv'), '--out', out_dir, '--quiet']) == 1
+
+        # 1989年起的前2049个点 τ(q) 没有过零点：跳过级联参数与模拟，其余结果照常写出
+        skipped_dir = os.path.join(out_dir, 'skipped')
+        assert mmar_main([os.path.join('mmar', 'USD_NOK.csv'), '--out', skipped_dir, '--max-points', '2049',
+                          '--no-figures', '--quiet']) == 0
+        with open(os.path.join(skipped_dir, 'summary.json'), encoding='utf-8') as f:
+            skipped = json.load(f)
+        assert skipped['hurst']['H'] is None and skipped['skipped'] == ['lognormal', 'simulate']
+        assert not os.path.exists(os.path.join(skipped_dir, 'simulation.npy'))
+    print(f"✅ MMAR 命令行: H = {summary['hurst']['H']:.4f}")
+
+
+def test_rolling_profile():
+    prices = load_ecb_csv(os.path.join('mmar', 'USD_NOK.csv'), max_points=3000)
+    xt = relative_log_prices(prices.to_numpy())
+    starts = window_starts(len(xt), 256, 12)
+    assert starts[-1] + 256 == len(xt) - 1 and (np.diff(starts) == 12).all() and starts[0] < 12
+
+    # Δt 整除 step 的部分按格点分段求和，其余批量计算，都与逐个窗口单独计算一致
+    delta_t = [1, 2, 3, 4, 5, 6, 8, 12, 16, 24, 64]
+    begin = time.perf_counter()
+    _, result = rolling_partition(xt, 256, 12, delta_t, Q)
+    elapsed = time.perf_counter() - begin
+    expected = np.stack([partition_function(xt[s:s + 257], delta_t, Q) for s in starts])
+    assert np.allclose(result, expected, rtol=1e-10, atol=0)
+    # 多进程结果相同
+    _, parallel = rolling_partition(xt, 256, 12, delta_t, Q, workers=2, parallel_threshold=1)
+    assert np.array_equal(parallel, result)
+
+    profile = rolling_profile(prices, window=256, step=12, delta_t=get_factors(256))
+    assert len(profile) == len(starts) and profile.index[-1] == prices.index[-1]
+    assert list(profile.columns) == ['start', 'end', 'H', 'alpha_0', 'lambda', 'sigma2']
+    single = run(prices.iloc[starts[-1]:], stages=['lognormal'], delta_t=get_factors(256), log=None)
+    assert np.isclose(profile['H'].iloc[-1], single['hurst']['H'])
+    assert np.isclose(profile['lambda'].iloc[-1], single['lognormal']['lambda'])
+    assert rolling_profile(prices.iloc[:100], window=256, step=12).empty
+
+    # align='start'：窗口从第一个点开始，序列变长时已有窗口的估计值不变
+    assert (window_starts(len(xt), 256, 12, align='start') == np.arange(0, len(xt) - 256, 12)).all()
+    short = rolling_profile(prices.iloc[:1500], window=256, step=12, align='start')
+    longer = rolling_profile(prices.iloc[:1507], window=256, step=12, align='start')
+    assert np.allclose(short['H'], longer['H'].iloc[:len(short)], rtol=1e-12, atol=0)
+    print(f"✅ 滑动窗口分析: {len(starts)} 个窗口，分区函数耗时 {elapsed * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    test_partition_matches_loop()
+    test_partition_zero_increments()
+    test_partition_many_series()
+    test_lognormal_cascade()
+    test_fractional_gaussian_noise()
+    test_simulate_paths()
+    test_spectrum_matches_reference()
+    test_profile_batch_and_cache()
+    test_pipeline_stages()
+    test_cli()
+    test_rolling_profile()
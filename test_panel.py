@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试面板引擎：长度不同的品种右对齐成二维面板后，各行结果与原 pandas 实现逐只计算的结果一致
+（TechAnalysis 已改为调用面板引擎，不能作为对照）
+"""
+
+import numpy as np
+import pandas as pd
+
+from indicator import panel
+from test_squeeze_momentum import _reference_linreg
+from test_supertrend import _reference_supertrend
+
+
+def _frames():
+    np.random.seed(7)
+    frames = []
+    for n in [300, 120, 45, 8]:
+        close = 50 + np.cumsum(np.random.randn(n))
+        frames.append(pd.DataFrame({
+            'time': [f't{i}' for i in range(n)],
+            'high': close + np.random.rand(n),
+            'low': close - np.random.rand(n),
+            'close': close,
+        }))
+    return frames
+
+
+def _same(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), equal_nan=True)
+
+
+def _close(a, b):
+    return np.allclose(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64),
+                       rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def _reference(df, period=10, multiplier=3.0, length=20, bb_mult=2.0, kc_mult=1.5):
+    """原 pandas 实现（rolling、逐行循环、逐窗口 linregress），与面板引擎互相独立"""
+    high, low, close = df['high'], df['low'], df['close']
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+
+    atr = tr.rolling(window=period, min_periods=period).mean()
+    src = (high + low) / 2
+    up_adj, dn_adj, trend = _reference_supertrend(close, src - multiplier * atr, src + multiplier * atr)
+    line = np.where(trend == 1, up_adj, dn_adj)
+    prev_trend = np.concatenate([[np.nan], trend[:-1]])
+    out = {
+        'supertrend': np.where(line > 0, line, np.nan),
+        'trend': trend,
+        'buy': (trend == 1) & (prev_trend == -1),
+        'sell': (trend == -1) & (prev_trend == 1),
+    }
+
+    basis = close.rolling(window=length).mean()
+    dev = bb_mult * close.rolling(window=length).std()
+    range_ma = tr.rolling(window=length).mean()
+    out['upper_bb'], out['lower_bb'] = basis + dev, basis - dev
+    out['upper_kc'], out['lower_kc'] = basis + range_ma * kc_mult, basis - range_ma * kc_mult
+    out['squeeze_on'] = (out['lower_bb'] > out['lower_kc']) & (out['upper_bb'] < out['upper_kc'])
+    out['squeeze_off'] = (out['lower_bb'] < out['lower_kc']) & (out['upper_bb'] > out['upper_kc'])
+    avg_hl = (high.rolling(window=length).max() + low.rolling(window=length).min()) / 2
+    out['momentum'] = _reference_linreg(close - (avg_hl + basis) / 2, length)
+    return out
+
+
+def test_panel_matches_single():
+    frames = _frames()
+    width = max(len(df) for df in frames)
+    columns = {name: panel.align_right([df[name].to_numpy() for df in frames]) for name in ['high', 'low', 'close']}
+    assert columns['close'].shape == (len(frames), width)
+    assert np.isnan(columns['close'][1, :width - 120]).all()
+    ctx = panel.PanelContext(columns)
+
+    st = panel.supertrend(ctx, 10, 3.0)
+    sqz = panel.squeeze_momentum(ctx, 20, 2.0, 20, 1.5, True)
+    for row, df in enumerate(frames):
+        tail = slice(width - len(df), None)
+        expected = _reference(df)
+        for key in ['trend', 'buy', 'sell']:
+            assert _same(st[key][row, tail], expected[key]), (row, key)
+        assert _close(st['supertrend'][row, tail], expected['supertrend']), row
+        for key in ['squeeze_on', 'squeeze_off']:
+            assert _same(sqz[key][row, tail], expected[key]), (row, key)
+        # 滚动和的累加顺序与 pandas 不同，浮点末位可能有差异
+        for key in ['upper_bb', 'lower_bb', 'upper_kc', 'lower_kc', 'momentum']:
+            assert _close(sqz[key][row, tail], expected[key]), (row, key)
+        # 填充部分不产生信号
+        assert not st['buy'][row, :width - len(df)].any()
+    print(f"✅ 面板 {columns['close'].shape} 与逐只计算一致")
+
+
+if __name__ == '__main__':
+    test_panel_matches_single()
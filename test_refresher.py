@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+测试后台刷新服务：用本地假行情服务验证连接复用、并发上限、限流与原子写入
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from indicator.kline_store import ColumnarStore, KlineCache
+from indicator.refresher import RateLimiter, RefreshService, futu_code
+
+
+class FakeQuoteServer:
+    """模拟 OpenD：按 start 过滤、按 page_size 分页返回，记录连接数、并发请求数与请求时间"""
+
+    def __init__(self, delay=0.02, fail=(), bars=30, page_size=20):
+        self.delay = delay
+        self.fail = set(fail)
+        self.bars = bars
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.contexts = 0
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+        self.last_close = 10.5
+        self.last_volume = 1000
+        self.scale = 1.0  # 复权因子，模拟除权除息后富途重新计算全部前复权价格
+
+    def connect(self):
+        with self.lock:
+            self.contexts += 1
+        return FakeQuoteContext(self)
+
+    def history(self, code, start=None, page_req_key=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.requests.append(time.monotonic())
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if code in self.fail:
+            return -1, '未知股票', None
+        days = pd.date_range('2024-01-01', periods=self.bars)
+        data = pd.DataFrame({
+            'code': code,
+            'time_key': days.strftime('%Y-%m-%d 00:00:00'),
+            'open': 10.0, 'close': 10.5, 'high': 11.0, 'low': 9.5,
+            'volume': 1000,
+        })
+        data.loc[len(data) - 1, 'close'] = self.last_close
+        data.loc[len(data) - 1, 'volume'] = self.last_volume
+        data[['open', 'close', 'high', 'low']] *= self.scale
+        if start is not None:
+            data = data[days >= pd.Timestamp(start)].reset_index(drop=True)
+        offset = page_req_key or 0
+        next_key = offset + self.page_size if offset + self.page_size < len(data) else None
+        return 0, data.iloc[offset:offset + self.page_size].reset_index(drop=True), next_key
+
+
+class FakeQuoteContext:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def request_history_kline(self, code, ktype='K_DAY', start=None, page_req_key=None, **kwargs):
+        return self.server.history(code, start, page_req_key)
+
+    def close(self):
+        self.closed = True
+
+
+def test_refresh_service():
+    server = FakeQuoteServer(fail=['SZ.000004'])
+    codes = ['000001', '600000', 'HK.00700', '000002', '000004', '300750']
+    updated = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = RefreshService(codes, data_dir, context_factory=server.connect, max_workers=2,
+                                 rate=(1000, 1.0), store=ColumnarStore(), on_update=updated.append)
+        result = service.refresh_once()
+        assert sorted(r['code'] for r in result['ok']) == sorted(futu_code(c) for c in codes if c != '000004')
+        assert result['failed'] == ['SZ.000004']
+        # 获取到K线的股票通知回调（如实时推送）
+        assert sorted(updated) == sorted(r['code'] for r in result['ok'])
+        # 连接复用且不超过并发上限
+        assert server.contexts <= 2 and server.max_active <= 2
+        # 只留下完整的CSV，没有临时文件
+        names = sorted(os.listdir(data_dir))
+        assert [n for n in names if n.startswith('.tmp-')] == []
+        assert 'SH_600000_daily.csv' in names and 'SZ_000004_daily.csv' not in names
+
+        cache = KlineCache(data_dir)
+        assert len(cache.get('SH.600000')) == 30
+        contexts = list(service.pool._contexts)
+        service.stop()
+        assert len(contexts) == server.contexts and all(ctx.closed for ctx in contexts) and service.pool.created == 0
+    print(f"✅ 刷新服务: {len(result['ok'])} 成功, 最大并发 {server.max_active}")
+
+
+def test_rate_limiter():
+    now = [0.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(2, 1.0, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    # 2个突发之后每次等待0.5秒
+    assert slept == [0.5, 0.5, 0.5, 0.5]
+
+    server = FakeQuoteServer(delay=0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = RefreshService(['HK.%05d' % i for i in range(8)], data_dir, context_factory=server.connect,
+                                 max_workers=4, rate=(20, 1.0))
+        service.rate_limiter = RateLimiter(20, 1.0, burst=1)
+        service.refresh_once()
+        service.stop()
+    elapsed = server.requests[-1] - server.requests[0]
+    assert elapsed >= 7 / 20 * 0.9, elapsed
+    print(f"✅ 限流: 8次请求耗时 {elapsed:.2f}s")
+
+
+def test_incremental_refresh():
+    server = FakeQuoteServer(delay=0, bars=50)
+    updated = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = RefreshService(['HK.00700'], data_dir, context_factory=server.connect, rate=(1000, 1.0),
+                                 on_update=updated.append)
+        first = service.refresh_once()
+        assert first['ok'][0] == {'code': 'HK.00700', 'fetched': 50, 'merged': 50, 'rows': 50, 'changed': True}
+        requests = len(server.requests)
+        assert requests == 3  # 每页20根，共3页
+
+        # 新增3天，最后一天的收盘价在收盘后变化
+        server.bars = 53
+        server.last_close = 12.0
+        second = service.refresh_once()
+        # 从本地最后一天（第50天）开始请求：重叠1根 + 新增3根
+        assert second['ok'][0] == {'code': 'HK.00700', 'fetched': 4, 'merged': 3, 'rows': 53, 'changed': True}
+        assert len(server.requests) == requests + 1
+
+        df = pd.read_csv(service.csv_path('HK.00700'))
+        assert len(df) == 53 and df['time_key'].is_unique and df['time_key'].is_monotonic_increasing
+        assert df['close'].iloc[-1] == 12.0
+        assert updated == ['HK.00700', 'HK.00700']
+
+        # 没有新K线且重叠K线未变：不改写CSV（文件版本不变），不通知更新
+        stat = os.stat(service.csv_path('HK.00700'))
+        third = service.refresh_once()
+        assert third['ok'][0] == {'code': 'HK.00700', 'fetched': 1, 'merged': 0, 'rows': 53, 'changed': False}
+        after = os.stat(service.csv_path('HK.00700'))
+        assert (after.st_mtime_ns, after.st_size) == (stat.st_mtime_ns, stat.st_size)
+        assert updated == ['HK.00700', 'HK.00700']
+
+        # 重叠K线被修正（价格不变、成交量变化）时仍视为变化，只增量合并
+        requests = len(server.requests)
+        server.last_volume = 1500
+        fourth = service.refresh_once()
+        assert fourth['ok'][0] == {'code': 'HK.00700', 'fetched': 1, 'merged': 0, 'rows': 53, 'changed': True}
+        assert len(server.requests) == requests + 1
+        assert pd.read_csv(service.csv_path('HK.00700'))['volume'].iloc[-1] == 1500
+        assert len(updated) == 3
+        service.stop()
+    print(f"✅ 增量刷新: 获取 {second['fetched']} 根，新增 {second['merged']} 根")
+
+
+def test_adjustment_change():
+    server = FakeQuoteServer(delay=0, bars=50)
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = RefreshService(['HK.00700'], data_dir, context_factory=server.connect, rate=(1000, 1.0))
+        service.refresh_once()
+        requests = len(server.requests)
+
+        # 除权后全部历史按新的复权因子重算，重叠K线的价格与本地不一致 -> 重新下载完整历史
+        server.bars = 52
+        server.scale = 0.5
+        result = service.refresh_once()['ok'][0]
+        assert result['rows'] == 52 and result['merged'] == 2
+        assert len(server.requests) == requests + 1 + 3  # 增量请求1次 + 完整下载3页
+
+        df = pd.read_csv(service.csv_path('HK.00700'))
+        assert len(df) == 52 and df['time_key'].is_unique
+        assert (df['open'] == 5.0).all() and (df['high'] == 5.5).all() and (df['low'] == 4.75).all()
+        service.stop()
+    print("✅ 复权基准变化: 重新下载完整历史")
+
+
+if __name__ == '__main__':
+    test_refresh_service()
+    test_incremental_refresh()
+    test_adjustment_change()
+    test_rate_limiter()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试股票池指标筛选：进程池+共享内存与进程内计算结果一致，信号与全量计算一致
+"""
+
+import numpy as np
+
+from indicator.indicators import compute_indicator, normalize_params
+from indicator.kline_store import KlineCache
+from indicator.screener import SCREEN_CONDITIONS, Screener, load_universe, resolve_code
+
+DATA_DIR = 'indicator'
+CODES = ['HK.01810', 'HK.02432', 'HK.09660']
+
+
+def test_resolve_universe():
+    codes = load_universe('config/code.txt')
+    assert len(codes) > 1000 and codes[0] == '000001'
+    assert resolve_code(DATA_DIR, 'HK.01810') == 'HK.01810'
+    assert resolve_code(DATA_DIR, '01810') == 'HK.01810'
+    assert resolve_code(DATA_DIR, '600000') is None
+    print(f"✅ 股票池 {len(codes)} 个代码")
+
+
+def test_screen_parallel():
+    cache = KlineCache(DATA_DIR)
+    inline = Screener(cache, workers=1)
+    pool = Screener(cache, workers=2, chunk_size=2, parallel_threshold=0)
+    try:
+        for condition, (indicator, _) in SCREEN_CONDITIONS.items():
+            params = normalize_params(indicator)
+            expected = inline.scan(condition, CODES + ['HK.99999'], params, lookback=30)
+            result = pool.scan(condition, CODES + ['HK.99999'], params, lookback=30)
+            assert result['matches'] == expected['matches'], condition
+            assert result['scanned'] == 3 and result['skipped'] == ['HK.99999']
+    finally:
+        pool.close()
+    print("✅ 进程池与进程内筛选结果一致")
+
+
+def test_screen_signals():
+    # 只取尾部K线计算的信号与全量计算一致
+    cache = KlineCache(DATA_DIR)
+    screener = Screener(cache, workers=1)
+    params = normalize_params('supertrend')
+    result = screener.scan('supertrend_buy', CODES, params, lookback=30)
+    matched = {row['code']: row for row in result['matches']}
+    for code in CODES:
+        df = cache.get(code)
+        full = compute_indicator(df, 'supertrend', params)
+        hits = np.flatnonzero(full['buy'].to_numpy()[-30:])
+        if len(hits) == 0:
+            assert code not in matched
+        else:
+            assert matched[code]['time'] == df['time'].iat[len(df) - 30 + hits[-1]]
+    bars_ago = [row['bars_ago'] for row in result['matches']]
+    assert bars_ago == sorted(bars_ago)
+    print(f"✅ SuperTrend 买入信号: {list(matched)}")
+
+
+if __name__ == '__main__':
+    test_resolve_universe()
+    test_screen_parallel()
+    test_screen_signals()
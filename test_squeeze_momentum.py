@@ -5,6 +5,8 @@
 
 import pandas as pd
 import numpy as np
+from scipy import stats
+from indicator.kernels import rolling_linreg
 from indicator.tech_analysis_web import TechAnalysis
 
 def test_squeeze_momentum():
@@ -65,5 +67,35 @@ def test_squeeze_momentum():
         traceback.print_exc()
         return False
 
+def _reference_linreg(y, length, offset=0):
+    """原逐窗口 scipy.stats.linregress 实现，作为对照"""
+    result = pd.Series(index=y.index, dtype=float)
+    for i in range(length - 1, len(y)):
+        y_slice = y.iloc[i - length + 1:i + 1]
+        if not y_slice.isna().any():
+            slope, intercept, _, _, _ = stats.linregress(np.arange(length), y_slice)
+            result.iloc[i] = slope * (length - 1 - offset) + intercept
+    return result
+
+
+def test_rolling_linreg():
+    np.random.seed(3)
+    y = pd.Series(np.cumsum(np.random.randn(2000)))
+    y.iloc[:19] = np.nan
+    y.iloc[500] = np.nan  # 中间的缺失值使其后length个窗口为NaN
+    for length, offset in [(20, 0), (5, 2), (2, 0)]:
+        expected = _reference_linreg(y, length, offset)
+        result = rolling_linreg(y.to_numpy(), length, offset)
+        assert np.array_equal(np.isnan(result), expected.isna().to_numpy())
+        assert np.allclose(result, expected.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    # 二维输入按行独立计算
+    panel = np.vstack([y.to_numpy(), y.to_numpy()[::-1]])
+    rows = rolling_linreg(panel, 20)
+    assert np.array_equal(rows[1], rolling_linreg(panel[1], 20), equal_nan=True)
+    print("✅ rolling_linreg 与 linregress 结果一致")
+
+
 if __name__ == "__main__":
-    test_squeeze_momentum() 
\ No newline at end of file
+    test_squeeze_momentum()
+    test_rolling_linreg() 
\ No newline at end of file
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+测试实时推送：模拟行情下一次计算分发给多个订阅者、指标增量与全量计算一致、
+过慢订阅者的 reset、数据更新后的推送，以及 /api/stream 的SSE输出
+"""
+
+import json
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import app, get_available_stocks, stream_hub
+from indicator.indicators import compute_indicator, normalize_params
+from indicator.stream import SimulatedTickFeed, StreamHub
+
+
+def _history(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(n))
+    return pd.DataFrame({
+        'time': pd.bdate_range('2023-01-02', periods=n).strftime('%Y-%m-%d'),
+        'open': close,
+        'high': close + rng.random(n),
+        'low': close - rng.random(n),
+        'close': close,
+        'volume': rng.integers(1000, 5000, n).astype(float),
+    })
+
+
+def _parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.decode('utf-8').strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+def _drain(sub):
+    frames = []
+    while True:
+        frame = sub.get(timeout=0)
+        if frame is None:
+            return frames
+        frames.append(frame)
+
+
+def test_fanout_matches_full():
+    df = _history()
+    hub = StreamHub(lambda code: (df, 'v1') if code == 'SIM' else (None, None))
+    subs = [hub.subscribe(['SIM'])[0] for _ in range(3)]
+    feed = SimulatedTickFeed(hub, ['SIM'], ticks_per_bar=4, seed=7)
+    for _ in range(30):
+        feed.tick()
+
+    frames = [_drain(sub) for sub in subs]
+    assert len(frames[0]) == 30
+    assert frames[0] == frames[1] == frames[2]  # 同一份数据帧分发给全部订阅者
+    assert hub.stats() == {'streams': 1, 'subscribers': 3, 'computed': 30}
+
+    events = [_parse(frame)[1] for frame in frames[0]]
+    assert [e['seq'] for e in events] == list(range(1, 31))
+    # 把推送的K线按 replace 应用到历史数据上，最后一个事件的指标应与全量计算一致
+    rows = df.to_dict(orient='records')
+    for e in events:
+        if e['replace']:
+            rows[-1] = e['bar']
+        else:
+            rows.append(e['bar'])
+    full_df = pd.DataFrame(rows)
+    assert len(full_df) == len(df) + 7
+    last = events[-1]['indicators']
+    for name in ['supertrend', 'squeeze_momentum', 'ma5', 'ma10']:
+        full = compute_indicator(full_df, name, normalize_params(name)).iloc[-1]
+        for col, expected in full.items():
+            value = last[name][col]
+            if isinstance(expected, float) and math.isnan(expected):
+                assert value is None, (name, col)
+            elif isinstance(expected, (float, np.floating)):
+                assert math.isclose(expected, value, rel_tol=1e-9, abs_tol=1e-9), (name, col)
+    print("✅ 一次计算分发给全部订阅者，指标增量与全量计算一致")
+
+
+def test_lagging_subscriber():
+    df = _history(60)
+    hub = StreamHub(lambda code: (df, 'v1') if code == 'SIM' else (None, None), max_queue=3)
+    slow, _ = hub.subscribe(['SIM'])
+    fast, _ = hub.subscribe(['SIM'])
+    feed = SimulatedTickFeed(hub, ['SIM'], seed=1)
+    for _ in range(5):
+        feed.tick()
+        _drain(fast)
+    assert hub.stats()['subscribers'] == 1
+    event, data = _parse(slow.get(timeout=0))
+    assert event == 'reset' and data['codes'] == ['SIM']
+    assert slow.closed
+    # 新订阅者先收到最新一根K线的状态
+    late, missing = hub.subscribe(['SIM', 'NONE'])
+    assert missing == ['NONE'] and late.codes == ['SIM']
+    assert _parse(late.get(timeout=0))[1]['seq'] == 5
+    print("✅ 过慢的订阅者收到 reset 后断开")
+
+
+def test_sync_all():
+    # 数据版本未变化时不推送（即使 loader 返回了新对象，如缓存淘汰后重新加载）；
+    # 版本变化后替换最后一根并追加新K线
+    data = {'SIM': (_history(61).iloc[:60], 'v1')}
+    hub = StreamHub(lambda code: data.get(code, (None, None)))
+    sub, _ = hub.subscribe(['SIM'])
+    data['SIM'] = (data['SIM'][0].copy(), 'v1')
+    assert hub.sync_all() == 0 and _drain(sub) == []
+    data['SIM'] = (_history(61), 'v2')
+    assert hub.sync_all() == 2
+    events = [_parse(frame)[1] for frame in _drain(sub)]
+    assert [event['replace'] for event in events] == [True, False]
+    assert events[-1]['bar']['time'] == data['SIM'][0]['time'].iloc[-1]
+    assert hub.sync_all() == 0
+
+    # 实时推送过的K线写入文件后不算修订
+    feed = SimulatedTickFeed(hub, ['SIM'], ticks_per_bar=1, seed=4)
+    feed.tick()
+    feed.tick()
+    bars = [event['bar'] for event in (_parse(frame)[1] for frame in _drain(sub))]
+    # 第一笔替换了最后一根，第二笔开始新的一根
+    assert bars[0]['time'] == data['SIM'][0]['time'].iloc[-1] and bars[1]['time'] > bars[0]['time']
+    live = pd.concat([data['SIM'][0].iloc[:-1], pd.DataFrame(bars)], ignore_index=True)
+    data['SIM'] = (live, 'v3')
+    assert hub.sync_all() == 1 and not sub.closed
+
+    # 最后一根之前的K线被修订时，订阅者收到 reset，推送流用新数据重新播种
+    revised = live.copy()
+    revised.loc[10, 'close'] += 1.0
+    data['SIM'] = (revised, 'v4')
+    assert hub.sync_all() == 0
+    event, payload = _parse(sub.get(timeout=0))
+    assert event == 'reset' and payload['reason'] == 'revised' and sub.closed
+    stream = hub.stream('SIM')
+    assert stream.subscribers == 0 and stream.source is revised
+    print("✅ 数据更新后推送新K线，历史修订时 reset")
+
+
+class _SlowVersion(str):
+    """比较时停顿的数据版本，使并发的 sync 在比较版本时重叠"""
+    __hash__ = str.__hash__
+
+    def __eq__(self, other):
+        time.sleep(0.05)
+        return str.__eq__(self, other)
+
+
+def test_concurrent_sync():
+    # 后台刷新回调与 StreamWatcher 同时同步同一个新版本，只应用一次
+    data = {'SIM': (_history(61).iloc[:60], 'v1')}
+    hub = StreamHub(lambda code: data.get(code, (None, None)))
+    sub, _ = hub.subscribe(['SIM'])
+    data['SIM'] = (_history(61), _SlowVersion('v2'))
+    pushed = []
+    workers = [threading.Thread(target=lambda: pushed.append(hub.sync('SIM'))) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(5)
+    assert sorted(pushed) == [0, 0, 2]
+    assert [_parse(frame)[1]['replace'] for frame in _drain(sub)] == [True, False]
+    assert hub.stream('SIM').version == 'v2'
+    print("✅ 并发同步只应用一次")
+
+
+def test_cold_load_does_not_block():
+    # 冷门股票加载、播种期间，其他股票的推送与统计不被阻塞
+    df = _history(60)
+    loading = threading.Event()
+    release = threading.Event()
+
+    def loader(code):
+        if code == 'SLOW':
+            loading.set()
+            release.wait(5)
+        return df, 'v1'
+
+    hub = StreamHub(loader)
+    hub.subscribe(['SIM'])
+    worker = threading.Thread(target=hub.subscribe, args=(['SLOW'],))
+    worker.start()
+    assert loading.wait(5)
+    bar = dict(hub.stream('SIM').last_bar, close=101.0)
+    assert hub.publish('SIM', bar) is not None and hub.stats()['streams'] == 1
+    release.set()
+    worker.join(5)
+    assert hub.stats()['streams'] == 2
+    print("✅ 冷加载不阻塞其他股票")
+
+
+def test_sse_endpoint():
+    code = get_available_stocks()[0]['code']
+    client = app.test_client()
+    assert client.get('/api/stream').status_code == 400
+    assert client.get('/api/stream?code=HK.99999').status_code == 404
+
+    before = stream_hub.stats()['subscribers']
+    response = client.get(f'/api/stream?code={code}', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    body = iter(response.response)
+    assert next(body).startswith(b'retry:')
+    assert stream_hub.stats()['subscribers'] == before + 1
+
+    last = stream_hub.stream(code).last_bar
+    bar = dict(last, close=last['close'] * 1.01, high=max(last['high'], last['close'] * 1.01))
+    stream_hub.publish(code, bar)
+    event, data = _parse(next(body))
+    assert event == 'bar' and data['code'] == code and data['replace']
+    assert data['bar']['close'] == bar['close']
+    assert set(data['indicators']) == {'supertrend', 'squeeze_momentum', 'ma5', 'ma10'}
+    response.close()
+    assert stream_hub.stats()['subscribers'] == before
+    print("✅ /api/stream 输出SSE事件，断开后取消订阅")
+
+
+if __name__ == '__main__':
+    test_fanout_matches_full()
+    test_lagging_subscriber()
+    test_sync_all()
+    test_concurrent_sync()
+    test_cold_load_does_not_block()
+    test_sse_endpoint()
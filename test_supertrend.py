@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import pandas as pd
+import numpy as np
 import os
+from indicator import kernels
 from indicator.tech_analysis_web import TechAnalysis
 
 def test_supertrend():
@@ -71,5 +73,54 @@ def test_supertrend():
     print("未找到数据文件")
     return None
 
+def _reference_supertrend(close, up, dn):
+    """原 .iloc 逐行循环实现，作为内核的对照"""
+    close, up, dn = pd.Series(close), pd.Series(up), pd.Series(dn)
+    trend = np.ones(len(close))
+    up_adj = up.copy()
+    dn_adj = dn.copy()
+    for i in range(1, len(close)):
+        up_adj.iloc[i] = up.iloc[i] if (close.iloc[i-1] <= up_adj.iloc[i-1]) else max(up.iloc[i], up_adj.iloc[i-1])
+        dn_adj.iloc[i] = dn.iloc[i] if (close.iloc[i-1] >= dn_adj.iloc[i-1]) else min(dn.iloc[i], dn_adj.iloc[i-1])
+        if trend[i-1] == -1 and close.iloc[i] > dn_adj.iloc[i-1]:
+            trend[i] = 1
+        elif trend[i-1] == 1 and close.iloc[i] < up_adj.iloc[i-1]:
+            trend[i] = -1
+        else:
+            trend[i] = trend[i-1]
+    return up_adj.to_numpy(), dn_adj.to_numpy(), trend
+
+
+def test_supertrend_kernel():
+    np.random.seed(7)
+    n = 500
+    close = 100 + np.cumsum(np.random.randn(n))
+    high = close + np.random.rand(n) * 2
+    low = close - np.random.rand(n) * 2
+    atr = pd.Series(high - low).rolling(window=10, min_periods=10).mean().to_numpy()
+    src = (high + low) / 2
+    up = src - 3.0 * atr
+    dn = src + 3.0 * atr
+
+    expected = _reference_supertrend(close, up, dn)
+    result = kernels.supertrend_kernel(close, up, dn)
+    for exp, res in zip(expected, result):
+        # 逐位一致（包括预热期的NaN位置）
+        assert np.array_equal(exp, res, equal_nan=True)
+
+    # 纯Python回退路径同样逐位一致
+    up_adj, dn_adj, trend = up.tolist(), dn.tolist(), [1.0] * n
+    kernels._supertrend_loop(close.tolist(), up.tolist(), dn.tolist(), up_adj, dn_adj, trend)
+    assert np.array_equal(expected[0], np.array(up_adj), equal_nan=True)
+    assert np.array_equal(expected[2], np.array(trend))
+
+    buy, sell = kernels.trend_signals(result[2])
+    trend_series = pd.Series(expected[2])
+    assert np.array_equal(buy, ((trend_series == 1) & (trend_series.shift(1) == -1)).to_numpy())
+    assert np.array_equal(sell, ((trend_series == -1) & (trend_series.shift(1) == 1)).to_numpy())
+    print(f"✅ SuperTrend内核与原实现一致 (numba: {kernels.njit is not None})")
+
+
 if __name__ == '__main__':
-    test_supertrend() 
\ No newline at end of file
+    test_supertrend()
+    test_supertrend_kernel() 
\ No newline at end of file
@@ -237,4 +237,160 @@ describe('ChartUtils', () => {
             expect(volumeData[0].color).toBe('rgba(0,0,0,0)');
         });
     });
-}); 
\ No newline at end of file
+
+    describe('columnsToRecords()', () => {
+        it('should convert column-oriented payload to records', () => {
+            const records = ChartUtils.columnsToRecords({
+                time: ['2023-01-01', '2023-01-02'],
+                close: [105, null]
+            });
+            expect(records).toEqual([
+                { time: '2023-01-01', close: 105 },
+                { time: '2023-01-02', close: null }
+            ]);
+        });
+
+        it('should pass through record arrays', () => {
+            const data = [{ time: '2023-01-01', close: 105 }];
+            expect(ChartUtils.columnsToRecords(data)).toBe(data);
+        });
+
+        it('should handle empty or invalid payloads', () => {
+            expect(ChartUtils.columnsToRecords({})).toEqual([]);
+            expect(ChartUtils.columnsToRecords(null)).toEqual([]);
+        });
+    });
+
+    describe('decodeBinaryColumns()', () => {
+        // 按服务端格式构造: 'SSB1' + uint32头长度 + JSON头（补齐到8字节）+ 列数据
+        function encode(rows, specs) {
+            let offset = 0;
+            const columns = specs.map(spec => {
+                const column = { ...spec.meta, offset };
+                offset += Math.ceil(spec.bytes.byteLength / 8) * 8;
+                return column;
+            });
+            let header = JSON.stringify({ rows, columns });
+            header += ' '.repeat((8 - (8 + header.length) % 8) % 8);
+            const buffer = new ArrayBuffer(8 + header.length + offset);
+            const bytes = new Uint8Array(buffer);
+            bytes.set([83, 83, 66, 49]);
+            new DataView(buffer).setUint32(4, header.length, true);
+            bytes.set(new TextEncoder().encode(header), 8);
+            specs.forEach((spec, i) => {
+                bytes.set(new Uint8Array(spec.bytes.buffer), 8 + header.length + columns[i].offset);
+            });
+            return buffer;
+        }
+
+        it('should decode float, int, date and categorical columns', () => {
+            const buffer = encode(2, [
+                { meta: { name: 'time', type: 'date' }, bytes: new Int32Array([19724, 19725]) },
+                { meta: { name: 'close', type: 'f8' }, bytes: new Float64Array([1.5, NaN]) },
+                { meta: { name: 'trend', type: 'i4' }, bytes: new Int32Array([1, -1]) },
+                { meta: { name: 'bar_color', type: 'cat', categories: ['lime'] }, bytes: new Int32Array([0, -1]) }
+            ]);
+
+            const columns = ChartUtils.decodeBinaryColumns(buffer);
+            expect(columns.time).toEqual(['2024-01-02', '2024-01-03']);
+            expect(columns.close).toBeInstanceOf(Float64Array);
+            expect(ChartUtils.columnsToRecords(columns)).toEqual([
+                { time: '2024-01-02', close: 1.5, trend: 1, bar_color: 'lime' },
+                { time: '2024-01-03', close: null, trend: -1, bar_color: null }
+            ]);
+        });
+
+        it('should reject other payloads', () => {
+            expect(() => ChartUtils.decodeBinaryColumns(new TextEncoder().encode('[]').buffer)).toThrow('无效的二进制数据');
+        });
+    });
+
+    describe('fetchBatch()', () => {
+        it('should request specs and key results by code and type', async () => {
+            global.fetch = jest.fn().mockResolvedValue({
+                ok: true,
+                json: () => Promise.resolve({
+                    results: [
+                        { code: 'HK.00700', type: 'kline', data: { time: ['2023-01-01'], close: [105] } },
+                        { code: 'HK.00700', type: 'macd', error: '未知指标类型: macd' }
+                    ]
+                })
+            });
+
+            const batch = await ChartUtils.fetchBatch([
+                { code: 'HK.00700', type: 'kline' },
+                { code: 'HK.00700', type: 'macd' }
+            ]);
+
+            // 短请求用GET，浏览器可缓存并验证ETag
+            const [url, options] = global.fetch.mock.calls[0];
+            const query = new URL(url).searchParams;
+            expect(url.startsWith('http://localhost:5000/api/batch?')).toBe(true);
+            expect(options).toBeUndefined();
+            expect(query.get('format')).toBe('columns');
+            expect(JSON.parse(query.get('requests'))).toEqual([
+                { code: 'HK.00700', type: 'kline' },
+                { code: 'HK.00700', type: 'macd' }
+            ]);
+            expect(batch.get('HK.00700|kline')).toEqual([{ time: '2023-01-01', close: 105 }]);
+            expect(batch.has('HK.00700|macd')).toBe(false);
+        });
+
+        it('should fall back to POST for long requests', async () => {
+            global.fetch = jest.fn().mockResolvedValue({ ok: true, json: () => Promise.resolve({ results: [] }) });
+            const specs = Array.from({ length: 200 }, (_, i) => ({ code: `HK.${String(i).padStart(5, '0')}`, type: 'kline' }));
+
+            await ChartUtils.fetchBatch(specs);
+
+            const [url, options] = global.fetch.mock.calls[0];
+            expect(url).toBe('http://localhost:5000/api/batch');
+            expect(options.method).toBe('POST');
+            expect(JSON.parse(options.body).requests).toHaveLength(200);
+        });
+
+        it('should throw on server errors', async () => {
+            global.fetch = jest.fn().mockResolvedValue({ ok: false, status: 400, statusText: 'Bad Request' });
+            await expect(ChartUtils.fetchBatch([])).rejects.toThrow('HTTP 400');
+        });
+    });
+
+    describe('subscribeStream()', () => {
+        class FakeEventSource {
+            constructor(url) {
+                this.url = url;
+                this.listeners = {};
+                this.closed = false;
+                FakeEventSource.last = this;
+            }
+            addEventListener(name, handler) {
+                this.listeners[name] = handler;
+            }
+            close() {
+                this.closed = true;
+            }
+        }
+
+        beforeEach(() => {
+            global.EventSource = FakeEventSource;
+        });
+
+        it('should parse bar events and pass them to onBar', () => {
+            const onBar = jest.fn();
+            const source = ChartUtils.subscribeStream(['HK.00700', 'HK.01810'], { onBar });
+
+            expect(source.url).toBe('http://localhost:5000/api/stream?codes=HK.00700%2CHK.01810');
+            const event = { code: 'HK.00700', seq: 1, replace: true, bar: { time: '2023-01-01', close: 105 } };
+            source.listeners.bar({ data: JSON.stringify(event) });
+            expect(onBar).toHaveBeenCalledWith(event);
+        });
+
+        it('should close the source on reset', () => {
+            const onReset = jest.fn();
+            const source = ChartUtils.subscribeStream(['HK.00700'], { onReset });
+
+            source.listeners.reset({ data: JSON.stringify({ codes: ['HK.00700'], reason: 'lagged' }) });
+            expect(source.closed).toBe(true);
+            expect(onReset).toHaveBeenCalledWith({ codes: ['HK.00700'], reason: 'lagged' });
+        });
+    });
+});
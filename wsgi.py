@@ -0,0 +1,13 @@
+"""
+生产部署的 WSGI 入口：
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+导入时预热缓存（WARM_CACHE=0 关闭）；后台服务由 gunicorn.conf.py 在各 worker 中启动。
+其他 WSGI 服务器（如 waitress、uWSGI）单进程运行时可设置 START_SERVICES=1 在导入时启动。
+"""
+import os
+
+from app import create_app
+
+application = app = create_app(services=os.environ.get('START_SERVICES', '0') not in ('0', 'false', ''))